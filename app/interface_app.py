@@ -4,19 +4,44 @@ Fecha: 25-03-2025
 """
 
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
+from tkinter import ttk, messagebox
 from tkinter import PhotoImage
 import subprocess
 import threading
+import queue
+import json
 import os
 import datetime
 import time
 from pathlib import Path
 from PIL import Image, ImageTk
 
+from terminal_view import TerminalView
+from worker_client import WorkerClient
+
+
+# Protocolo con la caché de sesión de los scripts (ver processed_data/scripts/run_cache.py)
+SESSION_ENV = 'NBA_ETL_SESSION'
+CACHED_MARKER = '@@CACHED'
+# Eventos de progreso de los pipelines (ver processed_data/scripts/progress.py)
+PROGRESS_ENV = 'NBA_ETL_PROGRESS'
+PROGRESS_MARKER = '@@PROGRESS'
 
 
 class NBAETLInterface:
+    # Intervalo de refresco de la consola y máximo de líneas por refresco
+    DRAIN_INTERVAL_MS = 50
+    MAX_ITEMS_PER_TICK = 500
+    # Líneas que conserva la consola; el historial completo va a logs/console_*.log
+    TERMINAL_MAX_LINES = 5000
+    # Sondeo del estado de la BD (estimaciones del catálogo, sin recorrer tablas)
+    DB_POLL_INTERVAL_MS = 15000
+    # Líneas mostradas por "Mostrar Logs" y por la vista combinada
+    LOG_TAIL_LINES = 20
+    COMBINED_LOG_LINES = 60
+    # Filas mostradas por la consulta de partidos (índice en memoria del worker)
+    QUERY_ROW_LIMIT = 50
+
     def __init__(self, root):
         self.root = root
         self.root.title("NBA Playoffs ETL Dashboard")
@@ -26,9 +51,24 @@ class NBAETLInterface:
         self.process_running = False
         self.current_stage = 0
         self.stage_statuses = ["pending", "pending", "pending", "pending"]  # Estado de las 4 etapas
+        # Sesión del proceso completo: las etapas reutilizan lo ya hecho en ella
+        self.session_id = None
+        
+        # Salida de los procesos: los hilos lectores encolan y la interfaz vacía la cola
+        self.output_queue = queue.Queue()
+        self.cached_stages = set()
         
         # Crear la interfaz
         self.create_interface()
+        self.root.after(self.DRAIN_INTERVAL_MS, self._drain_output)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Worker persistente: módulos precargados y conexión abierta para las acciones del panel
+        self.worker = WorkerClient(on_log=lambda line: self.output_queue.put(('line', None, line)))
+        self.worker.start()
+        self.db_poll_pending = False
+        self.follow_request = None
+        self.root.after(self.DB_POLL_INTERVAL_MS, self._poll_database_status)
         
         # Inicializar terminal
         self.append_to_terminal("Sistema NBA Playoffs ETL Dashboard iniciado.")
@@ -82,6 +122,8 @@ class NBAETLInterface:
         # Frame para cada botón y su indicador de estado
         self.stage_frames = []
         self.stage_indicators = []
+        self.stage_status_labels = {}
+        self.stage_progress = []
         
         # Botones con indicadores
         stage_config = [
@@ -129,6 +171,17 @@ class NBAETLInterface:
             )
             button.pack(side=tk.LEFT, padx=0)
             
+            # Progreso de la etapa según los eventos del pipeline
+            progress_bar = ttk.Progressbar(stage_frame, orient=tk.HORIZONTAL, length=90,
+                                           mode='determinate', maximum=100)
+            progress_bar.pack(side=tk.LEFT, padx=(5, 0))
+            self.stage_progress.append(progress_bar)
+            
+            # Texto de estado para las etapas omitidas por caché
+            status_label = ttk.Label(stage_frame, text="", width=16, background=bg_color)
+            status_label.pack(side=tk.LEFT, padx=(5, 0))
+            self.stage_status_labels[indicator_canvas] = status_label
+            
             # Guardar referencia al botón
             if config["index"] == 0:
                 self.extraction_btn = button
@@ -167,13 +220,58 @@ class NBAETLInterface:
         )
         self.check_db_btn.pack(side=tk.LEFT, padx=5, anchor="w")
         
+        self.restart_worker_btn = ttk.Button(
+            db_buttons_frame,
+            text="Reiniciar Worker",
+            command=self.restart_worker,
+            style="TButton",
+            width=22
+        )
+        self.restart_worker_btn.pack(side=tk.LEFT, padx=5, anchor="w")
+        
+        # Resumen del estado de la BD, actualizado periódicamente
+        self.db_status_label = ttk.Label(db_frame, text="Estado de BD: consultando...", background=bg_color)
+        self.db_status_label.pack(pady=(5, 0))
+        
+        # Consulta de partidos sobre el índice en memoria del worker
+        query_frame = ttk.LabelFrame(main_frame, text="Consulta de Partidos", padding=10, style="Control.TLabelframe")
+        query_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        query_fields_frame = ttk.Frame(query_frame)
+        query_fields_frame.pack(pady=2)
+        self.query_vars = {}
+        for key, label, width in [('team', "Equipo", 16), ('season', "Temporada", 9),
+                                  ('start', "Desde", 11), ('end', "Hasta", 11)]:
+            ttk.Label(query_fields_frame, text=label, background=bg_color).pack(side=tk.LEFT, padx=(5, 2))
+            variable = tk.StringVar()
+            ttk.Entry(query_fields_frame, textvariable=variable, width=width).pack(side=tk.LEFT)
+            self.query_vars[key] = variable
+        
+        query_buttons_frame = ttk.Frame(query_frame)
+        query_buttons_frame.pack(pady=(5, 0))
+        ttk.Button(
+            query_buttons_frame,
+            text="Consultar Partidos",
+            command=self.query_games,
+            style="TButton",
+            width=22
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Button(
+            query_buttons_frame,
+            text="Resumen por Equipo",
+            command=lambda: self.query_games(summary=True),
+            style="TButton",
+            width=22
+        ).pack(side=tk.LEFT, padx=5)
+        
        
         # Terminal
         terminal_frame = ttk.LabelFrame(main_frame, text="Consola de Salida", padding=10, style="Control.TLabelframe")
         terminal_frame.pack(fill=tk.BOTH, expand=True)
         
-        self.terminal = scrolledtext.ScrolledText(
+        self.terminal = TerminalView(
             terminal_frame,
+            max_lines=self.TERMINAL_MAX_LINES,
             bg='black',
             fg=console_fg_color,
             font=('Courier New', 10),
@@ -199,7 +297,23 @@ class NBAETLInterface:
             command=self.show_logs,
             style="TButton"
         )
-        refresh_logs_btn.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        refresh_logs_btn.pack(side=tk.LEFT, padx=(0, 5), fill=tk.X, expand=True)
+        
+        combined_logs_btn = ttk.Button(
+            terminal_buttons_frame,
+            text="Logs Combinados",
+            command=self.show_combined_logs,
+            style="TButton"
+        )
+        combined_logs_btn.pack(side=tk.LEFT, padx=(0, 5), fill=tk.X, expand=True)
+        
+        self.follow_logs_btn = ttk.Button(
+            terminal_buttons_frame,
+            text="Seguir Logs",
+            command=self.toggle_follow_logs,
+            style="TButton"
+        )
+        self.follow_logs_btn.pack(side=tk.LEFT, fill=tk.X, expand=True)
         
         # Pie de página
         footer_text = "NBA Playoffs ETL Dashboard | Desarrollado por Juan Diego Díaz Guzmán | " + datetime.datetime.now().strftime("%Y")
@@ -220,6 +334,12 @@ class NBAETLInterface:
         style.map("FullProcess.TButton", 
                  background=[('active', '#00a000')])
 
+    def on_close(self):
+        """Detiene el worker y cierra el historial de la consola antes de salir"""
+        self.worker.stop()
+        self.terminal.close()
+        self.root.destroy()
+
     def check_directories(self):
         """Verifica que existan los directorios necesarios para el sistema"""
         dirs = ['logs', 'staging', 'processed_data']
@@ -232,16 +352,16 @@ class NBAETLInterface:
     def append_to_terminal(self, text):
         """Añade texto a la terminal con timestamp"""
         timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        self.terminal.configure(state='normal')
-        self.terminal.insert(tk.END, f"\n[{timestamp}] {text}")
-        self.terminal.see(tk.END)
-        self.terminal.configure(state='disabled')
+        self.terminal.append(f"[{timestamp}] {text}")
+    
+    def append_lines_to_terminal(self, lines):
+        """Añade varias líneas con una sola inserción en la terminal"""
+        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
+        self.terminal.extend(f"[{timestamp}] {line}" for line in lines)
     
     def clear_terminal(self):
         """Limpia la terminal"""
-        self.terminal.configure(state='normal')
-        self.terminal.delete(1.0, tk.END)
-        self.terminal.configure(state='disabled')
+        self.terminal.clear()
         self.append_to_terminal("Terminal limpiada.")
         self.append_to_terminal("NBA Playoffs ETL Dashboard listo.")
     
@@ -261,54 +381,114 @@ class NBAETLInterface:
         if stage_index is not None:
             self.update_status_indicator(self.stage_indicators[stage_index], "running")
             self.stage_statuses[stage_index] = "running"
-        
-        # Iniciar la ejecución en un hilo separado
-        thread = threading.Thread(
-            target=self._run_script_thread, 
-            args=(script_name, stage_index, part_of_sequence), 
-            daemon=True
+            self.stage_progress[stage_index]['value'] = 0
+        
+        # Ejecutar en el worker; la salida y el resultado llegan por la cola de la interfaz
+        self._run_in_worker(script_name, [], stage_index, part_of_sequence)
+        return True
+    
+    def _script_env(self, part_of_sequence):
+        """Variables de los scripts: eventos de progreso y sesión de caché"""
+        env = {PROGRESS_ENV: '1'}
+        if part_of_sequence and self.session_id:
+            env[SESSION_ENV] = self.session_id
+        return env
+    
+    def _process_env(self, part_of_sequence):
+        """Entorno de los scripts lanzados como proceso aparte"""
+        env = dict(os.environ)
+        env['PYTHONUNBUFFERED'] = '1'
+        env.update(self._script_env(part_of_sequence))
+        return env
+    
+    def _run_in_worker(self, script_name, argv, stage_index, part_of_sequence):
+        """Ejecuta un script en el worker persistente"""
+        def on_result(response):
+            if response.get('ok'):
+                return_code = response['result']['return_code']
+            else:
+                self.output_queue.put(('line', stage_index, f"Error: {response.get('error')}"))
+                return_code = 1
+            self.output_queue.put(('done', script_name, return_code, stage_index, part_of_sequence))
+        
+        self.worker.call(
+            'run_script',
+            path=script_name,
+            argv=argv,
+            env=self._script_env(part_of_sequence),
+            on_output=lambda line: self.output_queue.put(('line', stage_index, line)),
+            on_result=on_result
         )
-        thread.start()
-        
-        if part_of_sequence:
-            # Si es parte de una secuencia, esperamos a que termine antes de continuar
-            return thread
-        else:
-            return True
     
-    def _run_script_thread(self, script_name, stage_index, part_of_sequence):
-        """Hilo para ejecutar un script Python"""
+    def _stream_process(self, cmd, stage_index, part_of_sequence):
+        """Lee la salida del proceso línea a línea y la envía a la cola de la interfaz"""
         try:
-            # Ejecutar el proceso
             process = subprocess.Popen(
-                ['python', script_name],
+                cmd,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
                 text=True,
-                encoding='utf-8'  # Especificar la codificación utf-8
+                encoding='utf-8',  # Especificar la codificación utf-8
+                errors='replace',
+                bufsize=1,
+                env=self._process_env(part_of_sequence)
             )
-            
-            # Capturar salida
-            stdout, stderr = process.communicate()
-            
-            # Actualizar la interfaz desde el hilo principal
-            if part_of_sequence:
-                self.root.after(0, lambda: self._script_completed_in_sequence(
-                    script_name, process.returncode, stdout, stderr, stage_index))
-            else:
-                self.root.after(0, lambda: self._script_completed(
-                    script_name, process.returncode, stdout, stderr, stage_index))
-            
+            for line in process.stdout:
+                self.output_queue.put(('line', stage_index, line.rstrip('\n')))
+            return process.wait()
         except Exception as e:
-            # Actualizar la interfaz desde el hilo principal en caso de error
-            if part_of_sequence:
-                self.root.after(0, lambda: self._script_completed_in_sequence(
-                    script_name, 1, "", str(e), stage_index))
-            else:
-                self.root.after(0, lambda: self._script_completed(
-                    script_name, 1, "", str(e), stage_index))
+            self.output_queue.put(('line', stage_index, f"Error: {str(e)}"))
+            return 1
     
-    def _script_completed(self, script_name, return_code, stdout, stderr, stage_index=None):
+    def _drain_output(self):
+        """Vuelca en la interfaz, por lotes, la salida acumulada de los procesos"""
+        lines = []
+        try:
+            for _ in range(self.MAX_ITEMS_PER_TICK):
+                item = self.output_queue.get_nowait()
+                if item[0] == 'line':
+                    _, stage_index, text = item
+                    if not self._handle_marker(stage_index, text) and text.strip():
+                        lines.append(f"  {text}")
+                elif item[0] == 'callback':
+                    if lines:
+                        self.append_lines_to_terminal(lines)
+                        lines = []
+                    item[1](*item[2:])
+                else:
+                    # Finalización: mostrar antes la salida pendiente para conservar el orden
+                    if lines:
+                        self.append_lines_to_terminal(lines)
+                        lines = []
+                    _, script_name, return_code, stage_index, part_of_sequence = item
+                    if part_of_sequence:
+                        self._script_completed_in_sequence(script_name, return_code, stage_index)
+                    else:
+                        self._script_completed(script_name, return_code, stage_index)
+        except queue.Empty:
+            pass
+        
+        if lines:
+            self.append_lines_to_terminal(lines)
+        self.root.after(self.DRAIN_INTERVAL_MS, self._drain_output)
+    
+    def _handle_marker(self, stage_index, text):
+        """Procesa las líneas de protocolo (progreso y caché); devuelve True si lo eran"""
+        if text.startswith(PROGRESS_MARKER):
+            try:
+                event = json.loads(text[len(PROGRESS_MARKER):])
+                if stage_index is not None and event.get('total'):
+                    self.stage_progress[stage_index]['value'] = 100 * event['current'] / event['total']
+            except (ValueError, TypeError, KeyError):
+                pass
+            return True
+        if text.startswith(CACHED_MARKER):
+            if stage_index is not None:
+                self.cached_stages.add(stage_index)
+            return True
+        return False
+    
+    def _script_completed(self, script_name, return_code, stage_index=None):
         """Maneja la finalización de un script"""
         self.process_running = False
         self.enable_buttons()
@@ -318,49 +498,30 @@ class NBAETLInterface:
             status = "success" if return_code == 0 else "error"
             self.update_status_indicator(self.stage_indicators[stage_index], status)
             self.stage_statuses[stage_index] = status
+            if return_code == 0:
+                self.stage_progress[stage_index]['value'] = 100
         
         if return_code == 0:
             self.append_to_terminal(f"Proceso {script_name} completado con éxito.")
         else:
             self.append_to_terminal(f"Error en el proceso {script_name}. Código: {return_code}")
-            if stderr:
-                self.append_to_terminal(f"Error: {stderr}")
-        
-        # Mostrar la salida detallada
-        if stdout:
-            output_lines = stdout.split('\n')
-            for line in output_lines:
-                if line.strip():
-                    self.append_to_terminal(f"  {line}")
     
-    def _script_completed_in_sequence(self, script_name, return_code, stdout, stderr, stage_index):
+    def _script_completed_in_sequence(self, script_name, return_code, stage_index):
         """Maneja la finalización de un script en la secuencia automática"""
         # Actualizar indicador de estado
-        status = "success" if return_code == 0 else "error"
+        cached = return_code == 0 and stage_index in self.cached_stages
+        status = "cached" if cached else ("success" if return_code == 0 else "error")
         self.update_status_indicator(self.stage_indicators[stage_index], status)
         self.stage_statuses[stage_index] = status
-        
         if return_code == 0:
+            self.stage_progress[stage_index]['value'] = 100
+        
+        if cached:
+            self.append_to_terminal(f"[ETAPA {stage_index+1}] {script_name} omitido: resultado en caché de la sesión.")
+        elif return_code == 0:
             self.append_to_terminal(f"[ETAPA {stage_index+1}] Proceso {script_name} completado con éxito.")
         else:
             self.append_to_terminal(f"[ETAPA {stage_index+1}] Error en el proceso {script_name}. Código: {return_code}")
-            if stderr:
-                self.append_to_terminal(f"Error: {stderr}")
-        
-        # Mostrar la salida resumida (solo si hay éxito o es importante)
-        if stdout and return_code == 0:
-            output_lines = stdout.split('\n')
-            # Mostrar solo algunas líneas relevantes para no saturar la consola
-            relevant_lines = [line for line in output_lines if line.strip() and 
-                             ("completado" in line.lower() or 
-                              "error" in line.lower() or 
-                              "insertados" in line.lower() or
-                              "registros" in line.lower())]
-            
-            if relevant_lines:
-                self.append_to_terminal("Resumen de salida:")
-                for line in relevant_lines[:5]:  # Limitar a 5 líneas máximo
-                    self.append_to_terminal(f"  {line}")
         
         # Continuar con la siguiente etapa en la secuencia automática
         self.current_stage = stage_index + 1
@@ -388,66 +549,37 @@ class NBAETLInterface:
             
             # Actualizar indicador de estado
             self.update_status_indicator(self.stage_indicators[3], "running")
+            self.stage_progress[3]['value'] = 0
             
-            # Preparar el comando
-            cmd = ['python', 'processed_data/scripts/automaticetl.py']
             if not result:
-                cmd.append('--no-schedule')
                 self.append_to_terminal("Ejecutando en modo sin programación...")
-            else:
-                self.append_to_terminal("Ejecutando en modo programado...")
-        else:
-            # En secuencia automática, ejecutar siempre sin programación
-            cmd = ['python', 'processed_data/scripts/automaticetl.py', '--no-schedule']
-            self.append_to_terminal("[ETAPA 4] Ejecutando automaticetl.py en modo sin programación...")
+                self._run_in_worker('processed_data/scripts/automaticetl.py', ['--no-schedule'], 3, False)
+                return True
             
-            # Actualizar indicador de estado
-            self.update_status_indicator(self.stage_indicators[3], "running")
+            # El modo programado es un servicio permanente: se ejecuta en su propio proceso
+            self.append_to_terminal("Ejecutando en modo programado...")
+            cmd = ['python', 'processed_data/scripts/automaticetl.py']
+            thread = threading.Thread(
+                target=self._run_auto_thread, 
+                args=(cmd, part_of_sequence), 
+                daemon=True
+            )
+            thread.start()
+            return True
         
-        # Iniciar la ejecución en un hilo separado
-        thread = threading.Thread(
-            target=self._run_auto_thread, 
-            args=(cmd, part_of_sequence), 
-            daemon=True
-        )
-        thread.start()
+        # En secuencia automática, ejecutar siempre sin programación
+        self.append_to_terminal("[ETAPA 4] Ejecutando automaticetl.py en modo sin programación...")
         
-        if part_of_sequence:
-            return thread
-        else:
-            return True
+        # Actualizar indicador de estado
+        self.update_status_indicator(self.stage_indicators[3], "running")
+        self.stage_progress[3]['value'] = 0
+        self._run_in_worker('processed_data/scripts/automaticetl.py', ['--no-schedule'], 3, True)
+        return True
     
     def _run_auto_thread(self, cmd, part_of_sequence):
         """Hilo para ejecutar el script de automatización"""
-        try:
-            # Ejecutar el proceso
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                encoding='utf-8'  
-            )
-            
-            # Capturar salida
-            stdout, stderr = process.communicate()
-            
-            # Actualizar la interfaz desde el hilo principal
-            if part_of_sequence:
-                self.root.after(0, lambda: self._script_completed_in_sequence(
-                    "automaticetl.py", process.returncode, stdout, stderr, 3))
-            else:
-                self.root.after(0, lambda: self._script_completed(
-                    "automaticetl.py", process.returncode, stdout, stderr, 3))
-            
-        except Exception as e:
-            # Actualizar la interfaz desde el hilo principal en caso de error
-            if part_of_sequence:
-                self.root.after(0, lambda: self._script_completed_in_sequence(
-                    "automaticetl.py", 1, "", str(e), 3))
-            else:
-                self.root.after(0, lambda: self._script_completed(
-                    "automaticetl.py", 1, "", str(e), 3))
+        return_code = self._stream_process(cmd, 3, part_of_sequence)
+        self.output_queue.put(('done', "automaticetl.py", return_code, 3, part_of_sequence))
                 
     def run_full_process(self):
         """Ejecuta el proceso ETL completo en secuencia"""
@@ -473,11 +605,14 @@ class NBAETLInterface:
         # Resetear estado de la secuencia
         self.process_running = True
         self.current_stage = 0
+        self.session_id = f"panel_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
         self.stage_statuses = ["pending", "pending", "pending", "pending"]
         
         # Resetear indicadores visuales
         for i in range(4):
             self.update_status_indicator(self.stage_indicators[i], "idle")
+            self.stage_progress[i]['value'] = 0
+        self.cached_stages = set()
         
         # Deshabilitar botones durante la secuencia
         self.disable_buttons()
@@ -521,11 +656,13 @@ class NBAETLInterface:
     def sequence_completed(self):
         """Maneja la finalización de la secuencia automática"""
         self.process_running = False
+        self.session_id = None
         self.enable_buttons()
         
         # Verificar estado de cada etapa
         errors = sum(1 for status in self.stage_statuses if status == "error")
-        success = sum(1 for status in self.stage_statuses if status == "success")
+        cached = sum(1 for status in self.stage_statuses if status == "cached")
+        success = sum(1 for status in self.stage_statuses if status == "success") + cached
         
         # Mensaje final
         self.append_to_terminal("")
@@ -533,6 +670,8 @@ class NBAETLInterface:
         if errors == 0:
             self.append_to_terminal("¡PROCESO ETL COMPLETO FINALIZADO CON ÉXITO!")
             self.append_to_terminal(f"Se completaron las {success} etapas correctamente.")
+            if cached:
+                self.append_to_terminal(f"{cached} etapas omitidas por reutilizar resultados de la sesión.")
             
             # Verificar estado de la base de datos automáticamente
             self.append_to_terminal("")
@@ -552,8 +691,6 @@ class NBAETLInterface:
     
     def clear_database(self):
         """Limpieza de base de datos"""
-        self.append_to_terminal("Preparando script para limpiar la base de datos...")
-        
         # Preguntar confirmación
         result = messagebox.askyesno(
             "Confirmar limpieza",
@@ -566,221 +703,192 @@ class NBAETLInterface:
             self.append_to_terminal("Operación de limpieza cancelada.")
             return
         
-        # Crear script temporal
-        script_content = """
-import psycopg2
-
-# Configuración de la base de datos
-db_config = {
-    "host": "localhost",
-    "port": "5432",
-    "database": "nba_playoffs",
-    "user": "postgres",
-    "password": "123"
-}
-
-try:
-    # Conectar a la base de datos
-    conn = psycopg2.connect(
-        dbname=db_config["database"],
-        user=db_config["user"],
-        password=db_config["password"],
-        host=db_config["host"],
-        port=db_config["port"]
-    )
-    
-    # Crear cursor
-    cursor = conn.cursor()
-    
-    # Truncar tablas
-    tables = [
-        "nba_playoffs_detailed",
-        "nba_playoffs_season_summary",
-        "nba_playoffs_team_summary",
-        "nba_playoffs_advanced"
-    ]
-    
-    for table in tables:
-        print(f"Truncando tabla {table}...")
-        cursor.execute(f"TRUNCATE TABLE {table} RESTART IDENTITY CASCADE;")
-    
-    # Commit cambios
-    conn.commit()
-    
-    # Verificar resultados
-    for table in tables:
-        cursor.execute(f"SELECT COUNT(*) FROM {table};")
-        count = cursor.fetchone()[0]
-        print(f"{table}: {count} registros")
-    
-    # Cerrar conexión
-    cursor.close()
-    conn.close()
-    
-    print("Tablas limpiadas correctamente.")
-    
-except Exception as e:
-    print(f"Error: {str(e)}")
-"""
-        
-        # Guardar script temporal
-        script_path = "temp_clear_db.py"
-        with open(script_path, "w", encoding='utf-8') as f:
-            f.write(script_content)
-        
-        # Ejecutar script
-        self.run_script(script_path)
+        self.append_to_terminal("Limpiando las tablas de la base de datos...")
+        self.worker.call(
+            'clear_database',
+            on_output=lambda line: self.output_queue.put(('line', None, line)),
+            on_result=lambda response: self.output_queue.put(('callback', self._database_cleared, response))
+        )
+    
+    def _database_cleared(self, response):
+        if response.get('ok'):
+            self.append_to_terminal("Tablas limpiadas correctamente.")
+            self.check_database(silent=True)
+        else:
+            self.append_to_terminal(f"Error al limpiar la base de datos: {response.get('error')}")
     
     def check_database(self, silent=False):
         """Verifica el estado de la base de datos"""
         if not silent:
-            self.append_to_terminal("Preparando script para verificar la base de datos...")
-        
-        # Crear script temporal
-        script_content = """
-import psycopg2
-
-# Configuración de la base de datos
-db_config = {
-    "host": "localhost",
-    "port": "5432",
-    "database": "nba_playoffs",
-    "user": "postgres",
-    "password": "123"
-}
-
-try:
-    # Conectar a la base de datos
-    conn = psycopg2.connect(
-        dbname=db_config["database"],
-        user=db_config["user"],
-        password=db_config["password"],
-        host=db_config["host"],
-        port=db_config["port"]
-    )
-    
-    # Crear cursor
-    cursor = conn.cursor()
-    
-    # Verificar tablas
-    tables = [
-        "nba_playoffs_detailed",
-        "nba_playoffs_season_summary",
-        "nba_playoffs_team_summary",
-        "nba_playoffs_advanced"
-    ]
-    
-    print("Estado de la base de datos:")
-    
-    for table in tables:
-        try:
-            cursor.execute(f"SELECT COUNT(*) FROM {table};")
-            count = cursor.fetchone()[0]
-            print(f"{table}: {count} registros")
-        except Exception as e:
-            print(f"{table}: Error al acceder - {str(e)}")
-    
-    # Muestreo de datos si hay registros
-    for table in tables:
-        try:
-            cursor.execute(f"SELECT COUNT(*) FROM {table};")
-            count = cursor.fetchone()[0]
-            
-            if count > 0:
-                print(f"\\nMuestra de {table} (primeros 2 registros):")
-                cursor.execute(f"SELECT * FROM {table} LIMIT 2;")
-                columns = [desc[0] for desc in cursor.description]
-                print(f"Columnas: {', '.join(columns)}")
-                
-                rows = cursor.fetchall()
-                for i, row in enumerate(rows):
-                    print(f"Registro {i+1}:", end=" ")
-                    # Mostrar solo primeros 3 valores para no saturar la salida
-                    print(f"{row[:3]}...")
-        except Exception as e:
-            pass
-    
-    # Cerrar conexión
-    cursor.close()
-    conn.close()
-    
-    print("\\nVerificación completada.")
+            self.append_to_terminal("Verificando la base de datos...")
+        
+        # A petición: conteo exacto y muestra; en modo silencioso bastan las estimaciones
+        self.worker.call(
+            'check_database',
+            exact=not silent,
+            sample_rows=0 if silent else 2,
+            refresh=True,
+            on_result=lambda response: self.output_queue.put(('callback', self._show_database_status, response, silent))
+        )
     
-except Exception as e:
-    print(f"Error al conectar a la base de datos: {str(e)}")
-"""
+    def _show_database_status(self, response, silent):
+        """Muestra en la consola el resultado de check_database"""
+        if not response.get('ok'):
+            self.append_to_terminal(f"Error al conectar a la base de datos: {response.get('error')}")
+            return
         
-        # Guardar script temporal
-        script_path = "temp_check_db.py"
-        with open(script_path, "w", encoding='utf-8') as f:
-            f.write(script_content)
+        tables = response['result']['tables']
+        self._update_db_status_label(tables)
+        self.append_to_terminal("RESUMEN DEL ESTADO DE LA BASE DE DATOS:" if silent else "Estado de la base de datos:")
+        for table, info in tables.items():
+            if not info['exists']:
+                self.append_to_terminal(f"  {table}: no existe")
+            elif info['estimated']:
+                self.append_to_terminal(f"  {table}: ~{info['count']} registros (estimado)")
+            else:
+                self.append_to_terminal(f"  {table}: {info['count']} registros")
         
-        # Ejecutar script
         if silent:
-            # Si es silencioso (parte de secuencia), ejecutar sin interferir con estado
-            try:
-                process = subprocess.Popen(
-                    ['python', script_path],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    encoding='utf-8'
-                )
-                stdout, stderr = process.communicate()
-                
-                # Mostrar resultado resumido
-                if stdout:
-                    self.append_to_terminal("RESUMEN DEL ESTADO DE LA BASE DE DATOS:")
-                    output_lines = stdout.split('\n')
-                    # Mostrar solo las líneas con conteo de registros
-                    count_lines = [line for line in output_lines if "registros" in line]
-                    for line in count_lines:
-                        self.append_to_terminal(f"  {line}")
-            except Exception as e:
-                self.append_to_terminal(f"Error al verificar BD: {str(e)}")
+            return
+        
+        # Muestreo de datos si hay registros
+        for table, info in tables.items():
+            if info.get('sample'):
+                self.append_to_terminal(f"Muestra de {table} (primeros {len(info['sample'])} registros):")
+                self.append_to_terminal(f"  Columnas: {', '.join(info['columns'])}")
+                for i, row in enumerate(info['sample']):
+                    # Mostrar solo primeros 3 valores para no saturar la salida
+                    self.append_to_terminal(f"  Registro {i+1}: {tuple(row[:3])}...")
+        self.append_to_terminal("Verificación completada.")
+    
+    def _poll_database_status(self):
+        """Consulta periódica y barata del estado de la BD para la etiqueta de resumen"""
+        if not self.db_poll_pending:
+            self.db_poll_pending = True
+            self.worker.call(
+                'check_database',
+                on_result=lambda response: self.output_queue.put(('callback', self._database_polled, response))
+            )
+        self.root.after(self.DB_POLL_INTERVAL_MS, self._poll_database_status)
+    
+    def _database_polled(self, response):
+        self.db_poll_pending = False
+        if response.get('ok'):
+            self._update_db_status_label(response['result']['tables'])
         else:
-            # Ejecución normal
-            self.run_script(script_path)
+            self.db_status_label.configure(text="Estado de BD: sin conexión")
+    
+    def _update_db_status_label(self, tables):
+        parts = []
+        for table, info in tables.items():
+            name = table.replace('nba_playoffs_', '')
+            if not info['exists']:
+                parts.append(f"{name}: -")
+            else:
+                parts.append(f"{name}: {'~' if info['estimated'] else ''}{info['count']}")
+        self.db_status_label.configure(text="Estado de BD: " + " | ".join(parts))
     
+    def restart_worker(self):
+        """Reinicia el worker del panel (aislamiento o recarga de los scripts)"""
+        if self.process_running:
+            result = messagebox.askyesno(
+                "Reiniciar worker",
+                "Hay un proceso en ejecución. Reiniciar el worker lo interrumpirá.\n\n¿Desea continuar?",
+                icon='warning'
+            )
+            if not result:
+                return
+        self.append_to_terminal("Reiniciando worker...")
+        threading.Thread(target=self.worker.restart, daemon=True).start()
     
     
-    def show_logs(self):
-        """Muestra logs recientes"""
-        self.append_to_terminal("Buscando archivos de log recientes...")
+    def show_logs(self, combined=False):
+        """Muestra las últimas líneas del log más reciente (o de todos, intercaladas por fecha)"""
+        if combined:
+            self.append_to_terminal("Combinando los logs recientes del pipeline por fecha...")
+        else:
+            self.append_to_terminal("Buscando archivos de log recientes...")
         
-        logs_dir = Path("logs")
-        if not logs_dir.exists():
-            self.append_to_terminal("No se encontró el directorio de logs.")
+        self.worker.call(
+            'tail_logs',
+            combined=combined,
+            lines=self.COMBINED_LOG_LINES if combined else self.LOG_TAIL_LINES,
+            on_result=lambda response: self.output_queue.put(('callback', self._show_log_tail, response, combined))
+        )
+    
+    def show_combined_logs(self):
+        self.show_logs(combined=True)
+    
+    def _show_log_tail(self, response, combined):
+        if not response.get('ok'):
+            self.append_to_terminal(f"Error al leer los logs: {response.get('error')}")
             return
         
-        # Buscar archivos de log
-        log_files = []
-        for pattern in ["repo_extraction_*.log", "etl_process_*.log", "etl_automation_*.log", "advanced_transform_*.log"]:
-            log_files.extend(logs_dir.glob(pattern))
-        
-        if not log_files:
+        files = response['result']['files']
+        lines = response['result']['lines']
+        if not files:
             self.append_to_terminal("No se encontraron archivos de log.")
             return
         
-        # Ordenar por fecha de modificación (el más reciente primero)
-        log_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+        self.append_to_terminal(f"Mostrando contenido de: {', '.join(files)}")
+        self.append_lines_to_terminal([f"  {line}" for line in lines])
+        self.append_to_terminal(f"Mostradas las últimas {len(lines)} líneas"
+                                + (" combinadas" if combined else f" de {files[0]}"))
+    
+    def toggle_follow_logs(self):
+        """Inicia o detiene el seguimiento en vivo de los logs"""
+        if self.follow_request is not None:
+            self.worker.call('cancel', target=self.follow_request)
+            return
+        
+        self.append_to_terminal("Siguiendo los logs del pipeline (líneas nuevas en vivo)...")
+        self.follow_logs_btn.configure(text="Detener Seguimiento")
+        self.follow_request = self.worker.call(
+            'follow_logs',
+            combined=True,
+            on_output=lambda line: self.output_queue.put(('line', None, f"  {line}")),
+            on_result=lambda response: self.output_queue.put(('callback', self._follow_logs_finished, response))
+        )
+    
+    def _follow_logs_finished(self, response):
+        self.follow_request = None
+        self.follow_logs_btn.configure(text="Seguir Logs")
+        if response.get('ok'):
+            self.append_to_terminal(f"Seguimiento de logs detenido ({response['result']['lines']} líneas nuevas)")
+        else:
+            self.append_to_terminal(f"Seguimiento de logs interrumpido: {response.get('error')}")
+    
+    def query_games(self, summary=False):
+        """Consulta el índice de partidos del worker con los filtros del formulario"""
+        filters = {key: variable.get().strip() for key, variable in self.query_vars.items()}
+        description = ", ".join(f"{key}={value}" for key, value in filters.items() if value) or "sin filtros"
+        self.append_to_terminal(f"{'Resumen por equipo' if summary else 'Consulta de partidos'} ({description})...")
+        self.worker.call(
+            'query_games',
+            summary=summary,
+            limit=self.QUERY_ROW_LIMIT,
+            **filters,
+            on_result=lambda response: self.output_queue.put(('callback', self._show_query_result, response))
+        )
+    
+    def _show_query_result(self, response):
+        if not response.get('ok'):
+            self.append_to_terminal(f"Error en la consulta: {response.get('error')}")
+            return
         
-        # Mostrar el log más reciente
-        latest_log = log_files[0]
-        self.append_to_terminal(f"Mostrando contenido de: {latest_log.name}")
+        result = response['result']
+        if not result['total']:
+            self.append_to_terminal("Ninguna fila coincide con la consulta.")
+            return
         
-        try:
-            with open(latest_log, "r", encoding='latin-1') as f:
-                # Leer las últimas 20 líneas
-                lines = f.readlines()
-                last_lines = lines[-20:] if len(lines) > 20 else lines
-                
-                for line in last_lines:
-                    self.append_to_terminal(f"  {line.strip()}")
-                
-                self.append_to_terminal(f"Mostradas las últimas {len(last_lines)} líneas de {latest_log.name}")
-        except Exception as e:
-            self.append_to_terminal(f"Error al leer el archivo de log: {str(e)}")
+        # Tabla de ancho fijo para la consola
+        columns, rows = result['columns'], result['rows']
+        widths = [max(len(column), *(len(row[i]) for row in rows)) for i, column in enumerate(columns)]
+        lines = ["  " + "  ".join(column.ljust(width) for column, width in zip(columns, widths))]
+        lines += ["  " + "  ".join(value.ljust(width) for value, width in zip(row, widths)) for row in rows]
+        self.append_lines_to_terminal(lines)
+        shown = f"{len(rows)} de {result['total']}" if result['total'] > len(rows) else str(result['total'])
+        self.append_to_terminal(f"{shown} filas (origen: {result['source']})")
     
     def disable_buttons(self):
         """Deshabilita todos los botones durante el procesamiento"""
@@ -813,11 +921,16 @@ except Exception as e:
             "pending": "#CCCCCC",    # Gris claro
             "running": "#FFCC00",    # Amarillo
             "success": "#33CC33",    # Verde
-            "error": "#FF3333"       # Rojo
+            "error": "#FF3333",      # Rojo
+            "cached": "#3399FF"      # Azul: omitida (caché)
         }
         
         # Dibujar círculo
         canvas.create_oval(2, 2, 15, 15, fill=colors[status], outline="")
+        
+        label = self.stage_status_labels.get(canvas)
+        if label is not None:
+            label.configure(text="omitida (caché)" if status == "cached" else "")
 
 
 if __name__ == "__main__":
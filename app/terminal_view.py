@@ -0,0 +1,97 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 25-03-2025
+Consola del panel con límite de líneas, inserción por lotes e historial en archivo
+"""
+
+import tkinter as tk
+from tkinter import scrolledtext
+from collections import deque
+import datetime
+from pathlib import Path
+
+
+class TerminalView:
+    """Consola de solo lectura basada en un buffer circular.
+
+    Las líneas añadidas se acumulan y se insertan de una vez en cada frame
+    (flush_ms). El widget conserva como máximo max_lines líneas; el historial
+    completo se vuelca a logs/console_<fecha>.log.
+    """
+
+    def __init__(self, parent, max_lines=5000, flush_ms=33, history_dir='logs', **text_options):
+        self.max_lines = max_lines
+        self.flush_ms = flush_ms
+        self.widget = scrolledtext.ScrolledText(parent, **text_options)
+        self.widget.configure(state='disabled')
+
+        # Líneas visibles en el widget y líneas pendientes del próximo frame
+        self.lines = deque(maxlen=max_lines)
+        self.pending = deque(maxlen=max_lines)
+        self.flush_scheduled = False
+
+        self.history_file = None
+        self.history_path = None
+        try:
+            history_dir = Path(history_dir)
+            history_dir.mkdir(parents=True, exist_ok=True)
+            self.history_path = history_dir / f"console_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+            self.history_file = open(self.history_path, 'a', encoding='utf-8')
+        except OSError:
+            # Sin historial en disco la consola sigue funcionando
+            self.history_file = None
+
+    def pack(self, **options):
+        self.widget.pack(**options)
+
+    def append(self, line):
+        self.extend([line])
+
+    def extend(self, lines):
+        """Encola líneas; se mostrarán en el próximo frame"""
+        # Cada línea del widget debe corresponder a una entrada del buffer
+        lines = [part for line in lines for part in str(line).split('\n')]
+        if not lines:
+            return
+        self.pending.extend(lines)
+        if self.history_file:
+            self.history_file.write('\n'.join(lines) + '\n')
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.widget.after(self.flush_ms, self.flush)
+
+    def flush(self):
+        """Inserta todas las líneas pendientes con una sola operación"""
+        self.flush_scheduled = False
+        if not self.pending:
+            return
+
+        batch = list(self.pending)
+        self.pending.clear()
+        # Líneas que saldrán del buffer al añadir el lote
+        overflow = max(0, len(self.lines) + len(batch) - self.max_lines)
+        self.lines.extend(batch)
+
+        self.widget.configure(state='normal')
+        if overflow:
+            self.widget.delete('1.0', f'{overflow + 1}.0')
+        self.widget.insert(tk.END, '\n'.join(batch) + '\n')
+        self.widget.see(tk.END)
+        self.widget.configure(state='disabled')
+
+        if self.history_file:
+            self.history_file.flush()
+
+    def clear(self):
+        """Vacía la consola; el historial en disco se conserva"""
+        self.lines.clear()
+        self.pending.clear()
+        self.widget.configure(state='normal')
+        self.widget.delete('1.0', tk.END)
+        self.widget.configure(state='disabled')
+
+    def close(self):
+        self.flush()
+        if self.history_file:
+            self.history_file.close()
+            self.history_file = None
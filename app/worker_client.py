@@ -0,0 +1,133 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 25-03-2025
+Cliente del worker persistente del panel (processed_data/scripts/panel_worker.py)
+"""
+
+import subprocess
+import threading
+import itertools
+import json
+import sys
+import os
+
+
+class WorkerClient:
+    """Lanza el worker y le envía peticiones JSON sin bloquear la interfaz.
+
+    Los callbacks on_output(línea) y on_result(respuesta) se invocan desde el
+    hilo lector: quien los registre debe pasar los datos al hilo de Tk.
+    Si el worker termina, las peticiones pendientes reciben un error y la
+    siguiente llamada lo vuelve a arrancar.
+    """
+
+    def __init__(self, script='processed_data/scripts/panel_worker.py', on_log=None):
+        self.script = script
+        self.on_log = on_log or (lambda line: None)
+        self.process = None
+        self.ready = threading.Event()
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.ids = itertools.count(1)
+        self.info = {}
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        with self.lock:
+            if self.alive:
+                return
+            self.ready.clear()
+            self.process = subprocess.Popen(
+                [sys.executable, self.script],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                bufsize=1,
+                env=dict(os.environ, PYTHONUNBUFFERED='1')
+            )
+            process = self.process
+        threading.Thread(target=self._read_messages, args=(process,), daemon=True).start()
+        threading.Thread(target=self._read_stderr, args=(process,), daemon=True).start()
+
+    def stop(self):
+        with self.lock:
+            process, self.process = self.process, None
+        if process is None:
+            return
+        try:
+            process.stdin.write(json.dumps({'cmd': 'shutdown'}) + '\n')
+            process.stdin.flush()
+            process.wait(timeout=3)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            process.kill()
+        self._fail_pending("El worker se ha detenido")
+
+    def restart(self):
+        """Reinicia el worker (descarta módulos en memoria y scripts en curso)"""
+        self.stop()
+        self.start()
+
+    def call(self, cmd, on_result=None, on_output=None, **args):
+        """Envía una petición y devuelve su id; la respuesta llega por on_result"""
+        if not self.alive:
+            self.start()
+        request_id = next(self.ids)
+        with self.lock:
+            self.pending[request_id] = (on_result, on_output)
+            try:
+                self.process.stdin.write(json.dumps({'id': request_id, 'cmd': cmd, 'args': args}) + '\n')
+                self.process.stdin.flush()
+            except (OSError, ValueError) as e:
+                self.pending.pop(request_id, None)
+                if on_result:
+                    on_result({'id': request_id, 'ok': False, 'error': f"Worker no disponible: {str(e)}"})
+        return request_id
+
+    def _read_messages(self, process):
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                self.on_log(line.rstrip('\n'))
+                continue
+
+            kind = message.get('type')
+            if kind == 'ready':
+                self.info = message
+                self.ready.set()
+                self.on_log(f"Worker listo (pid {message.get('pid')}): "
+                            f"{', '.join(message.get('preloaded', []))}")
+            elif kind == 'output':
+                callbacks = self.pending.get(message.get('id'))
+                if callbacks and callbacks[1]:
+                    callbacks[1](message.get('line', ''))
+                else:
+                    self.on_log(message.get('line', ''))
+            elif kind == 'result':
+                with self.lock:
+                    callbacks = self.pending.pop(message.get('id'), None)
+                if callbacks and callbacks[0]:
+                    callbacks[0](message)
+            else:
+                self.on_log(message.get('error', line.rstrip('\n')))
+
+        # Fin de la salida: el worker ha terminado
+        if process is self.process or self.process is None:
+            self._fail_pending(f"El worker terminó (código {process.wait()})")
+
+    def _read_stderr(self, process):
+        for line in process.stderr:
+            self.on_log(line.rstrip('\n'))
+
+    def _fail_pending(self, error):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        for request_id, (on_result, _) in pending.items():
+            if on_result:
+                on_result({'id': request_id, 'ok': False, 'error': error})
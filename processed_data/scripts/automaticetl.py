@@ -3,16 +3,24 @@ Autor: Juan Diego Díaz Guzmán
 Fecha: 13-03-2025
 """
 
-import schedule
 import time
+import random
 from datetime import datetime
-import logging
 import sys
 import os
 from pathlib import Path
 import argparse
 import subprocess
 from nba_etl import NBAPlayoffsETL
+from test_extraction import RepositoryToStaging
+from etl_errors import FatalStageError, RetryableStageError, classify
+from scheduler import EventScheduler
+from staging_watcher import StagingWatcher
+from run_coordinator import RunCoordinator, PIPELINE_LOCK
+from run_cache import RunCache
+from progress import emit_progress
+from logging_setup import setup_logging
+from compressed_io import is_csv
 
 
 class ETLAutomation:
@@ -28,12 +36,18 @@ class ETLAutomation:
                 'user': 'postgres',
                 'password': '123'
             },
-            'schedule_time': '02:00',  # Hora de ejecución diaria (formato HH:MM)
+            'schedule_time': '02:00',  # Hora de ejecución diaria (HH:MM) o expresión cron
+            'scheduler_workers': 2,
             'repo_url': 'https://github.com/NocturneBear/NBA-Data-2010-2024',
             'staging_dir': 'data/staging',
             'extract_script': 'processed_data/scripts/test_extraction.py',  
-            'max_retries': 3,
-            'retry_delay': 300  # 5 minutos entre reintentos
+            'extraction_mode': 'inprocess',  # 'subprocess' aísla la extracción en otro intérprete
+            'max_retries': 3,  # Intentos por etapa si no se indica otro valor
+            'stage_retries': {'extract': 3, 'transform': 1, 'load': 5},
+            'retry_base_delay': 5,  # Espera inicial del backoff exponencial (segundos)
+            'retry_delay': 300,  # Espera máxima entre reintentos
+            'watch_debounce': 2.0,  # Espera tras el último evento de una extracción
+            'watch_poll_interval': 5.0  # Intervalo de sondeo si inotify no está disponible
         }
         
        
@@ -42,33 +56,45 @@ class ETLAutomation:
             
         # Inicializar logger
         self.logger = self.setup_logging()
+        self.scheduler = None
+        self.coordinator = RunCoordinator(self.config['db_config'], logger=self.logger)
         
+        # Estado de la ejecución en curso
+        self.etl = None
+        self.extraction = None
+        self.stage_outcomes = {}
+
         # Crear directorios necesarios
         os.makedirs('logs', exist_ok=True)
         os.makedirs(self.config['staging_dir'], exist_ok=True)
         os.makedirs('data/processed_data', exist_ok=True)
 
     def setup_logging(self):
-    
-        log_dir = Path('logs')
-        log_dir.mkdir(exist_ok=True)
+        # Cola asíncrona y archivo logs/etl_automation_<fecha>.log con rotación
+        return setup_logging('automation', 'etl_automation')
 
-        log_file = log_dir / f'etl_automation_{datetime.now().strftime("%Y%m%d")}.log'
-        
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file),
-                logging.StreamHandler(sys.stdout)
-            ]
+    def run_extraction(self):
+        """Ejecuta la extracción y devuelve el directorio de staging y la validación"""
+        if self.config['extraction_mode'] == 'subprocess':
+            return self.run_extraction_subprocess()
+
+        self.logger.info("Iniciando proceso de extracción de repositorio (en proceso)")
+        started = time.perf_counter()
+
+        extractor = RepositoryToStaging(
+            source_repo_url=self.config['repo_url'],
+            staging_dir=self.config['staging_dir']
         )
-        return logging.getLogger(__name__)
+        result = extractor.extract_to_staging()
 
-    def run_extraction(self):
+        self.logger.info(f"Proceso de extracción completado en {time.perf_counter() - started:.2f} s: "
+                         f"{result['staging_dir']}")
+        return result
 
+    def run_extraction_subprocess(self):
+        """Ejecuta el script de extracción en un intérprete aparte"""
         try:
-            self.logger.info("Iniciando proceso de extracción de repositorio")
+            self.logger.info("Iniciando proceso de extracción de repositorio (subproceso)")
             
             # Comando para ejecutar el script de extracción
             cmd = [
@@ -90,122 +116,266 @@ class ETLAutomation:
             
             self.logger.info("Proceso de extracción completado")
             self.logger.info(f"Salida: {result.stdout}")
-            
-            if result.returncode == 0:
-                return True
-            else:
-                self.logger.error(f"Error en la extracción: {result.stderr}")
-                return False
+
+            # El subproceso no devuelve el directorio: el ETL lo buscará en el staging
+            return {'staging_dir': None, 'files': [], 'validation': {}}
                 
         except subprocess.CalledProcessError as e:
             self.logger.error(f"Error al ejecutar script de extracción: {e.stderr}")
-            return False
+            raise
         except Exception as e:
             self.logger.error(f"Error inesperado en la extracción: {str(e)}")
-            return False
+            raise
+
+    def _retry_delay(self, attempt):
+        """Backoff exponencial con jitter, acotado por retry_delay"""
+        delay = min(self.config['retry_delay'], self.config['retry_base_delay'] * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def run_stage(self, stage, func):
+        """Ejecuta una etapa reintentando solo esa etapa ante errores transitorios"""
+        max_attempts = self.config['stage_retries'].get(stage, self.config['max_retries'])
+        started = time.time()
+
+        for attempt in range(1, max_attempts + 1):
+            try:
+                result = func()
+                self.stage_outcomes[stage] = {
+                    'status': 'success',
+                    'attempts': attempt,
+                    'duration': round(time.time() - started, 2)
+                }
+                return result
+            except Exception as e:
+                error = classify(stage, e)
+                retry = isinstance(error, RetryableStageError) and attempt < max_attempts
+                self.stage_outcomes[stage] = {
+                    'status': 'retrying' if retry else 'failed',
+                    'attempts': attempt,
+                    'error': f"{type(error.cause).__name__}: {error.cause}"
+                }
+                if not retry:
+                    self.logger.error(f"{error} (intento {attempt} de {max_attempts})")
+                    raise error
+
+                delay = self._retry_delay(attempt)
+                self.logger.warning(f"{error}. Reintentando la etapa en {delay:.1f} segundos "
+                                    f"(intento {attempt} de {max_attempts})")
+                time.sleep(delay)
+
+    def _stage_extract(self):
+        self.extraction = self.run_extraction()
+
+    def _extracted_input_file(self):
+        """Archivo de entrada devuelto por la extracción (None si hay que buscarlo)"""
+        files = self.extraction['files'] if self.extraction else []
+        playoff_files = [f for f in files if 'play_off' in f.name.lower()]
+        return str(playoff_files[0]) if playoff_files else None
+
+    def _stage_transform(self):
+        # El objeto ETL se conserva entre reintentos para reutilizar los datos ya leídos
+        if self.etl is None:
+            self.etl = NBAPlayoffsETL(
+                input_file=self._extracted_input_file(),
+                db_config=self.config['db_config'],
+                staging_dir=self.config['staging_dir']
+            )
+        if self.etl.raw_data is None and not self.etl.extract():
+            raise self.etl.last_error or RuntimeError("Fallo en la lectura de datos")
+        if not self.etl.transform():
+            raise self.etl.last_error or RuntimeError("Fallo en la transformación")
+
+    def _mark_cached(self, stage):
+        self.stage_outcomes[stage] = {'status': 'cached', 'attempts': 0, 'duration': 0}
+        self.logger.info(f"Etapa '{stage}' omitida: resultado en caché de la sesión")
+
+    def _stage_load(self):
+        # Los lotes ya confirmados no se vuelven a cargar (journal de carga)
+        if not self.etl.load():
+            raise self.etl.last_error or RuntimeError("Fallo en la carga")
 
     def run_etl(self):
-   
+        """Ejecuta extracción, transformación y carga con reintentos por etapa"""
+        # Excluye el panel y las ejecuciones manuales; una petición igual en curso se reutiliza
+        return self.coordinator.run(PIPELINE_LOCK, self._run_etl,
+                                    work_id=f"automation:{self.config['repo_url']}")
+
+    def _run_etl(self):
         self.logger.info("Iniciando ejecución programada del ETL")
+        self.etl = None
+        self.extraction = None
+        self.stage_outcomes = {}
+
+        # Dentro de una sesión del panel se reutiliza lo que ya hicieron las etapas anteriores
+        cache = RunCache(logger=self.logger)
 
         try:
-            # Paso 1: Extraer datos del repositorio
-            extraction_success = self.run_extraction()
-            if not extraction_success:
-                self.logger.error("Fallo en la extracción de datos. Abortando ETL.")
-                return False
-                
+            # Cada etapa reutiliza los artefactos de las anteriores; un fallo
+            # transitorio solo repite la etapa afectada
+            emit_progress('automation', 0, 3, 'Extracción')
+            cached_extract = cache.lookup('extract')
+            if cached_extract:
+                self.extraction = {
+                    'staging_dir': Path(cached_extract['staging_dir']),
+                    'files': [Path(f) for f in cached_extract['outputs']],
+                    'validation': {}
+                }
+                self._mark_cached('extract')
+            else:
+                self.run_stage('extract', self._stage_extract)
             self.logger.info("Extracción completada. Continuando con transformación y carga.")
-                
-            # Paso 2: Ejecutar ETL en los datos extraídos
-            etl = NBAPlayoffsETL(
-                db_config=self.config['db_config'],
-                staging_dir=self.config['staging_dir']
-            )
-            
-            etl_success = etl.run_pipeline()
-            
-            if not etl_success:
-                self.logger.error("Fallo en el procesamiento ETL.")
-                return False
-                
-            # Paso 3: Crear archivo de control
-            self.logger.info("ETL ejecutado exitosamente")
-            control_file = Path('logs') / f'etl_automation_success_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt'
-            with open(control_file, 'w') as f:
-                f.write(f"ETL automatizado completado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"Repositorio fuente: {self.config['repo_url']}\n")
-            
-            return True
 
+            emit_progress('automation', 1, 3, 'Transformación')
+            fingerprint = NBAPlayoffsETL.cache_fingerprint(cache, self._extracted_input_file(), 'auto')
+            if fingerprint and cache.lookup(NBAPlayoffsETL.CACHE_STAGE, fingerprint):
+                self._mark_cached('transform')
+                self._mark_cached('load')
+            else:
+                self.run_stage('transform', self._stage_transform)
+                emit_progress('automation', 2, 3, 'Carga')
+                self.run_stage('load', self._stage_load)
+                if fingerprint:
+                    cache.record(NBAPlayoffsETL.CACHE_STAGE, fingerprint, outputs=self.etl.output_files,
+                                 input_file=self._extracted_input_file())
+
+            emit_progress('automation', 3, 3, 'ETL finalizado')
+            if all(outcome['status'] == 'cached' for outcome in self.stage_outcomes.values()):
+                cache.announce_hit('automation')
+
+        except (FatalStageError, RetryableStageError) as e:
+            self.logger.error(f"ETL abortado: {str(e)}")
+            return False
         except Exception as e:
             self.logger.error(f"Error inesperado en la automatización: {str(e)}")
             return False
 
+        # Crear archivo de control
+        self.logger.info("ETL ejecutado exitosamente")
+        control_file = Path('logs') / f'etl_automation_success_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt'
+        with open(control_file, 'w') as f:
+            f.write(f"ETL automatizado completado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(f"Repositorio fuente: {self.config['repo_url']}\n")
+            for stage, outcome in self.stage_outcomes.items():
+                f.write(f"Etapa {stage}: {outcome['status']} ({outcome['attempts']} intentos, "
+                        f"{outcome.get('duration', 0)} s)\n")
+
+        return True
+
     def run_with_retry(self):
-  
-        self.logger.info(f"Iniciando ETL con {self.config['max_retries']} intentos máximos")
-        
-        for attempt in range(1, self.config['max_retries'] + 1):
-            self.logger.info(f"Intento {attempt} de {self.config['max_retries']}")
-            
-            success = self.run_etl()
-            if success:
-                self.logger.info(f"ETL completado exitosamente en el intento {attempt}")
-                return True
-                
-            if attempt < self.config['max_retries']:
-                self.logger.warning(f"Reintentando en {self.config['retry_delay']} segundos...")
-                time.sleep(self.config['retry_delay'])
-            
-        self.logger.error(f"ETL falló después de {self.config['max_retries']} intentos")
-        return False
+        """Punto de entrada de las ejecuciones; los reintentos se hacen por etapa"""
+        budgets = ', '.join(f"{stage}={self.config['stage_retries'].get(stage, self.config['max_retries'])}"
+                            for stage in ('extract', 'transform', 'load'))
+        self.logger.info(f"Iniciando ETL con intentos máximos por etapa: {budgets}")
+
+        success = self.run_etl()
+        if success:
+            self.logger.info("ETL completado exitosamente")
+        else:
+            self.logger.error(f"ETL falló. Estado de las etapas: {self.stage_outcomes}")
+        return success
+
+    def run_for_staging_dir(self, directory):
+        """Transforma y carga una extracción ya publicada en el staging"""
+        directory = Path(directory)
+        return self.coordinator.run(PIPELINE_LOCK, lambda: self._run_for_staging_dir(directory),
+                                    work_id=f"staging:{directory.resolve()}")
+
+    def _run_for_staging_dir(self, directory):
+        self.logger.info(f"Iniciando ETL para la extracción {directory}")
+        self.etl = None
+        self.stage_outcomes = {}
+        self.extraction = {
+            'staging_dir': directory,
+            'files': sorted(f for f in directory.iterdir() if is_csv(f)),
+            'validation': {}
+        }
+
+        if self._extracted_input_file() is None:
+            self.logger.warning(f"No hay archivo de playoffs en {directory}. Se ignora la extracción.")
+            return False
+
+        try:
+            self.run_stage('transform', self._stage_transform)
+            self.run_stage('load', self._stage_load)
+        except (FatalStageError, RetryableStageError) as e:
+            self.logger.error(f"ETL abortado para {directory}: {str(e)}")
+            return False
+
+        self.logger.info(f"ETL completado para la extracción {directory}")
+        return True
+
+    def watch(self):
+        """Ejecuta el ETL cada vez que se publica una extracción nueva en el staging"""
+        self.logger.info("Iniciando vigilancia del staging")
+        watcher = StagingWatcher(
+            self.config['staging_dir'],
+            self.run_for_staging_dir,
+            debounce=self.config['watch_debounce'],
+            poll_interval=self.config['watch_poll_interval'],
+            logger=self.logger
+        )
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            self.logger.info("Deteniendo vigilancia del staging")
 
     def start(self):
       
         self.logger.info("Iniciando sistema de automatización ETL")
         
-        # Programar ejecución diaria a la hora configurada
-        schedule.every().day.at(self.config['schedule_time']).do(self.run_with_retry)
-        self.logger.info(f"ETL programado para ejecutarse diariamente a las {self.config['schedule_time']}")
-        
+        # El planificador duerme hasta la próxima ejecución y lanza los trabajos en un pool
+        self.scheduler = EventScheduler(
+            max_workers=self.config['scheduler_workers'],
+            status_file=Path('logs') / 'scheduler_status.json',
+            logger=self.logger
+        )
+        self.scheduler.add_job('etl_diario', self.config['schedule_time'], self.run_with_retry)
+        self.logger.info(f"ETL programado según '{self.config['schedule_time']}'")
         
         # Ejecutar inmediatamente la primera vez (opcional)
         self.logger.info("Ejecutando ETL inicial...")
-        self.run_with_retry()
+        self.scheduler.run_now('etl_diario')
         
         # Loop principal
-        while True:
-            try:
-                schedule.run_pending()
-                time.sleep(60)  # Verificar cada minuto
-            except KeyboardInterrupt:
-                self.logger.info("Deteniendo sistema de automatización ETL")
-                break
-            except Exception as e:
-                self.logger.error(f"Error en loop principal: {str(e)}")
-                time.sleep(300)  # Esperar 5 minutos en caso de error
+        try:
+            self.scheduler.run_forever()
+        except KeyboardInterrupt:
+            self.logger.info("Deteniendo sistema de automatización ETL")
+        finally:
+            self.scheduler.stop(wait=False)
 
 
 def main():
     parser = argparse.ArgumentParser(description='Automatización de ETL para NBA Playoffs')
-    parser.add_argument('--time', type=str, default='02:00', help='Hora de ejecución diaria (HH:MM)')
+    parser.add_argument('--time', type=str, default='02:00',
+                        help="Hora de ejecución diaria (HH:MM) o expresión cron, p. ej. '0 2 * * *'")
     parser.add_argument('--repo', type=str, default='https://github.com/NocturneBear/NBA-Data-2010-2024', 
                         help='URL del repositorio fuente')
     parser.add_argument('--no-schedule', action='store_true', help='Ejecutar una vez sin programar')
+    parser.add_argument('--subprocess-extraction', action='store_true',
+                        help='Ejecutar la extracción en un intérprete aparte (aislamiento)')
+    parser.add_argument('--watch', action='store_true',
+                        help='Ejecutar el ETL al aparecer cada nueva extracción en el staging')
+    parser.add_argument('--poll-interval', type=float, default=5.0,
+                        help='Intervalo de sondeo (segundos) si inotify no está disponible')
     
     args = parser.parse_args()
     
     # Crear configuración personalizada basada en argumentos
     config = {
         'schedule_time': args.time,
-        'repo_url': args.repo
+        'repo_url': args.repo,
+        'extraction_mode': 'subprocess' if args.subprocess_extraction else 'inprocess',
+        'watch_poll_interval': args.poll_interval
     }
     
     # Iniciar automatización
     automation = ETLAutomation(config)
     
-    if args.no_schedule:
+    if args.watch:
+        automation.watch()
+        return 0
+    elif args.no_schedule:
         print("Ejecutando ETL una vez sin programación...")
         success = automation.run_with_retry()
         return 0 if success else 1
@@ -0,0 +1,105 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Mide tiempo de escritura/lectura y tamaño en disco de los CSV según el códec y el nivel de compresión
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from compressed_io import Compression, read_csv, write_csv, zstandard
+
+
+DEFAULT_INPUT = 'data/play_off_totals_2010_2024.csv'
+
+
+def synthetic_dataset(source, scale, seed=0):
+    """Repite el CSV de playoffs scale veces con filas barajadas y estadísticas perturbadas.
+
+    Sin perturbar, cada copia sería idéntica a la anterior y zstd la comprimiría
+    casi por completo con su ventana larga, lo que falsearía los ratios.
+    """
+    df = read_csv(source)
+    rng = np.random.default_rng(seed)
+    numeric = [column for column in df.select_dtypes('number').columns if not column.endswith('_ID')]
+    parts = [df]
+    for copy in range(1, scale):
+        part = df.sample(frac=1, random_state=seed + copy).reset_index(drop=True)
+        for column in numeric:
+            if part[column].dtype.kind in 'iu':
+                part[column] = part[column] + rng.integers(-2, 3, len(part))
+            else:
+                part[column] = (part[column] * rng.uniform(0.95, 1.05, len(part))).round(3)
+        if 'GAME_ID' in part.columns:
+            part['GAME_ID'] = part['GAME_ID'] + copy * 10_000_000
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+def configurations(gzip_levels, zstd_levels, threads):
+    configs = [Compression('none')]
+    configs += [Compression('gzip', level) for level in gzip_levels]
+    if zstandard is not None:
+        for level in zstd_levels:
+            configs += [Compression('zstd', level, count) for count in threads]
+    return configs
+
+
+def measure(df, compression, runs, workdir):
+    write_times, read_times, size = [], [], 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        path = write_csv(df, Path(workdir) / 'bench.csv', compression, index=False)
+        write_times.append(time.perf_counter() - started)
+        size = path.stat().st_size
+
+        started = time.perf_counter()
+        read_csv(path)
+        read_times.append(time.perf_counter() - started)
+        path.unlink()
+    return statistics.median(write_times), statistics.median(read_times), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de compresión de los CSV del pipeline')
+    parser.add_argument('--input', type=str, default=DEFAULT_INPUT, help='CSV de entrada')
+    parser.add_argument('--scale', type=int, default=20, help='Veces que se repite la entrada')
+    parser.add_argument('--runs', type=int, default=3, help='Repeticiones por configuración')
+    parser.add_argument('--gzip-levels', type=int, nargs='+', default=[1, 6, 9], help='Niveles de gzip')
+    parser.add_argument('--zstd-levels', type=int, nargs='+', default=[1, 3, 9, 19], help='Niveles de zstd')
+    parser.add_argument('--threads', type=int, nargs='+', default=[0, -1],
+                        help='Hilos de zstd (0: un solo hilo, -1: todos los núcleos)')
+    args = parser.parse_args()
+
+    source = Path(args.input)
+    if not source.exists():
+        print(f"No existe el archivo de entrada: {source}")
+        return 1
+    df = synthetic_dataset(source, args.scale)
+    if zstandard is None:
+        print("Aviso: zstandard no está instalado; solo se mide gzip.")
+
+    results = []
+    with tempfile.TemporaryDirectory(dir=source.parent) as workdir:
+        for compression in configurations(args.gzip_levels, args.zstd_levels, args.threads):
+            results.append((compression, *measure(df, compression, args.runs, workdir)))
+
+    plain_size = results[0][3]
+    megabytes = plain_size / (1024 * 1024)
+    print(f"Datos sintéticos: {len(df)} filas, {megabytes:.1f} MB sin comprimir ({args.scale}x {source.name})")
+    print(f"{'Configuración':<34}{'Escritura':>11}{'MB/s':>8}{'Lectura':>11}{'MB/s':>8}{'Tamaño':>11}{'Ratio':>7}")
+    for compression, write_time, read_time, size in results:
+        print(f"{str(compression):<34}{write_time * 1000:>9.0f}ms{megabytes / write_time:>8.1f}"
+              f"{read_time * 1000:>9.0f}ms{megabytes / read_time:>8.1f}"
+              f"{size / (1024 * 1024):>9.1f}MB{plain_size / size:>7.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Mide el coste de arranque que evita la extracción en proceso de ETLAutomation
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+
+def measure_subprocess(runs):
+    """Arranque de un intérprete nuevo que importa el módulo de extracción"""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, '-c', 'import test_extraction'],
+            cwd=SCRIPTS_DIR,
+            check=True
+        )
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def measure_inprocess(runs, workdir):
+    """Creación del extractor dentro del proceso ya inicializado"""
+    sys.path.insert(0, str(SCRIPTS_DIR))
+    from test_extraction import RepositoryToStaging
+
+    timings = []
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for _ in range(runs):
+            started = time.perf_counter()
+            RepositoryToStaging('https://github.com/NocturneBear/NBA-Data-2010-2024')
+            timings.append(time.perf_counter() - started)
+    finally:
+        os.chdir(previous_dir)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de arranque de la extracción')
+    parser.add_argument('--runs', type=int, default=5, help='Repeticiones por modo')
+    args = parser.parse_args()
+
+    subprocess_times = measure_subprocess(args.runs)
+    with tempfile.TemporaryDirectory() as workdir:
+        inprocess_times = measure_inprocess(args.runs, workdir)
+
+    subprocess_ms = statistics.median(subprocess_times) * 1000
+    inprocess_ms = statistics.median(inprocess_times) * 1000
+
+    print(f"Subproceso (intérprete + imports): {subprocess_ms:8.1f} ms por ejecución")
+    print(f"En proceso (extractor):            {inprocess_ms:8.1f} ms por ejecución")
+    print(f"Arranque ahorrado:                 {subprocess_ms - inprocess_ms:8.1f} ms por ejecución")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
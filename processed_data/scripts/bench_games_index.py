@@ -0,0 +1,100 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Compara las consultas del índice de partidos con el filtrado por máscara booleana de pandas
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from bench_compression import synthetic_dataset
+from games_index import GamesIndex, RAW_CSV
+
+
+def mask_query(df, team, season, start, end):
+    """Flujo habitual: una comparación sobre la columna completa por cada predicado"""
+    mask = df['TEAM_NAME'] == team
+    if season is not None:
+        mask &= df['SEASON_YEAR'] == season
+    if start is not None:
+        mask &= df['GAME_DATE'] >= start
+    if end is not None:
+        mask &= df['GAME_DATE'] <= end
+    return df[mask]
+
+
+def random_queries(index, count, seed=0):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        team = rng.choice(index.teams)
+        seasons = sorted(set(index.games(team)['SEASON_YEAR']))
+        season = rng.choice(seasons) if rng.random() < 0.7 else None
+        games = index.games(team, season)
+        dates = sorted(games['GAME_DATE'])
+        if dates and rng.random() < 0.5:
+            start = dates[rng.randrange(len(dates))]
+            end = start + pd.Timedelta(days=rng.randint(3, 30))
+        else:
+            start = end = None
+        queries.append((team, season, start, end))
+    return queries
+
+
+def measure(func, queries, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        for query in queries:
+            func(*query)
+        timings.append((time.perf_counter() - started) / len(queries))
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del índice de partidos frente a máscaras booleanas')
+    parser.add_argument('--input', type=str, default=RAW_CSV, help='CSV de partidos')
+    parser.add_argument('--scale', type=int, default=20, help='Veces que se repite la entrada')
+    parser.add_argument('--queries', type=int, default=500, help='Consultas aleatorias')
+    parser.add_argument('--runs', type=int, default=3, help='Repeticiones')
+    args = parser.parse_args()
+
+    source = Path(args.input)
+    if not source.exists():
+        print(f"No existe el archivo de entrada: {source}")
+        return 1
+    df = synthetic_dataset(source, args.scale)
+    df['GAME_DATE'] = pd.to_datetime(df['GAME_DATE'])
+
+    started = time.perf_counter()
+    index = GamesIndex(df, source=source)
+    build_time = time.perf_counter() - started
+    queries = random_queries(index, args.queries)
+
+    # Ambos métodos deben devolver las mismas filas
+    for query in queries[:50]:
+        if len(index.games(*query)) != len(mask_query(df, *query)):
+            print(f"Resultados distintos para la consulta {query}")
+            return 1
+
+    mask_time = measure(lambda *query: mask_query(df, *query), queries, args.runs)
+    index_positions_time = measure(index.positions, queries, args.runs)
+    index_time = measure(index.games, queries, args.runs)
+
+    print(f"Datos: {len(df)} partidos ({args.scale}x {source.name}), {args.queries} consultas aleatorias")
+    print(f"Construcción del índice:     {build_time * 1000:8.1f} ms")
+    print(f"Máscara booleana:            {mask_time * 1e6:8.1f} µs por consulta")
+    print(f"Índice (posiciones):         {index_positions_time * 1e6:8.1f} µs por consulta")
+    print(f"Índice (DataFrame):          {index_time * 1e6:8.1f} µs por consulta")
+    print(f"Aceleración:                 {mask_time / index_time:8.1f}x con DataFrame, "
+          f"{mask_time / index_positions_time:.0f}x en posiciones")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Mide la E/S que evitan los alias enlazados en prepare_for_etl, el ETL y la transformación avanzada
+"""
+import argparse
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from fs_utils import link_or_copy
+
+
+DEFAULT_INPUT = 'data/play_off_totals_2010_2024.csv'
+
+
+def copy_handoff(source, workdir, df):
+    """Flujo anterior: copia, relectura y reescritura de cada alias"""
+    written = 0
+    target = workdir / 'play_off_totals_2010_2024.csv'
+    shutil.copy2(source, target)
+    written += target.stat().st_size
+
+    # prepare_for_etl: read_csv + to_csv sin transformación
+    processed = workdir / 'playoffs_detailed_processed.csv'
+    pd.read_csv(target).to_csv(processed, index=False)
+    written += processed.stat().st_size
+
+    # NBAPlayoffsETL.transform y save_to_files: archivo con fecha + copia con nombre constante
+    for name in ('playoffs_detailed', 'playoffs_advanced'):
+        dated = workdir / f'{name}_20250313.csv'
+        df.to_csv(dated, index=False)
+        alias = workdir / f'{name}.csv'
+        df.to_csv(alias, index=False)
+        written += dated.stat().st_size + alias.stat().st_size
+    return written
+
+
+def link_handoff(source, workdir, df):
+    """Flujo actual: los alias son enlaces (o copias si el sistema no los admite)"""
+    written = 0
+    methods = []
+    target = workdir / 'play_off_totals_2010_2024.csv'
+    methods.append(link_or_copy(source, target))
+    processed = workdir / 'playoffs_detailed_processed.csv'
+    methods.append(link_or_copy(target, processed))
+    if methods[0] == 'copy':
+        written += target.stat().st_size
+    if methods[1] == 'copy':
+        written += processed.stat().st_size
+
+    for name in ('playoffs_detailed', 'playoffs_advanced'):
+        dated = workdir / f'{name}_20250313.csv'
+        df.to_csv(dated, index=False)
+        written += dated.stat().st_size
+        method = link_or_copy(dated, workdir / f'{name}.csv')
+        methods.append(method)
+        if method == 'copy':
+            written += dated.stat().st_size
+    return written, methods
+
+
+def measure(func, runs, source, df):
+    timings, result = [], None
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory(dir=Path(source).parent) as workdir:
+            started = time.perf_counter()
+            result = func(source, Path(workdir), df)
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de los alias de archivos del pipeline')
+    parser.add_argument('--input', type=str, default=DEFAULT_INPUT, help='CSV de entrada')
+    parser.add_argument('--runs', type=int, default=5, help='Repeticiones por modo')
+    args = parser.parse_args()
+
+    source = Path(args.input)
+    if not source.exists():
+        print(f"No existe el archivo de entrada: {source}")
+        return 1
+    df = pd.read_csv(source)
+
+    copy_time, copy_bytes = measure(copy_handoff, args.runs, source, df)
+    link_time, (link_bytes, methods) = measure(link_handoff, args.runs, source, df)
+
+    print(f"Entrada: {source} ({source.stat().st_size / 1024:.0f} KB, {len(df)} filas)")
+    print(f"Copias y reescrituras: {copy_time * 1000:8.1f} ms, {copy_bytes / 1024:8.0f} KB escritos por ejecución")
+    print(f"Alias enlazados:       {link_time * 1000:8.1f} ms, {link_bytes / 1024:8.0f} KB escritos por ejecución")
+    print(f"Métodos usados:        {', '.join(methods)}")
+    print(f"E/S evitada:           {(copy_bytes - link_bytes) / 1024:8.0f} KB y "
+          f"{(copy_time - link_time) * 1000:.1f} ms por ejecución")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Índices de mapa de bits para columnas de baja cardinalidad: filtros combinados como AND de bits y conteos por popcount
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from matchup import parse_matchups
+
+
+BITMAP_COLUMNS = ['WL', 'SEASON_YEAR', 'TEAM_NAME', 'TEAM_ABBREVIATION', 'HOME_AWAY']
+META_KEY = '__meta__'
+
+if hasattr(np, 'bitwise_count'):
+    _popcount = np.bitwise_count
+else:
+    # numpy < 2.0: tabla de bits a 1 por byte
+    _POPCOUNT_TABLE = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+    def _popcount(values):
+        return _POPCOUNT_TABLE[values]
+
+
+def home_away(df):
+    """HOME/AWAY según IS_HOME (columna de matchup.py); si falta, se analiza MATCHUP"""
+    is_home = df['IS_HOME'] if 'IS_HOME' in df.columns else parse_matchups(df['MATCHUP'], {})['IS_HOME']
+    labels = np.where(is_home == 1, 'HOME', np.where(is_home == 0, 'AWAY', ''))
+    return pd.Series(labels, index=df.index)
+
+
+class BitmapIndex:
+    """Un mapa de bits empaquetado (np.packbits) por valor de cada columna indexada.
+
+    select() combina los predicados con OR dentro de una columna y AND entre
+    columnas, operando sobre n/8 bytes por mapa en lugar de comparar cada
+    columna completa; count() cuenta los bits a 1 sin materializar las filas.
+    """
+
+    def __init__(self, rows, bitmaps):
+        self.rows = rows
+        self.bitmaps = bitmaps
+        self.nbytes = (rows + 7) // 8
+
+    @classmethod
+    def build(cls, df, columns=BITMAP_COLUMNS):
+        source = df
+        if 'HOME_AWAY' in columns and 'HOME_AWAY' not in df.columns and ({'IS_HOME', 'MATCHUP'} & set(df.columns)):
+            source = df.assign(HOME_AWAY=home_away(df))
+
+        bitmaps = {}
+        for column in columns:
+            if column not in source.columns:
+                continue
+            codes, uniques = pd.factorize(source[column], sort=True)
+            bitmaps[column] = {str(value): np.packbits(codes == code) for code, value in enumerate(uniques)}
+        return cls(len(df), bitmaps)
+
+    # Persistencia
+
+    def save(self, path):
+        """Guarda todos los mapas en un .npz (una matriz por columna, una fila por valor)"""
+        path = Path(path)
+        meta = {'rows': self.rows, 'columns': {column: list(values) for column, values in self.bitmaps.items()}}
+        arrays = {column: np.vstack(list(values.values())) if values else np.empty((0, self.nbytes), dtype=np.uint8)
+                  for column, values in self.bitmaps.items()}
+        arrays[META_KEY] = np.array(json.dumps(meta, ensure_ascii=False))
+        tmp = path.with_name(f".{path.stem}.tmp.npz")
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data[META_KEY]))
+            bitmaps = {column: dict(zip(values, data[column])) for column, values in meta['columns'].items()}
+        return cls(meta['rows'], bitmaps)
+
+    # Consultas
+
+    def values(self, column):
+        return list(self.bitmaps.get(column, {}))
+
+    def select(self, predicates):
+        """Mapa de bits de las filas que cumplen {columna: valor o lista de valores}"""
+        result = np.full(self.nbytes, 0xFF, dtype=np.uint8)
+        for column, wanted in predicates.items():
+            if column not in self.bitmaps:
+                raise KeyError(f"La columna {column} no tiene índice de mapa de bits")
+            wanted = [wanted] if isinstance(wanted, str) or not hasattr(wanted, '__iter__') else wanted
+            matched = np.zeros(self.nbytes, dtype=np.uint8)
+            for value in wanted:
+                bitmap = self.bitmaps[column].get(str(value))
+                if bitmap is not None:
+                    np.bitwise_or(matched, bitmap, out=matched)
+            np.bitwise_and(result, matched, out=result)
+        # Los bits de relleno del último byte no corresponden a ninguna fila
+        if self.rows % 8:
+            result[-1] &= np.uint8((0xFF << (8 - self.rows % 8)) & 0xFF)
+        return result
+
+    def count(self, predicates):
+        """Número de filas que cumplen los predicados (popcount del mapa)"""
+        return int(_popcount(self.select(predicates)).sum(dtype=np.int64))
+
+    def positions(self, predicates):
+        """Posiciones de las filas que cumplen los predicados"""
+        return np.flatnonzero(np.unpackbits(self.select(predicates), count=self.rows))
+
+    def filter(self, df, predicates):
+        """Filas de df (en el mismo orden con que se construyó el índice) que cumplen los predicados"""
+        if len(df) != self.rows:
+            raise ValueError(f"El índice tiene {self.rows} filas y el DataFrame {len(df)}")
+        return df.iloc[self.positions(predicates)]
+
+
+def _parse_predicates(items):
+    predicates = {}
+    for item in items or []:
+        column, _, values = item.partition('=')
+        predicates[column.strip()] = [value.strip() for value in values.split(',')]
+    return predicates
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Conteo de filas con los índices de mapa de bits')
+    parser.add_argument('index', type=str, nargs='?', default='processed_data/playoffs_advanced_bitmaps.npz',
+                        help='Archivo de índices (.npz)')
+    parser.add_argument('--where', type=str, action='append',
+                        help='Predicado COLUMNA=valor[,valor...] (se puede repetir; p. ej. --where WL=W)')
+    parser.add_argument('--list', action='store_true', help='Mostrar columnas y valores indexados')
+    args = parser.parse_args()
+
+    try:
+        index = BitmapIndex.load(args.index)
+    except FileNotFoundError:
+        print(f"No existe el archivo de índices: {args.index}")
+        return 1
+
+    if args.list or not args.where:
+        for column in index.bitmaps:
+            print(f"{column} ({len(index.values(column))} valores): {', '.join(index.values(column)[:20])}")
+        if not args.where:
+            return 0
+
+    predicates = _parse_predicates(args.where)
+    started = time.perf_counter()
+    count = index.count(predicates)
+    elapsed = time.perf_counter() - started
+    print(f"{count} de {index.rows} filas cumplen {predicates} ({elapsed * 1e6:.0f} µs)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Almacén columnar en disco (.npy por columna) para recargar los datos procesados con mmap y sin copias
+"""
+import argparse
+import hashlib
+import json
+import logging
+import shutil
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from fs_utils import write_text_atomic
+
+
+HEADER_FILE = '_header.json'
+FORMAT_VERSION = 1
+
+
+def _codes_dtype(categories):
+    """Mismo tipo de códigos que usa pandas para un Categorical con tantas categorías"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if len(categories) < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _fingerprint(df):
+    digest = hashlib.sha256()
+    digest.update('\x1f'.join(f"{column}:{dtype}" for column, dtype in df.dtypes.items()).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def write_column_store(df, root, source=None, logger=None):
+    """Materializa df en root/<huella>/ y apunta _header.json a esa versión.
+
+    Numéricas y fechas: un .npy por columna. Texto: códigos enteros en .npy
+    y el diccionario de valores en la cabecera. La cabecera se escribe al
+    final y de forma atómica. La versión anterior se conserva una generación
+    más: un lector que abrió la cabecera previa mapea sus columnas al pedirlas
+    y las encuentra aunque el ETL ya haya publicado la nueva.
+    Devuelve la ruta de la cabecera.
+    """
+    logger = logger or logging.getLogger(__name__)
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    header_path = root / HEADER_FILE
+
+    fingerprint = _fingerprint(df)
+    version = fingerprint[:16]
+    store = ColumnStore(root) if header_path.exists() else None
+    if store and store.header.get('sha256') == fingerprint and (root / version).is_dir():
+        logger.info(f"Almacén columnar {root} sin cambios")
+        return header_path
+
+    tmp_dir = root / f".{version}.tmp"
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir()
+
+    columns = []
+    for position, name in enumerate(df.columns):
+        series = df[name]
+        file_name = f"{position:03d}.npy"
+        if series.dtype.kind in 'biuf':
+            np.save(tmp_dir / file_name, series.to_numpy())
+            columns.append({'name': name, 'kind': 'numeric', 'dtype': str(series.dtype), 'file': file_name})
+        elif series.dtype.kind == 'M':
+            values = series.to_numpy(dtype='datetime64[ns]')
+            np.save(tmp_dir / file_name, values)
+            columns.append({'name': name, 'kind': 'datetime', 'dtype': str(values.dtype), 'file': file_name})
+        else:
+            # Diccionario: cada valor distinto se guarda una vez; -1 representa nulo
+            codes, categories = pd.factorize(series, sort=True)
+            categories = [str(value) for value in categories]
+            np.save(tmp_dir / file_name, codes.astype(_codes_dtype(categories)))
+            columns.append({'name': name, 'kind': 'category', 'dtype': 'str', 'file': file_name,
+                            'categories': categories})
+
+    final_dir = root / version
+    if final_dir.exists():
+        shutil.rmtree(final_dir)
+    tmp_dir.rename(final_dir)
+
+    header = {
+        'format_version': FORMAT_VERSION,
+        'version': version,
+        'sha256': fingerprint,
+        'rows': len(df),
+        'source': str(source) if source else None,
+        'created_at': datetime.now().isoformat(),
+        'columns': columns
+    }
+    write_text_atomic(header_path, json.dumps(header, indent=2, ensure_ascii=False))
+
+    keep = {version, store.header.get('version')} if store else {version}
+    for old in root.iterdir():
+        if old.is_dir() and old.name not in keep and not old.name.startswith('.'):
+            shutil.rmtree(old, ignore_errors=True)
+    logger.info(f"Almacén columnar actualizado: {final_dir} ({len(columns)} columnas, {len(df)} filas)")
+    return header_path
+
+
+class ColumnStore:
+    """Lectura del almacén columnar.
+
+    column() devuelve arrays respaldados por np.load(mmap_mode='r'): abrir el
+    almacén cuesta milisegundos, no se copia nada a memoria del proceso y
+    varios procesos comparten las mismas páginas de la caché del sistema.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        with open(self.root / HEADER_FILE, encoding='utf-8') as f:
+            self.header = json.load(f)
+        if self.header.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Versión de almacén columnar no soportada: {self.header.get('format_version')}")
+        self.directory = self.root / self.header['version']
+        self.columns = {column['name']: column for column in self.header['columns']}
+        self._arrays = {}
+
+    def __len__(self):
+        return self.header['rows']
+
+    @property
+    def names(self):
+        return list(self.columns)
+
+    def _array(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = np.load(self.directory / self.columns[name]['file'], mmap_mode='r')
+        return self._arrays[name]
+
+    def column(self, name):
+        """Array mapeado de la columna (códigos enteros para las columnas de texto)"""
+        return self._array(name)
+
+    def categories(self, name):
+        """Diccionario de valores de una columna de texto (índice = código)"""
+        return self.columns[name].get('categories')
+
+    def codes_for(self, name, values):
+        """Códigos de los valores pedidos en una columna de texto (los inexistentes se ignoran)"""
+        lookup = {value: code for code, value in enumerate(self.categories(name))}
+        return np.array([lookup[value] for value in values if value in lookup], dtype=self._array(name).dtype)
+
+    def series(self, name):
+        column = self.columns[name]
+        values = self._array(name)
+        if column['kind'] == 'category':
+            # Con un dtype ya construido, from_codes solo comprueba el rango y conserva el array mapeado
+            dtype = pd.CategoricalDtype(column['categories'])
+            categorical = pd.Categorical.from_codes(values, dtype=dtype)
+            return pd.Series(categorical, name=name, copy=False)
+        return pd.Series(values, name=name, copy=False)
+
+    def to_frame(self, columns=None):
+        """DataFrame con las columnas pedidas (texto como Categorical sobre los códigos mapeados)"""
+        names = columns or self.names
+        return pd.DataFrame({name: self.series(name) for name in names}, copy=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Información y carga del almacén columnar')
+    parser.add_argument('root', type=str, nargs='?', default='data/processed_data/playoffs_detailed_columns',
+                        help='Directorio del almacén')
+    parser.add_argument('--columns', type=str, nargs='+', help='Columnas a cargar')
+    args = parser.parse_args()
+
+    try:
+        started = time.perf_counter()
+        store = ColumnStore(args.root)
+        df = store.to_frame(args.columns)
+        elapsed = time.perf_counter() - started
+    except FileNotFoundError:
+        print(f"No hay almacén columnar en {args.root}")
+        return 1
+
+    print(f"Almacén: {store.directory} (origen: {store.header['source']}, creado {store.header['created_at']})")
+    print(f"{len(store)} filas, {len(df.columns)} columnas cargadas en {elapsed * 1000:.1f} ms")
+    print(df.head(10).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Lectura y escritura de CSV comprimidos (zstd o gzip) con detección automática del formato
+"""
+import gzip
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+COMPRESSION_ENV = 'NBA_ETL_COMPRESSION'
+COMPRESSION_LEVEL_ENV = 'NBA_ETL_COMPRESSION_LEVEL'
+COMPRESSION_THREADS_ENV = 'NBA_ETL_COMPRESSION_THREADS'
+
+CODECS = ('none', 'gzip', 'zstd')
+SUFFIXES = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+DEFAULT_LEVELS = {'gzip': 6, 'zstd': 3}
+
+_MAGIC = {
+    b'\x1f\x8b': 'gzip',
+    b'\x28\xb5\x2f\xfd': 'zstd'
+}
+
+
+class Compression:
+    """Formato de las salidas: códec, nivel e hilos (zstd comprime en paralelo; gzip no).
+
+    Sin argumentos toma NBA_ETL_COMPRESSION, NBA_ETL_COMPRESSION_LEVEL y
+    NBA_ETL_COMPRESSION_THREADS; por defecto no comprime. Si se pide zstd y
+    el paquete zstandard no está instalado se usa gzip.
+    """
+
+    def __init__(self, codec=None, level=None, threads=None):
+        codec = (codec or os.environ.get(COMPRESSION_ENV) or 'none').lower()
+        if codec not in CODECS:
+            raise ValueError(f"Compresión no soportada: {codec} (opciones: {', '.join(CODECS)})")
+        if codec == 'zstd' and zstandard is None:
+            codec = 'gzip'
+        self.codec = codec
+
+        level = level if level is not None else os.environ.get(COMPRESSION_LEVEL_ENV)
+        self.level = int(level) if level not in (None, '') else DEFAULT_LEVELS.get(codec)
+        threads = threads if threads is not None else os.environ.get(COMPRESSION_THREADS_ENV)
+        # -1: tantos hilos como núcleos
+        self.threads = int(threads) if threads not in (None, '') else -1
+
+    @property
+    def enabled(self):
+        return self.codec != 'none'
+
+    @property
+    def suffix(self):
+        return SUFFIXES[self.codec]
+
+    def path(self, path):
+        """Ruta con la extensión del códec (datos.csv -> datos.csv.zst)"""
+        path = Path(path)
+        return path.with_name(path.name + self.suffix) if self.enabled else path
+
+    def pandas_options(self):
+        if self.codec == 'zstd':
+            return {'method': 'zstd', 'level': self.level, 'threads': self.threads}
+        if self.codec == 'gzip':
+            # mtime fijo: mismo contenido, mismos bytes (deduplicación en staging)
+            return {'method': 'gzip', 'compresslevel': self.level, 'mtime': 0}
+        return None
+
+    def __repr__(self):
+        if not self.enabled:
+            return 'sin compresión'
+        if self.codec == 'gzip':
+            return f"gzip nivel {self.level}"
+        threads = {0: 'un hilo', -1: 'todos los núcleos'}.get(self.threads, f"{self.threads} hilos")
+        return f"zstd nivel {self.level}, {threads}"
+
+
+def detect_compression(path):
+    """Códec de un archivo según sus primeros bytes ('none' si es texto plano)"""
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    for magic, codec in _MAGIC.items():
+        if head.startswith(magic):
+            return codec
+    return 'none'
+
+
+def is_csv(path):
+    """CSV plano o comprimido (.csv, .csv.gz, .csv.zst)"""
+    name = Path(path).name.lower()
+    return any(name.endswith('.csv' + suffix) for suffix in SUFFIXES.values())
+
+
+def find_csv(path):
+    """Versión más reciente de un CSV con nombre fijo (plano, .gz o .zst); None si no existe"""
+    path = Path(path)
+    variants = [path.with_name(path.name + suffix) for suffix in ('', '.zst', '.gz')]
+    existing = [variant for variant in variants if variant.exists()]
+    return max(existing, key=lambda variant: variant.stat().st_mtime) if existing else None
+
+
+def read_csv(path, **kwargs):
+    """pd.read_csv que descomprime según el contenido, no según la extensión"""
+    codec = detect_compression(path)
+    if codec == 'zstd' and zstandard is None:
+        raise RuntimeError(f"{path} está comprimido con zstd y el paquete zstandard no está instalado")
+    compression = {'method': codec} if codec != 'none' else None
+    return pd.read_csv(path, compression=compression, **kwargs)
+
+
+def write_csv(df, path, compression=None, **kwargs):
+    """Escribe df en path (más la extensión del códec) y devuelve la ruta final.
+
+    Se escribe en un temporal que sustituye al destino con os.replace: cada
+    escritura crea un inodo nuevo y los alias enlazados al archivo anterior
+    (link_or_copy) no cambian hasta que se vuelven a enlazar.
+    """
+    compression = compression or Compression()
+    target = compression.path(path)
+    tmp = target.with_name(f".{target.name}.tmp")
+    try:
+        df.to_csv(tmp, compression=compression.pandas_options(), **kwargs)
+        os.replace(tmp, target)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return target
+
+
+def compress_file(src, dest, compression):
+    """Comprime un archivo existente en dest (sin pasar por pandas)"""
+    if compression.codec == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=compression.level, threads=compression.threads)
+        with open(src, 'rb') as source, open(dest, 'wb') as target:
+            compressor.copy_stream(source, target)
+    elif compression.codec == 'gzip':
+        with open(src, 'rb') as source, open(dest, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=compression.level, mtime=0) as target:
+                shutil.copyfileobj(source, target, 1024 * 1024)
+    else:
+        shutil.copy2(src, dest)
+    return Path(dest)
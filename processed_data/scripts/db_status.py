@@ -0,0 +1,179 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Estado de las tablas del pipeline a partir de las estadísticas del catálogo de PostgreSQL
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+
+PIPELINE_TABLES = [
+    'nba_playoffs_detailed',
+    'nba_playoffs_season_summary',
+    'nba_playoffs_team_summary',
+    'nba_playoffs_advanced'
+]
+
+# Una sola consulta al catálogo: filas estimadas, actividad y tamaño de cada tabla.
+# {details} añade el conteo exacto y la muestra (o NULL si no se piden)
+CATALOG_QUERY = """
+    SELECT c.relname,
+           c.reltuples::bigint,
+           s.n_live_tup,
+           GREATEST(s.last_analyze, s.last_autoanalyze),
+           pg_total_relation_size(c.oid),
+           {details}
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE c.relkind IN ('r', 'p')
+      AND n.nspname = ANY(current_schemas(false))
+      AND c.relname = ANY(%(tables)s)
+"""
+
+# SQL dinámico evaluado por fila del catálogo con query_to_xml: solo se
+# consultan las tablas que existen y todo viaja en la misma sentencia
+EXACT_COUNT = """(xpath('/row/n/text()', query_to_xml(
+               format('SELECT COUNT(*) AS n FROM %%I.%%I', n.nspname, c.relname),
+               false, true, '')))[1]::text::bigint"""
+# La muestra viaja en base64 para que el XML no altere el JSON; json conserva el orden de las columnas
+SAMPLE = """convert_from(decode((xpath('/row/j/text()', query_to_xml(
+               format('SELECT encode(convert_to(json_agg(t)::text, ''UTF8''), ''base64'') AS j '
+                      'FROM (SELECT * FROM %%I.%%I LIMIT %%s) t', n.nspname, c.relname, %(sample_rows)s),
+               false, true, '')))[1]::text, 'base64'), 'UTF8')::json"""
+
+
+class DatabaseStatusService:
+    """Estado de las tablas con estimaciones del catálogo y caché de corta duración.
+
+    Por defecto no recorre ninguna tabla: usa pg_stat_user_tables.n_live_tup
+    (o pg_class.reltuples si no hay estadísticas). Los conteos exactos y las
+    muestras se piden explícitamente y se añaden como columnas de la misma
+    consulta al catálogo: un único viaje a la base en cualquier caso.
+    acquire/release obtienen y devuelven una conexión en una sesión de solo
+    lectura y autocommit (open_session), sin BEGIN ni ROLLBACK.
+    """
+
+    def __init__(self, acquire, release, ttl=5.0, tables=None):
+        self.acquire = acquire
+        self.release = release
+        self.ttl = ttl
+        self.tables = list(tables or PIPELINE_TABLES)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def open_session(db_config):
+        """Conexión de solo lectura en autocommit: cada consulta es su propia transacción"""
+        conn = psycopg2.connect(
+            dbname=db_config['database'],
+            user=db_config['user'],
+            password=db_config['password'],
+            host=db_config['host'],
+            port=db_config['port'],
+            connect_timeout=5
+        )
+        conn.set_session(readonly=True, autocommit=True)
+        return conn
+
+    @classmethod
+    def from_config(cls, db_config, **kwargs):
+        """Servicio con una conexión propia (uso desde línea de comandos)"""
+        return cls(lambda: cls.open_session(db_config), lambda conn, broken=False: conn.close(), **kwargs)
+
+    def invalidate(self):
+        """Descarta la caché (tras una carga o una limpieza)"""
+        with self._lock:
+            self._cache.clear()
+
+    def status(self, exact=False, sample_rows=0, refresh=False):
+        """Estado de cada tabla; reutiliza el resultado si tiene menos de ttl segundos"""
+        key = (exact, sample_rows)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and not refresh and time.monotonic() - cached[0] < self.ttl:
+                return dict(cached[1], cached=True)
+
+        result = self._query(exact, sample_rows)
+        with self._lock:
+            self._cache[key] = (time.monotonic(), result)
+        return dict(result, cached=False)
+
+    def _query(self, exact, sample_rows):
+        details = [EXACT_COUNT if exact else 'NULL::bigint', SAMPLE if sample_rows else 'NULL::json']
+        query = CATALOG_QUERY.format(details=',\n           '.join(details))
+
+        conn = self.acquire()
+        broken = False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(query, {'tables': self.tables, 'sample_rows': int(sample_rows)})
+                catalog = {row[0]: row[1:] for row in cursor.fetchall()}
+        except Exception as e:
+            broken = psycopg2 is not None and isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+            raise
+        finally:
+            self.release(conn, broken)
+
+        tables = {}
+        for table in self.tables:
+            if table not in catalog:
+                tables[table] = {'exists': False, 'count': None, 'estimated': False}
+                continue
+            reltuples, live_tuples, last_analyze, size_bytes, exact_count, sample = catalog[table]
+            # reltuples vale -1 (o 0) en tablas nunca analizadas
+            estimate = live_tuples if live_tuples is not None else max(reltuples, 0)
+            tables[table] = {
+                'exists': True,
+                'count': exact_count if exact else estimate,
+                'estimated': not exact,
+                'last_analyze': last_analyze.isoformat() if last_analyze else None,
+                'size_bytes': size_bytes
+            }
+            if sample_rows:
+                rows = sample or []
+                tables[table]['columns'] = list(rows[0].keys()) if rows else []
+                tables[table]['sample'] = [list(row.values()) for row in rows]
+
+        return {'tables': tables, 'exact': exact, 'generated_at': datetime.now().isoformat()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Estado de las tablas del pipeline NBA Playoffs')
+    parser.add_argument('--host', type=str, default='localhost', help='Host de PostgreSQL')
+    parser.add_argument('--port', type=str, default='5432', help='Puerto de PostgreSQL')
+    parser.add_argument('--db', type=str, default='nba_playoffs', help='Nombre de la base de datos')
+    parser.add_argument('--user', type=str, default='postgres', help='Usuario de PostgreSQL')
+    parser.add_argument('--password', type=str, default='123', help='Contraseña de PostgreSQL')
+    parser.add_argument('--exact', action='store_true', help='Conteo exacto (recorre las tablas)')
+    parser.add_argument('--sample', type=int, default=0, help='Registros de muestra por tabla')
+    args = parser.parse_args()
+
+    service = DatabaseStatusService.from_config({
+        'host': args.host,
+        'port': args.port,
+        'database': args.db,
+        'user': args.user,
+        'password': args.password
+    })
+    try:
+        status = service.status(exact=args.exact, sample_rows=args.sample)
+    except Exception as e:
+        print(f"Error al consultar la base de datos: {str(e)}")
+        return 1
+
+    print(json.dumps(status, indent=2, ensure_ascii=False, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Clasificación de errores del pipeline en reintentables y fatales
+"""
+import socket
+import sqlite3
+import subprocess
+
+
+class StageError(Exception):
+    """Error de una etapa del pipeline con su causa original"""
+
+    def __init__(self, stage, cause):
+        super().__init__(f"Etapa '{stage}' fallida: {cause}")
+        self.stage = stage
+        self.cause = cause
+
+
+class RetryableStageError(StageError):
+    """Fallo transitorio: la etapa puede reintentarse"""
+
+
+class FatalStageError(StageError):
+    """Fallo permanente: reintentar no cambiaría el resultado"""
+
+
+# Errores transitorios: red, conexión a base de datos, bloqueos
+RETRYABLE_ERRORS = [ConnectionError, TimeoutError, socket.timeout, socket.gaierror,
+                    subprocess.CalledProcessError, subprocess.TimeoutExpired]
+
+# SQLite solo es transitorio si otra conexión tiene la base bloqueada;
+# "no such table", "no such column" o un error de sintaxis se repetirían igual
+SQLITE_RETRYABLE_MESSAGES = ('database is locked', 'database is busy')
+
+# Errores de datos, configuración o código
+FATAL_ERRORS = [FileNotFoundError, PermissionError, NotADirectoryError,
+                ValueError, KeyError, TypeError, AttributeError]
+
+try:
+    import psycopg2
+    RETRYABLE_ERRORS += [psycopg2.OperationalError, psycopg2.InterfaceError]
+    FATAL_ERRORS += [psycopg2.ProgrammingError, psycopg2.DataError, psycopg2.IntegrityError]
+except ImportError:
+    pass
+
+try:
+    import requests
+    RETRYABLE_ERRORS += [requests.exceptions.ConnectionError, requests.exceptions.Timeout]
+    # Un 404 o 403 no se arregla reintentando
+    FATAL_ERRORS += [requests.exceptions.HTTPError]
+except ImportError:
+    pass
+
+RETRYABLE_ERRORS = tuple(RETRYABLE_ERRORS)
+FATAL_ERRORS = tuple(FATAL_ERRORS)
+
+
+def is_retryable(error):
+    """Indica si un error justifica reintentar la etapa"""
+    if isinstance(error, StageError):
+        return isinstance(error, RetryableStageError)
+    if isinstance(error, sqlite3.Error):
+        message = str(error).lower()
+        return any(text in message for text in SQLITE_RETRYABLE_MESSAGES)
+    # Los tipos reintentables se evalúan primero: p. ej. ConnectionError
+    # y FileNotFoundError comparten la base OSError
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    if isinstance(error, FATAL_ERRORS):
+        return False
+    # Errores desconocidos: se mantiene el comportamiento previo de reintentar
+    return True
+
+
+def classify(stage, error):
+    """Envuelve un error en la excepción de etapa que le corresponde"""
+    if isinstance(error, StageError):
+        return error
+    if is_retryable(error):
+        return RetryableStageError(stage, error)
+    return FatalStageError(stage, error)
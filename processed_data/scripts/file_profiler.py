@@ -0,0 +1,134 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Perfil de un CSV en una sola pasada por bloques: filas, nulos, mínimos/máximos, distintos aproximados y huella del esquema
+"""
+import argparse
+import hashlib
+import json
+import math
+import sys
+
+import numpy as np
+import pandas as pd
+
+from compressed_io import read_csv
+
+
+CHUNK_SIZE = 100_000
+HLL_PRECISION = 12
+
+
+class HyperLogLog:
+    """Contador aproximado de valores distintos (error típico 1.04 / sqrt(2^precision)).
+
+    Los valores se añaden por columnas completas: el hash y la actualización de
+    los registros se hacen con numpy, sin bucles en Python.
+    """
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add(self, series):
+        values = series.dropna()
+        if values.empty:
+            return
+        # Un mismo número debe dar el mismo hash aunque el bloque lo lea como entero o decimal
+        if values.dtype.kind in 'biu':
+            values = values.astype(np.float64)
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        remainder = hashes << np.uint64(self.precision)
+
+        # Posición del primer bit a 1 en los 64 - precision bits restantes
+        width = 64 - self.precision
+        rank = np.full(len(remainder), width + 1, dtype=np.uint8)
+        nonzero = remainder != 0
+        bit_length = np.floor(np.log2(remainder[nonzero].astype(np.float64))).astype(np.int64) + 1
+        rank[nonzero] = np.minimum(64 - bit_length + 1, width + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Corrección para cardinalidades pequeñas (conteo lineal)
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+
+def _scalar(value):
+    """Valor serializable en JSON"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def profile_csv(path, chunk_size=CHUNK_SIZE, precision=HLL_PRECISION):
+    """Lee el CSV una sola vez y devuelve su perfil como diccionario"""
+    rows = 0
+    columns = None
+    kinds = None
+    nulls = {}
+    minimum = {}
+    maximum = {}
+    distinct = {}
+
+    for chunk in read_csv(path, chunksize=chunk_size):
+        if columns is None:
+            columns = list(chunk.columns)
+            kinds = {column: chunk[column].dtype.kind for column in columns}
+            nulls = {column: 0 for column in columns}
+            distinct = {column: HyperLogLog(precision) for column in columns}
+        rows += len(chunk)
+        chunk_nulls = chunk.isna().sum()
+
+        for column in columns:
+            series = chunk[column]
+            nulls[column] += int(chunk_nulls[column])
+            distinct[column].add(series)
+
+            values = series.dropna()
+            if values.empty:
+                continue
+            if series.dtype.kind not in 'biuf':
+                values = values.astype(str)
+            low, high = values.min(), values.max()
+            if column not in minimum or low < minimum[column]:
+                minimum[column] = low
+            if column not in maximum or high > maximum[column]:
+                maximum[column] = high
+
+    columns = columns or []
+    header_hash = hashlib.sha256('\x1f'.join(columns).encode('utf-8')).hexdigest()
+    schema = '\x1f'.join(f"{column}:{kinds[column]}" for column in columns)
+
+    return {
+        'rows': rows,
+        'columns': columns,
+        'header_hash': header_hash,
+        'schema_hash': hashlib.sha256(schema.encode('utf-8')).hexdigest(),
+        'nulls': nulls,
+        'min': {column: _scalar(value) for column, value in minimum.items()},
+        'max': {column: _scalar(value) for column, value in maximum.items()},
+        'distinct': {column: counter.count() for column, counter in distinct.items()}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Perfil de un archivo CSV en una sola pasada')
+    parser.add_argument('input', type=str, help='Archivo CSV (plano, .gz o .zst)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Filas por bloque')
+    args = parser.parse_args()
+
+    print(json.dumps(profile_csv(args.input, args.chunk_size), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Notificaciones del sistema de archivos (inotify) sin dependencias externas
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+_libc = _load_libc()
+
+
+def inotify_available():
+    """Indica si el sistema permite usar inotify (solo Linux)"""
+    return _libc is not None
+
+
+class Inotify:
+    """Envoltorio mínimo de inotify: add_watch, read_events y close"""
+
+    def __init__(self):
+        if _libc is None:
+            raise OSError("inotify no está disponible en este sistema")
+        self.fd = _libc.inotify_init1(IN_CLOEXEC | IN_NONBLOCK)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.paths = {}
+
+    def add_watch(self, path, mask):
+        wd = _libc.inotify_add_watch(self.fd, os.fsencode(str(path)), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(path))
+        self.paths[wd] = str(path)
+        return wd
+
+    def remove_watch(self, wd):
+        _libc.inotify_rm_watch(self.fd, wd)
+        self.paths.pop(wd, None)
+
+    def read_events(self, timeout=None, wake_fds=()):
+        """Espera eventos hasta 'timeout' segundos y devuelve (ruta, máscara, nombre).
+
+        Los descriptores de wake_fds permiten interrumpir la espera desde otro hilo.
+        """
+        readable, _, _ = select.select([self.fd, *wake_fds], [], [], timeout)
+        if self.fd not in readable:
+            return []
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            if mask & IN_IGNORED:
+                self.paths.pop(wd, None)
+                continue
+            events.append((self.paths.get(wd), mask, name))
+        return events
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
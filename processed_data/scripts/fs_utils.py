@@ -0,0 +1,89 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Utilidades de sistema de archivos compartidas por las etapas del pipeline
+"""
+import os
+import shutil
+import sys
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# ioctl de Linux que clona los extents de un archivo (btrfs, XFS, bcachefs...)
+FICLONE = 0x40049409
+
+LINK_METHODS = ('reflink', 'hardlink', 'symlink', 'copy')
+
+
+def _reflink(src, dest):
+    if fcntl is None or not sys.platform.startswith('linux'):
+        raise OSError("reflink no disponible en esta plataforma")
+    with open(src, 'rb') as source, open(dest, 'wb') as target:
+        fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+
+
+def _hardlink(src, dest):
+    os.link(src, dest)
+
+
+def _symlink(src, dest):
+    os.symlink(os.path.abspath(src), dest)
+
+
+def _copy(src, dest):
+    # Copia independiente y escribible aunque src sea de solo lectura (blobs de staging)
+    shutil.copyfile(src, dest)
+    stat = os.stat(src)
+    os.utime(dest, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def write_text_atomic(path, text):
+    """Escribe text en path vía archivo temporal + fsync + rename: nunca queda a medio escribir"""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+_LINKERS = {'reflink': _reflink, 'hardlink': _hardlink, 'symlink': _symlink, 'copy': _copy}
+
+
+def link_or_copy(src, dest, methods=LINK_METHODS):
+    """Crea dest con el contenido de src sin copiar datos siempre que sea posible.
+
+    Prueba los métodos en orden (reflink, hardlink, enlace simbólico y, como
+    último recurso, copia) y devuelve el que funcionó. dest se sustituye de
+    forma atómica. Con hardlink, dest y src comparten inodo: solo es seguro si
+    quien reescribe cualquiera de los dos lo reemplaza con os.replace
+    (write_csv, write_text_atomic) en lugar de escribir encima; si no, el
+    cambio se ve también en el otro.
+    """
+    src, dest = Path(src), Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.tmp")
+
+    for method in methods:
+        if tmp.exists() or tmp.is_symlink():
+            tmp.unlink()
+        try:
+            _LINKERS[method](src, tmp)
+        except OSError:
+            # Otro volumen, sistema de archivos sin soporte o permisos insuficientes
+            continue
+        os.replace(tmp, dest)
+        # rename() no hace nada si tmp y dest ya eran enlaces al mismo archivo
+        if tmp.exists():
+            tmp.unlink()
+        return method
+
+    if tmp.exists():
+        tmp.unlink()
+    raise OSError(f"No se pudo crear {dest} a partir de {src}")
@@ -0,0 +1,226 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Índice en memoria de los partidos procesados: consultas por equipo, temporada y rango de fechas sin recorrer la tabla
+"""
+import argparse
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from column_store import ColumnStore, HEADER_FILE
+from compressed_io import find_csv, read_csv
+
+
+COLUMN_STORE_DIR = 'data/processed_data/playoffs_detailed_columns'
+PROCESSED_CSV = 'data/processed_data/playoffs_detailed.csv'
+RAW_CSV = 'data/play_off_totals_2010_2024.csv'
+
+DISPLAY_COLUMNS = ['SEASON_YEAR', 'GAME_DATE', 'TEAM_NAME', 'MATCHUP', 'WL', 'PTS', 'PLUS_MINUS']
+SUMMARY_COLUMNS = ['PTS', 'AST', 'REB', 'FG3M', 'PLUS_MINUS', 'OFFENSIVE_EFFICIENCY', 'DEFENSIVE_RATING']
+
+
+def _ranges(*keys):
+    """{clave: (inicio, fin)} de los tramos consecutivos con la misma clave en arrays ya ordenados"""
+    n = len(keys[0])
+    if n == 0:
+        return {}
+    change = np.zeros(n, dtype=bool)
+    change[0] = True
+    for key in keys:
+        change[1:] |= key[1:] != key[:-1]
+    starts = np.flatnonzero(change)
+    ends = np.append(starts[1:], n)
+    ranges = {}
+    for start, end in zip(starts, ends):
+        key = tuple(values[start] for values in keys) if len(keys) > 1 else keys[0][start]
+        if key in ranges:
+            raise ValueError(f"Los partidos de {key} no son contiguos en el orden del índice")
+        ranges[key] = (int(start), int(end))
+    return ranges
+
+
+def _timestamp(value):
+    return None if value in (None, '') else pd.Timestamp(value).to_datetime64()
+
+
+class GamesIndex:
+    """Partidos ordenados por (equipo, fecha) con índices de desplazamiento.
+
+    - Equipo y equipo+temporada: tramo contiguo de la tabla ordenada (slice).
+    - Temporada sola: tramo de una permutación ordenada por fecha.
+    - Rango de fechas: búsqueda binaria (np.searchsorted) dentro del tramo.
+    Ninguna consulta compara la columna completa como haría una máscara booleana.
+    """
+
+    def __init__(self, df, source=None):
+        df = df.copy()
+        df['GAME_DATE'] = pd.to_datetime(df['GAME_DATE'])
+        df['TEAM_NAME'] = df['TEAM_NAME'].astype(str)
+        df['SEASON_YEAR'] = df['SEASON_YEAR'].astype(str)
+        self.df = df.sort_values(['TEAM_NAME', 'GAME_DATE'], kind='stable').reset_index(drop=True)
+        self.source = str(source) if source else None
+
+        names = self.df['TEAM_NAME'].to_numpy()
+        seasons = self.df['SEASON_YEAR'].to_numpy()
+        self.dates = self.df['GAME_DATE'].to_numpy(dtype='datetime64[ns]')
+
+        self.team_offsets = _ranges(names)
+        self.team_season_offsets = _ranges(names, seasons)
+
+        # Las temporadas son cronológicas: en orden de fecha cada una es un tramo contiguo
+        self.by_date = np.argsort(self.dates, kind='stable')
+        self.sorted_dates = self.dates[self.by_date]
+        self.season_offsets = _ranges(seasons[self.by_date])
+
+        self.abbreviations = {}
+        if 'TEAM_ABBREVIATION' in self.df.columns:
+            pairs = self.df[['TEAM_ABBREVIATION', 'TEAM_NAME']].drop_duplicates()
+            self.abbreviations = dict(zip(pairs['TEAM_ABBREVIATION'].astype(str).str.upper(), pairs['TEAM_NAME']))
+
+    # Construcción
+
+    @classmethod
+    def load(cls, source=None):
+        """Índice desde source o, por defecto, desde el almacén columnar, el CSV procesado o el CSV original"""
+        path = Path(source) if source else cls.default_source()
+        if path is None:
+            raise FileNotFoundError("No hay datos procesados para construir el índice de partidos")
+        if path.is_dir():
+            return cls(ColumnStore(path).to_frame(), source=path)
+        return cls(read_csv(path), source=path)
+
+    @staticmethod
+    def default_source():
+        if (Path(COLUMN_STORE_DIR) / HEADER_FILE).exists():
+            return Path(COLUMN_STORE_DIR)
+        return find_csv(PROCESSED_CSV) or find_csv(RAW_CSV)
+
+    @staticmethod
+    def signature(source):
+        """Marca de versión del origen: cambia cuando el ETL lo reescribe"""
+        path = Path(source)
+        target = path / HEADER_FILE if path.is_dir() else path
+        return target.stat().st_mtime_ns
+
+    @property
+    def teams(self):
+        return sorted(self.team_offsets)
+
+    @property
+    def seasons(self):
+        return sorted(self.season_offsets)
+
+    # Consultas
+
+    def team_name(self, team):
+        """Nombre completo a partir del nombre o la abreviatura (BOS -> Boston Celtics)"""
+        if team in self.team_offsets:
+            return team
+        return self.abbreviations.get(str(team).upper(), team)
+
+    def positions(self, team=None, season=None, start=None, end=None):
+        """Filas de self.df que cumplen la consulta (slice o array de posiciones)"""
+        start, end = _timestamp(start), _timestamp(end)
+        if team is not None:
+            team = self.team_name(team)
+            key = (team, str(season)) if season is not None else team
+            offsets = self.team_season_offsets if season is not None else self.team_offsets
+            low, high = offsets.get(key, (0, 0))
+            dates = self.dates[low:high]
+            order = None
+        else:
+            low, high = self.season_offsets.get(str(season), (0, 0)) if season is not None else (0, len(self.df))
+            dates = self.sorted_dates[low:high]
+            order = self.by_date
+
+        # Fechas inclusivas en ambos extremos
+        first = low + (np.searchsorted(dates, start, side='left') if start is not None else 0)
+        last = low + (np.searchsorted(dates, end, side='right') if end is not None else len(dates))
+        return slice(first, last) if order is None else order[first:last]
+
+    def games(self, team=None, season=None, start=None, end=None, columns=None):
+        """Partidos de un equipo (nombre o abreviatura), temporada y rango de fechas; None: sin filtro"""
+        positions = self.positions(team, season, start, end)
+        rows = self.df.iloc[positions]
+        if columns:
+            rows = rows[list(columns)]
+        return rows.reset_index(drop=True)
+
+    def team_summary(self, team=None, season=None, start=None, end=None):
+        """Partidos, victorias y promedios por equipo sobre los partidos de la consulta"""
+        rows = self.games(team, season, start, end)
+        columns = [column for column in SUMMARY_COLUMNS if column in rows.columns]
+        wins = rows['WL'].eq('W') if 'WL' in rows.columns else pd.Series(False, index=rows.index)
+        summary = rows.assign(WINS=wins).groupby('TEAM_NAME', sort=True).agg(
+            GAMES=('GAME_DATE', 'size'),
+            WINS=('WINS', 'sum'),
+            FIRST_GAME=('GAME_DATE', 'min'),
+            LAST_GAME=('GAME_DATE', 'max'),
+            **{f'AVG_{column}': (column, 'mean') for column in columns}
+        )
+        summary.insert(2, 'LOSSES', summary['GAMES'] - summary['WINS'])
+        summary.insert(3, 'WIN_RATE', summary['WINS'] / summary['GAMES'])
+        numeric = summary.select_dtypes('number').columns
+        summary[numeric] = summary[numeric].round(3)
+        return summary.reset_index()
+
+
+class CachedGamesIndex:
+    """Índice compartido por varias consultas (panel, informes): se reconstruye solo si el origen cambia"""
+
+    def __init__(self, source=None):
+        self.source = source
+        self.lock = threading.Lock()
+        self.index = None
+        self.loaded_from = None
+
+    def get(self):
+        with self.lock:
+            source = Path(self.source) if self.source else GamesIndex.default_source()
+            if source is None:
+                raise FileNotFoundError("No hay datos procesados para construir el índice de partidos")
+            key = (str(source), GamesIndex.signature(source))
+            if self.index is None or self.loaded_from != key:
+                self.index = GamesIndex.load(source)
+                self.loaded_from = key
+            return self.index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Consulta de partidos de playoffs por equipo, temporada y fechas')
+    parser.add_argument('--team', type=str, help='Equipo (nombre completo o abreviatura, p. ej. BOS)')
+    parser.add_argument('--season', type=str, help='Temporada (p. ej. 2023-24)')
+    parser.add_argument('--start', type=str, help='Fecha inicial (AAAA-MM-DD, inclusiva)')
+    parser.add_argument('--end', type=str, help='Fecha final (AAAA-MM-DD, inclusiva)')
+    parser.add_argument('--summary', action='store_true', help='Mostrar el resumen por equipo en lugar de los partidos')
+    parser.add_argument('--source', type=str, help='Almacén columnar o CSV de origen')
+    parser.add_argument('--limit', type=int, default=50, help='Máximo de partidos a mostrar')
+    args = parser.parse_args()
+
+    try:
+        index = GamesIndex.load(args.source)
+    except FileNotFoundError as e:
+        print(str(e))
+        return 1
+
+    if args.summary:
+        result = index.team_summary(args.team, args.season, args.start, args.end)
+    else:
+        columns = [column for column in DISPLAY_COLUMNS if column in index.df.columns]
+        result = index.games(args.team, args.season, args.start, args.end, columns=columns)
+    print(f"Origen: {index.source} ({len(index.df)} partidos indexados)")
+    if result.empty:
+        print("Ninguna fila coincide con la consulta.")
+        return 0
+    print(result.head(args.limit).to_string(index=False))
+    if len(result) > args.limit:
+        print(f"... {len(result) - args.limit} filas más")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Destino analítico embebido (SQLite) para el modo sin conexión
+"""
+import logging
+import re
+import sqlite3
+from datetime import date, datetime
+from pathlib import Path
+
+
+DEFAULT_SQLITE_PATH = 'data/processed_data/nba_playoffs.sqlite'
+
+
+def _to_sqlite_ddl(ddl):
+    """Adapta el DDL de PostgreSQL a SQLite"""
+    ddl = re.sub(r'\bSERIAL\s+PRIMARY\s+KEY\b', 'INTEGER PRIMARY KEY AUTOINCREMENT', ddl, flags=re.IGNORECASE)
+    return ddl
+
+
+def _to_sqlite_value(value):
+    # sqlite3 no conoce los tipos de NumPy ni los Timestamp de pandas
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, date):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class SQLiteSink:
+    """Destino local con la misma interfaz que ParallelTableLoader.
+
+    Cada tabla se reemplaza dentro de una única transacción: los lectores
+    (modo WAL) siguen viendo la versión anterior hasta el COMMIT.
+    """
+
+    def __init__(self, db_path=DEFAULT_SQLITE_PATH, logger=None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(exist_ok=True, parents=True)
+        self.logger = logger or logging.getLogger(__name__)
+        self.conn = sqlite3.connect(str(self.db_path), isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # En WAL, NORMAL no sincroniza en cada COMMIT sino en los checkpoints:
+        # la carga masiva no espera a disco y un COMMIT ya publicado no se corrompe
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def table_columns(self, table):
+        """Devuelve las columnas de una tabla (lista vacía si no existe)"""
+        rows = self.conn.execute(f'PRAGMA table_info("{table}")').fetchall()
+        return [row[1] for row in rows]
+
+    def table_ddl(self, table):
+        """Devuelve el DDL actual de la tabla como plantilla con {table}"""
+        row = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        if not row:
+            return None
+        ddl = row[0].replace('{', '{{').replace('}', '}}')
+        return re.sub(rf'^CREATE TABLE\s+"?{re.escape(table)}"?', 'CREATE TABLE {table}', ddl)
+
+    def ensure_tables(self, ddl_by_table):
+        """Crea las tablas que todavía no existen"""
+        for table, ddl in ddl_by_table.items():
+            if not self.table_columns(table):
+                self.conn.execute(_to_sqlite_ddl(ddl.format(table=table)))
+
+    def query(self, statement, params=()):
+        """Ejecuta una consulta de lectura y devuelve las filas"""
+        return self.conn.execute(statement, params).fetchall()
+
+    def load(self, table_loads):
+        """Reemplaza todas las tablas en una sola transacción"""
+        if not table_loads:
+            return True
+
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            for table_load in table_loads:
+                self._replace_table(table_load)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        self.logger.info(f"Publicadas {len(table_loads)} tablas en {self.db_path}")
+        return True
+
+    def _replace_table(self, table_load):
+        table = table_load.name
+        self.conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+        self.conn.execute(_to_sqlite_ddl(table_load.ddl.format(table=table)))
+
+        columns = ', '.join(f'"{col}"' for col in table_load.columns)
+        placeholders = ', '.join('?' for _ in table_load.columns)
+        self.conn.executemany(
+            f'INSERT INTO "{table}" ({columns}) VALUES ({placeholders})',
+            (tuple(_to_sqlite_value(value) for value in record) for record in table_load.records)
+        )
+
+        # Los índices se crean al final para no penalizar las inserciones
+        for index_columns in table_load.indexes:
+            index_name = table_load.index_name(table, index_columns)
+            index_columns_sql = ', '.join(f'"{col}"' for col in index_columns)
+            self.conn.execute(f'CREATE INDEX "{index_name}" ON "{table}" ({index_columns_sql})')
+
+        self.logger.info(f"Tabla {table} cargada en SQLite: {len(table_load.records)} registros")
@@ -0,0 +1,269 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Lectura eficiente de logs: últimas líneas, seguimiento en vivo y vista combinada por fecha
+"""
+import argparse
+import heapq
+import json
+import os
+import re
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from fs_events import Inotify, inotify_available, IN_CLOSE_WRITE, IN_CREATE, IN_MODIFY, IN_MOVED_TO
+
+
+LOG_PATTERNS = ['repo_extraction_*.log', 'etl_process_*.log', 'etl_automation_*.log', 'advanced_transform_*.log']
+BLOCK_SIZE = 8192
+
+# Formato de logging.basicConfig del proyecto: '2025-03-13 14:35:59,123 - INFO - ...'
+_PLAIN_TIMESTAMP = re.compile(r'^(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2})(?:[,.](\d{1,6}))?')
+_JSON_TIME_KEYS = ('time', 'timestamp', 'asctime', 'ts')
+
+
+def tail(path, lines=20, encoding='utf-8'):
+    """Últimas líneas de un archivo leyendo bloques desde el final"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        # Una línea más de las pedidas para descartar la que quede cortada al principio
+        while position > 0 and data.count(b'\n') <= lines:
+            size = min(BLOCK_SIZE, position)
+            position -= size
+            f.seek(position)
+            data = f.read(size) + data
+
+    text = data.decode(encoding, errors='replace')
+    result = text.splitlines()
+    return result[-lines:] if lines else []
+
+
+def log_files(log_dir='logs', patterns=None):
+    """Archivos de log del pipeline, del más reciente al más antiguo"""
+    log_dir = Path(log_dir)
+    files = []
+    for pattern in patterns or LOG_PATTERNS:
+        files.extend(log_dir.glob(pattern))
+    return sorted(files, key=lambda f: f.stat().st_mtime, reverse=True)
+
+
+def latest_per_source(log_dir='logs', patterns=None):
+    """El log más reciente de cada tipo (extracción, ETL, automatización, transformación)"""
+    latest = []
+    for pattern in patterns or LOG_PATTERNS:
+        files = log_files(log_dir, [pattern])
+        if files:
+            latest.append(files[0])
+    return latest
+
+
+def source_name(path):
+    """Nombre corto del log sin la fecha: etl_process_20250313.log -> etl_process"""
+    return re.sub(r'_\d{8}(_\d{6})?$', '', Path(path).stem)
+
+
+def parse_timestamp(line):
+    """Fecha de una línea de log en texto plano o JSON (None si no tiene)"""
+    if line.startswith('{'):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        for key in _JSON_TIME_KEYS:
+            value = record.get(key)
+            if isinstance(value, (int, float)):
+                return datetime.fromtimestamp(value)
+            if isinstance(value, str):
+                line = value
+                break
+        else:
+            return None
+
+    match = _PLAIN_TIMESTAMP.match(line)
+    if not match:
+        return None
+    moment = datetime.strptime(match.group(1).replace('T', ' '), '%Y-%m-%d %H:%M:%S')
+    if match.group(2):
+        moment = moment.replace(microsecond=int(match.group(2).ljust(6, '0')))
+    return moment
+
+
+def format_line(line):
+    """Línea legible: los registros JSON (logging_setup) se muestran como texto plano"""
+    if not line.startswith('{'):
+        return line
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return line
+    text = f"{record.get('time', '')} - {record.get('level', '')} - {record.get('message', '')}"
+    if record.get('exc'):
+        text += '\n' + record['exc']
+    return text
+
+
+def matches(line, stage=None, run_id=None):
+    """Filtra registros JSON por etapa y ejecución sin decodificar los que no coinciden"""
+    if stage is None and run_id is None:
+        return True
+    # Comprobación barata por subcadena antes de decodificar
+    if run_id is not None and run_id not in line:
+        return False
+    if stage is not None and stage not in line:
+        return False
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return False
+    return ((stage is None or record.get('stage') == stage)
+            and (run_id is None or record.get('run_id') == run_id))
+
+
+def _timestamped(path, lines):
+    """(fecha, orden, fuente, línea); las líneas sin fecha (trazas) heredan la anterior"""
+    source = source_name(path)
+    last = datetime.min
+    for order, line in enumerate(lines):
+        last = parse_timestamp(line) or last
+        yield last, order, source, line
+
+
+def combined_tail(paths, lines=50, encoding='utf-8'):
+    """Últimas líneas de varios logs intercaladas por fecha"""
+    streams = [_timestamped(path, tail(path, lines, encoding)) for path in paths]
+    # Cada log ya está ordenado: basta una mezcla de k listas
+    merged = list(heapq.merge(*streams, key=lambda item: item[0]))
+    return [f"[{source}] {format_line(line)}" for _, _, source, line in merged[-lines:]]
+
+
+class _FollowedFile:
+    """Posición de lectura de un log seguido; detecta truncado y rotación"""
+
+    def __init__(self, path, from_end, encoding):
+        self.path = Path(path)
+        self.encoding = encoding
+        self.handle = None
+        self.inode = None
+        self.partial = b''
+        self._open(from_end)
+
+    def _open(self, from_end):
+        if self.handle:
+            self.handle.close()
+        self.handle = open(self.path, 'rb')
+        self.inode = os.fstat(self.handle.fileno()).st_ino
+        self.partial = b''
+        if from_end:
+            self.handle.seek(0, os.SEEK_END)
+
+    def read_new(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        # Rotado (otro inodo) o truncado: empezar desde el principio
+        if stat.st_ino != self.inode or stat.st_size < self.handle.tell():
+            self._open(from_end=False)
+
+        data = self.partial + self.handle.read()
+        *complete, self.partial = data.split(b'\n')
+        return [line.decode(self.encoding, errors='replace').rstrip('\r') for line in complete]
+
+    def close(self):
+        if self.handle:
+            self.handle.close()
+            self.handle = None
+
+
+def follow(log_dir, paths_fn, stop_event, poll_interval=1.0, encoding='utf-8'):
+    """Genera (ruta, línea) a medida que se escriben los logs hasta que se active stop_event.
+
+    paths_fn devuelve los logs a seguir y se reevalúa para incorporar logs
+    nuevos (p. ej. el del día siguiente). Usa inotify sobre el directorio si
+    está disponible y, si no, comprueba los tamaños cada poll_interval.
+    """
+    tracked = {}
+
+    def rescan(initial):
+        for path in paths_fn():
+            if path not in tracked:
+                # Los logs que aparecen durante el seguimiento se leen desde el principio
+                tracked[path] = _FollowedFile(path, from_end=initial, encoding=encoding)
+
+    inotify = None
+    if inotify_available():
+        inotify = Inotify()
+        inotify.add_watch(log_dir, IN_MODIFY | IN_CLOSE_WRITE | IN_CREATE | IN_MOVED_TO)
+
+    try:
+        rescan(initial=True)
+        while not stop_event.is_set():
+            if inotify:
+                events = inotify.read_events(poll_interval)
+                if not events:
+                    continue
+                if any(mask & (IN_CREATE | IN_MOVED_TO) for _, mask, _ in events):
+                    rescan(initial=False)
+            else:
+                stop_event.wait(poll_interval)
+                rescan(initial=False)
+
+            for path, followed in list(tracked.items()):
+                for line in followed.read_new():
+                    yield path, line
+    finally:
+        if inotify:
+            inotify.close()
+        for followed in tracked.values():
+            followed.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Últimas líneas y seguimiento de los logs del pipeline')
+    parser.add_argument('--dir', type=str, default='logs', help='Directorio de logs')
+    parser.add_argument('-n', '--lines', type=int, default=20, help='Número de líneas')
+    parser.add_argument('-f', '--follow', action='store_true', help='Seguir los logs en vivo')
+    parser.add_argument('--combined', action='store_true', help='Vista combinada de todos los logs por fecha')
+    parser.add_argument('--stage', type=str, help='Solo registros de una etapa (extract, etl, advanced, automation)')
+    parser.add_argument('--run-id', type=str, help='Solo registros de una ejecución')
+    args = parser.parse_args()
+
+    if args.stage or args.run_id:
+        # Filtrar exige recorrer los archivos completos
+        for path in reversed(log_files(args.dir)):
+            with open(path, encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    if matches(line, args.stage, args.run_id):
+                        print(f"[{source_name(path)}] {format_line(line.rstrip())}")
+        return 0
+
+    if args.combined:
+        paths_fn = lambda: latest_per_source(args.dir)
+        for line in combined_tail(paths_fn(), args.lines):
+            print(line)
+    else:
+        files = log_files(args.dir)
+        if not files:
+            print("No se encontraron archivos de log.")
+            return 1
+        paths_fn = lambda: log_files(args.dir)[:1]
+        for line in tail(files[0], args.lines):
+            print(format_line(line))
+
+    if args.follow:
+        stop = threading.Event()
+        try:
+            for path, line in follow(args.dir, paths_fn, stop):
+                line = format_line(line)
+                print(f"[{source_name(path)}] {line}" if args.combined else line, flush=True)
+        except KeyboardInterrupt:
+            stop.set()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Configuración central de logging: cola asíncrona, rotación comprimida y registros JSON por etapa
+"""
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+
+RUN_ID_ENV = 'NBA_ETL_RUN_ID'
+LOG_FORMAT_ENV = 'NBA_ETL_LOG_FORMAT'
+LOG_LEVEL_ENV = 'NBA_ETL_LOG_LEVEL'
+
+DEFAULT_LOG_DIR = 'logs'
+MAX_BYTES = 10 * 1024 * 1024
+BACKUP_COUNT = 5
+RETENTION_DAYS = 30
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_lock = threading.Lock()
+_state = {'queue_handler': None, 'listener': None, 'router': None, 'run_id': None, 'exported': False}
+
+
+def run_id():
+    """Identificador de la ejecución; se hereda por entorno en los subprocesos"""
+    with _lock:
+        if _state['run_id'] is None:
+            inherited = os.environ.get(RUN_ID_ENV)
+            _state['run_id'] = inherited or uuid.uuid4().hex[:12]
+            _state['exported'] = not inherited
+            os.environ[RUN_ID_ENV] = _state['run_id']
+        return _state['run_id']
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por línea; 'time' mantiene el formato de asctime para log_tail"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'stage': getattr(record, 'stage', None),
+            'run_id': getattr(record, 'run_id', None),
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class CompressedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Log con fecha en el nombre que rota por tamaño y por día.
+
+    Al superar max_bytes el archivo pasa a <nombre>.1.gz (hasta backup_count);
+    al cambiar de día se abre el archivo de la nueva fecha. Los logs con más
+    de retention_days días se eliminan.
+    """
+
+    def __init__(self, log_dir, prefix, date_format='%Y%m%d', max_bytes=MAX_BYTES,
+                 backup_count=BACKUP_COUNT, retention_days=RETENTION_DAYS):
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.date_format = date_format
+        self.retention_days = retention_days
+        self.current_date = datetime.now().strftime('%Y%m%d')
+        super().__init__(self._dated_filename(), maxBytes=max_bytes, backupCount=backup_count,
+                         encoding='utf-8', delay=True)
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._compress
+        self._purge()
+
+    def _dated_filename(self):
+        return str(self.log_dir / f"{self.prefix}_{datetime.now().strftime(self.date_format)}.log")
+
+    @staticmethod
+    def _compress(source, dest):
+        with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+    def _purge(self):
+        limit = time.time() - self.retention_days * 86400
+        for path in self.log_dir.glob(f"{self.prefix}_*.log*"):
+            try:
+                if path.stat().st_mtime < limit:
+                    path.unlink()
+            except OSError:
+                pass
+
+    def shouldRollover(self, record):
+        today = datetime.now().strftime('%Y%m%d')
+        if today != self.current_date:
+            # Nuevo día: cambiar de archivo sin renombrar el anterior
+            self.current_date = today
+            if self.stream:
+                self.stream.close()
+                self.stream = None
+            self.baseFilename = os.path.abspath(self._dated_filename())
+            self._purge()
+            return False
+        return super().shouldRollover(record)
+
+
+class _StageRouter(logging.Handler):
+    """Envía cada registro al archivo de su etapa; los que no tienen etapa van a la principal"""
+
+    def __init__(self):
+        super().__init__()
+        self.handlers = {}
+        self.default_stage = None
+
+    def add(self, stage, handler):
+        if stage not in self.handlers:
+            self.handlers[stage] = handler
+            self.default_stage = self.default_stage or stage
+
+    def emit(self, record):
+        handler = self.handlers.get(getattr(record, 'stage', None)) or self.handlers.get(self.default_stage)
+        if handler and record.levelno >= handler.level:
+            handler.handle(record)
+
+    def close(self):
+        for handler in self.handlers.values():
+            handler.close()
+        self.handlers.clear()
+        super().close()
+
+
+def setup_logging(stage, prefix, log_dir=DEFAULT_LOG_DIR, date_format='%Y%m%d', console=True):
+    """Logger de una etapa del pipeline.
+
+    La primera llamada del proceso instala un QueueHandler en el logger raíz y
+    un QueueListener que escribe en disco y en consola desde su propio hilo.
+    Cada etapa añade su archivo (<prefix>_<fecha>.log) y recibe un
+    LoggerAdapter que marca sus registros con stage y run_id.
+    """
+    level_name = os.environ.get(LOG_LEVEL_ENV, 'INFO').upper()
+    level = getattr(logging, level_name, logging.INFO)
+    current_run = run_id()
+
+    with _lock:
+        router = _state['router']
+        if router is None:
+            router = _StageRouter()
+            handlers = [router]
+            if console:
+                console_handler = logging.StreamHandler(sys.stdout)
+                console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+                handlers.append(console_handler)
+
+            log_queue = queue.SimpleQueue()
+            queue_handler = logging.handlers.QueueHandler(log_queue)
+            listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+            listener.start()
+
+            root = logging.getLogger()
+            root.addHandler(queue_handler)
+            _state.update(queue_handler=queue_handler, listener=listener, router=router)
+
+        if stage not in router.handlers:
+            file_handler = CompressedRotatingFileHandler(log_dir, prefix, date_format=date_format)
+            if os.environ.get(LOG_FORMAT_ENV, 'json').lower() == 'text':
+                file_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+            else:
+                file_handler.setFormatter(JsonFormatter())
+            router.add(stage, file_handler)
+
+        root = logging.getLogger()
+        if root.level == logging.NOTSET or root.level > level:
+            root.setLevel(level)
+
+    return logging.LoggerAdapter(logging.getLogger(stage), {'stage': stage, 'run_id': current_run})
+
+
+def shutdown_logging():
+    """Vacía la cola y cierra los archivos; la siguiente ejecución empieza de cero"""
+    with _lock:
+        listener = _state['listener']
+        if listener is None:
+            return
+        logging.getLogger().removeHandler(_state['queue_handler'])
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        if _state['exported']:
+            os.environ.pop(RUN_ID_ENV, None)
+        _state.update(queue_handler=None, listener=None, router=None, run_id=None, exported=False)
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,69 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Análisis de la columna MATCHUP ("ATL @ CHI", "ATL vs. CHI") en equipo, rival y local/visitante codificados como enteros
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+
+MATCHUP_COLUMNS = ['MATCHUP_TEAM_ID', 'OPPONENT_TEAM_ID', 'IS_HOME']
+UNKNOWN = -1
+
+# "BOS vs. MIA": BOS juega en casa; "BOS @ MIA": BOS juega fuera
+_MATCHUP_PATTERN = re.compile(r'^\s*([A-Z]{2,4})\s+(vs\.?|@)\s+([A-Z]{2,4})\s*$', re.IGNORECASE)
+
+
+def parse_matchup(value):
+    """(equipo, rival, en casa) de un valor de MATCHUP; None si no tiene el formato esperado"""
+    match = _MATCHUP_PATTERN.match(str(value))
+    if not match:
+        return None
+    team, separator, opponent = match.groups()
+    return team.upper(), opponent.upper(), separator.lower().startswith('vs')
+
+
+def team_ids_by_abbreviation(df):
+    """{abreviatura: TEAM_ID} a partir de las columnas TEAM_ABBREVIATION y TEAM_ID"""
+    pairs = df[['TEAM_ABBREVIATION', 'TEAM_ID']].dropna().drop_duplicates('TEAM_ABBREVIATION')
+    return dict(zip(pairs['TEAM_ABBREVIATION'].astype(str).str.upper(), pairs['TEAM_ID'].astype(np.int64)))
+
+
+def parse_matchups(matchup, team_ids):
+    """MATCHUP_TEAM_ID, OPPONENT_TEAM_ID e IS_HOME (1 casa, 0 fuera) para una serie de MATCHUP.
+
+    MATCHUP tiene pocos valores distintos (unos cientos para miles de filas):
+    cada uno se analiza una sola vez y el resultado se reparte a todas las
+    filas a través de los códigos de pd.factorize. Lo que no se reconoce
+    (valor nulo, formato distinto o abreviatura sin TEAM_ID) queda en -1.
+    """
+    codes, uniques = pd.factorize(matchup)
+    # Una fila extra al final para el código -1 (nulos)
+    parsed = np.full((len(uniques) + 1, 3), UNKNOWN, dtype=np.int64)
+    for position, value in enumerate(uniques):
+        result = parse_matchup(value)
+        if result is None:
+            continue
+        team, opponent, is_home = result
+        parsed[position] = (team_ids.get(team, UNKNOWN), team_ids.get(opponent, UNKNOWN), int(is_home))
+
+    rows = parsed[codes]
+    return pd.DataFrame({
+        'MATCHUP_TEAM_ID': rows[:, 0],
+        'OPPONENT_TEAM_ID': rows[:, 1],
+        'IS_HOME': rows[:, 2].astype(np.int8)
+    }, index=matchup.index)
+
+
+def add_matchup_columns(df, logger=None):
+    """Añade a df las columnas de parse_matchups; devuelve el DataFrame resultante"""
+    columns = parse_matchups(df['MATCHUP'], team_ids_by_abbreviation(df))
+    df = df.assign(**{column: columns[column] for column in MATCHUP_COLUMNS})
+    if logger:
+        unknown = int((columns['OPPONENT_TEAM_ID'] == UNKNOWN).sum())
+        mismatched = int((columns['MATCHUP_TEAM_ID'] != df['TEAM_ID']).sum())
+        if unknown or mismatched:
+            logger.warning(f"MATCHUP: {unknown} filas sin rival reconocido, {mismatched} con equipo distinto de TEAM_ID")
+    return df
@@ -8,23 +8,96 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import os
-import logging
+import hashlib
 from sqlalchemy import create_engine, text
 import psycopg2
-from psycopg2.extras import execute_values
-import sys
 from pathlib import Path
 
+from table_loader import ParallelTableLoader, TableLoad
+from local_sink import SQLiteSink, DEFAULT_SQLITE_PATH
+from run_coordinator import RunCoordinator, PIPELINE_LOCK
+from run_cache import RunCache
+from progress import emit_progress
+from logging_setup import setup_logging
+from staging_catalog import StagingCatalog
+from fs_utils import link_or_copy
+from compressed_io import Compression, find_csv, is_csv, read_csv, write_csv
+from partitioned_dataset import PartitionedDataset, PARQUET_AVAILABLE
+from column_store import write_column_store
+from matchup import add_matchup_columns
+
 
 class NBAPlayoffsETL:
 
-    
-    def __init__(self, input_file=None, db_config=None, staging_dir='data/staging'):
+    # Definición de tablas; {table} permite crear la tabla sombra de cada carga
+    TABLE_DDL = {
+        'nba_playoffs_detailed': """
+            CREATE TABLE {table} (
+                id SERIAL PRIMARY KEY,
+                season_year VARCHAR(10),
+                team_id INTEGER,
+                team_name VARCHAR(100),
+                game_date DATE,
+                matchup VARCHAR(50),
+                matchup_team_id INTEGER,
+                opponent_team_id INTEGER,
+                is_home SMALLINT,
+                wl CHAR(1),
+                pts INTEGER,
+                fg3m INTEGER,
+                ast INTEGER,
+                offensive_efficiency FLOAT,
+                defensive_rating FLOAT,
+                plus_minus_per_min FLOAT,
+                ast_to_ratio FLOAT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """,
+        'nba_playoffs_season_summary': """
+            CREATE TABLE {table} (
+                season_year VARCHAR(10) PRIMARY KEY,
+                avg_pts FLOAT,
+                avg_fg3m FLOAT,
+                avg_ast FLOAT,
+                avg_off_efficiency FLOAT,
+                avg_def_rating FLOAT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """,
+        'nba_playoffs_team_summary': """
+            CREATE TABLE {table} (
+                team_name VARCHAR(100) PRIMARY KEY,
+                avg_pts FLOAT,
+                win_rate FLOAT,
+                avg_off_efficiency FLOAT,
+                avg_def_rating FLOAT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """
+    }
+
+    # Índices secundarios de la tabla detallada
+    DETAILED_INDEXES = [('season_year',), ('team_name', 'game_date')]
+
+    # Nombre de la etapa en la caché de sesión (run_cache)
+    CACHE_STAGE = 'etl'
+
+    def __init__(self, input_file=None, db_config=None, staging_dir='data/staging',
+                 target='auto', sqlite_path=DEFAULT_SQLITE_PATH, compression=None, compression_level=None):
 
         self.staging_dir = Path(staging_dir)
+        # Formato de las salidas CSV (NBA_ETL_COMPRESSION si no se indica); las entradas se detectan solas
+        self.compression = Compression(compression, compression_level)
+        # Destino de carga: 'postgresql', 'sqlite' o 'auto' (SQLite si no hay conexión)
+        self.target = target
+        self.sqlite_path = sqlite_path
         self.input_file = input_file or self._find_latest_input_file()
         self.raw_data = None
         self.transformed_data = None
+        self.load_run_id = None
+        self.output_files = []
+        # Última excepción de una etapa, para que el orquestador pueda clasificarla
+        self.last_error = None
         
         #Configuración de la base de datos
         if db_config is None:
@@ -41,47 +114,44 @@ class NBAPlayoffsETL:
         self.engine = None
         self.conn = None
 
-        # Configurar logging
-        log_dir = Path('logs')
-        log_dir.mkdir(exist_ok=True)
-        
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(f'logs/etl_process_{datetime.now().strftime("%Y%m%d")}.log'),
-                logging.StreamHandler(sys.stdout)
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
+        # Configurar logging (cola asíncrona, logs/etl_process_<fecha>.log)
+        self.logger = setup_logging('etl', 'etl_process')
+        self.coordinator = RunCoordinator(self.db_config, use_database=self.target != 'sqlite',
+                                          logger=self.logger)
         
         # Crear directorio para datos procesados si no existen
         processed_dir = Path('data/processed_data')
         processed_dir.mkdir(exist_ok=True, parents=True)
         
         # Intentar establecer conexión con la base de datos
-        try:
-            self._create_db_connection()
-        except Exception as e:
-            self.logger.warning(f"No se pudo conectar a la base de datos: {str(e)}")
-            self.logger.info("Continuando en modo sin conexión a base de datos")
+        if self.target != 'sqlite':
+            try:
+                self._create_db_connection()
+            except Exception as e:
+                self.logger.warning(f"No se pudo conectar a la base de datos: {str(e)}")
+                self.logger.info("Continuando en modo sin conexión a base de datos")
 
     def _find_latest_input_file(self):
      
         try:
-            # Buscar el directorio más reciente en el área de staging
+            # Extracción actual según el catálogo (puntero LATEST, sin recorrer el staging)
+            latest_file = StagingCatalog(self.staging_dir).latest_file('play_off')
+            if latest_file and latest_file.exists():
+                return str(latest_file)
+            
+            # Extracciones anteriores al catálogo: buscar el directorio más reciente
             staging_dirs = [d for d in self.staging_dir.glob('extract_*') if d.is_dir()]
             if not staging_dirs:
                 # Si no hay directorios en staging, buscar el archivo directamente en el directorio raíz
-                default_file = Path('data/play_off_totals_2010_2024.csv')
-                if default_file.exists():
+                default_file = find_csv('data/play_off_totals_2010_2024.csv')
+                if default_file:
                     return str(default_file)
                 raise FileNotFoundError("No se encontraron directorios de extracción en staging ni archivo predeterminado")
                 
             latest_dir = max(staging_dirs, key=lambda d: d.name)
             
             # Buscar archivos CSV en el directorio más reciente
-            csv_files = list(latest_dir.glob('*.csv'))
+            csv_files = [f for f in latest_dir.iterdir() if is_csv(f)]
             if not csv_files:
                 raise FileNotFoundError(f"No se encontraron archivos CSV en {latest_dir}")
                 
@@ -120,72 +190,11 @@ class NBAPlayoffsETL:
             self.logger.error(f"Error de conexión a base de datos: {str(e)}")
             raise
 
-    def _create_tables(self):
-       
-        try:
-            tables = [
-                """
-                DROP TABLE IF EXISTS nba_playoffs_detailed;
-                CREATE TABLE nba_playoffs_detailed (
-                    id SERIAL PRIMARY KEY,
-                    season_year VARCHAR(10),
-                    team_id INTEGER,
-                    team_name VARCHAR(100),
-                    game_date DATE,
-                    matchup VARCHAR(50),
-                    wl CHAR(1),
-                    pts INTEGER,
-                    fg3m INTEGER,
-                    ast INTEGER,
-                    offensive_efficiency FLOAT,
-                    defensive_rating FLOAT,
-                    plus_minus_per_min FLOAT,
-                    ast_to_ratio FLOAT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-                """,
-                """
-                DROP TABLE IF EXISTS nba_playoffs_season_summary;
-                CREATE TABLE nba_playoffs_season_summary (
-                    season_year VARCHAR(10) PRIMARY KEY,
-                    avg_pts FLOAT,
-                    avg_fg3m FLOAT,
-                    avg_ast FLOAT,
-                    avg_off_efficiency FLOAT,
-                    avg_def_rating FLOAT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-                """,
-                """
-                DROP TABLE IF EXISTS nba_playoffs_team_summary;
-                CREATE TABLE nba_playoffs_team_summary (
-                    team_name VARCHAR(100) PRIMARY KEY,
-                    avg_pts FLOAT,
-                    win_rate FLOAT,
-                    avg_off_efficiency FLOAT,
-                    avg_def_rating FLOAT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-                """
-            ]
-
-            with self.conn.cursor() as cur:
-                for table_sql in tables:
-                    cur.execute(table_sql)
-                self.conn.commit()
-
-            self.logger.info("Tablas creadas correctamente")
-            return True
-
-        except Exception as e:
-            self.logger.error(f"Error al crear tablas: {str(e)}")
-            return False
-
     def extract(self):
        
         try:
             self.logger.info(f"Iniciando extracción de datos desde {self.input_file}")
-            self.raw_data = pd.read_csv(self.input_file)
+            self.raw_data = read_csv(self.input_file)
             self.logger.info(f"Datos extraídos correctamente. Forma: {self.raw_data.shape}")
 
             required_columns = ['SEASON_YEAR', 'TEAM_NAME', 'GAME_DATE', 'PTS', 'FG3M', 'AST', 'WL']
@@ -194,14 +203,25 @@ class NBAPlayoffsETL:
             if missing_columns:
                 raise ValueError(f"Columnas faltantes en el conjunto de datos: {missing_columns}")
 
-            # Guardar información de verificación de datos
-            stats = {
-                'total_rows': len(self.raw_data),
-                'columns': len(self.raw_data.columns),
-                'seasons': self.raw_data['SEASON_YEAR'].nunique(),
-                'teams': self.raw_data['TEAM_NAME'].nunique(),
-                'extraction_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+            # Guardar información de verificación de datos; si la extracción ya perfiló
+            # el archivo (catálogo del staging) no se vuelve a calcular
+            profile = StagingCatalog(self.staging_dir).profile_for(self.input_file)
+            if profile and profile['rows'] == len(self.raw_data):
+                stats = {
+                    'total_rows': profile['rows'],
+                    'columns': len(profile['columns']),
+                    'seasons': profile['distinct']['SEASON_YEAR'],
+                    'teams': profile['distinct']['TEAM_NAME'],
+                    'source': 'staging_profile'
+                }
+            else:
+                stats = {
+                    'total_rows': len(self.raw_data),
+                    'columns': len(self.raw_data.columns),
+                    'seasons': self.raw_data['SEASON_YEAR'].nunique(),
+                    'teams': self.raw_data['TEAM_NAME'].nunique()
+                }
+            stats['extraction_time'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
             # Guardar estadísticas en archivo de logs
             with open(f'logs/extraction_stats_{datetime.now().strftime("%Y%m%d")}.txt', 'w') as f:
@@ -212,6 +232,7 @@ class NBAPlayoffsETL:
 
         except Exception as e:
             self.logger.error(f"Error en la extracción de datos: {str(e)}")
+            self.last_error = e
             return False
 
     def transform(self):
@@ -223,6 +244,9 @@ class NBAPlayoffsETL:
             # Convertir fechas
             df['GAME_DATE'] = pd.to_datetime(df['GAME_DATE'])
 
+            # Equipo, rival y local/visitante desde MATCHUP (un análisis por valor distinto)
+            df = add_matchup_columns(df, self.logger)
+
             # Manejar valores nulos
             numeric_columns = df.select_dtypes(include=[np.number]).columns
             df[numeric_columns] = df[numeric_columns].fillna(0)
@@ -231,9 +255,9 @@ class NBAPlayoffsETL:
             null_counts = df.isnull().sum()
             columns_with_nulls = null_counts[null_counts > 0]
             if not columns_with_nulls.empty:
-                self.logger.info("Valores nulos por columna:")
+                self.logger.info(f"Valores nulos en {len(columns_with_nulls)} columnas")
                 for col, count in columns_with_nulls.items():
-                    self.logger.info(f"  - {col}: {count}")
+                    self.logger.debug(f"  - {col}: {count}")
 
             # Calcular métricas avanzadas con manejo de errores
             try:
@@ -292,133 +316,203 @@ class NBAPlayoffsETL:
             
             # Guardar datos transformados en formato CSV para uso por la aplicación Flask
             output_path = Path('data/processed_data') / f'playoffs_detailed_{datetime.now().strftime("%Y%m%d")}.csv'
-            df.to_csv(output_path, index=False)
-            self.logger.info(f"Datos transformados guardados en: {output_path}")
+            output_path = write_csv(df, output_path, self.compression, index=False)
+            self.logger.info(f"Datos transformados guardados en: {output_path} ({self.compression})")
             
-            # También guardar una copia con nombre constante para la aplicación Flask
-            df.to_csv(Path('data/processed_data') / 'playoffs_detailed.csv', index=False)
+            # Alias con nombre constante para la aplicación Flask (enlace, sin volver a serializar)
+            latest_path = self.compression.path(Path('data/processed_data') / 'playoffs_detailed.csv')
+            link_or_copy(output_path, latest_path)
+            self.output_files = [output_path, latest_path]
+            
+            # Misma salida particionada por temporada (solo se reescriben las temporadas que cambian)
+            if PARQUET_AVAILABLE:
+                try:
+                    dataset = PartitionedDataset(Path('data/processed_data') / 'playoffs_detailed_dataset', logger=self.logger)
+                    dataset.write(df)
+                    self.output_files.append(dataset.manifest_path)
+                except Exception as e:
+                    self.logger.warning(f"No se pudo escribir el conjunto particionado: {str(e)}")
+            
+            # Almacén columnar (.npy) para que panel, Flask y notebooks lo mapeen sin volver a parsear el CSV
+            try:
+                header = write_column_store(df, Path('data/processed_data') / 'playoffs_detailed_columns',
+                                            source=output_path, logger=self.logger)
+                self.output_files.append(header)
+            except Exception as e:
+                self.logger.warning(f"No se pudo escribir el almacén columnar: {str(e)}")
             
             self.logger.info("Transformación completada correctamente")
             return True
 
         except Exception as e:
             self.logger.error(f"Error en la transformación: {str(e)}")
+            self.last_error = e
             return False
 
+    def _build_table_loads(self):
+        """Prepara las cargas de las tablas detallada y de resúmenes"""
+        # Preparar datos detallados
+        detailed_data = self.transformed_data[[
+            'SEASON_YEAR', 'TEAM_ID', 'TEAM_NAME', 'GAME_DATE', 'MATCHUP',
+            'MATCHUP_TEAM_ID', 'OPPONENT_TEAM_ID', 'IS_HOME', 'WL',
+            'PTS', 'FG3M', 'AST', 'OFFENSIVE_EFFICIENCY', 'DEFENSIVE_RATING',
+            'PLUS_MINUS_PER_MIN', 'AST_TO_RATIO'
+        ]].copy()
+
+        # Convertir a lista de tuplas para psycopg2 - Convertir tipos NumPy a Python
+        detailed_records = [tuple(x.item() if hasattr(x, 'item') else x for x in row) 
+                       for row in detailed_data.values]
+
+        # Convertir objetos NumPy a tipos Python estándar para el resumen por temporada
+        season_records = [
+            (index, 
+             float(row['PTS']), 
+             float(row['FG3M']), 
+             float(row['AST']),
+             float(row['OFFENSIVE_EFFICIENCY']), 
+             float(row['DEFENSIVE_RATING']))
+            for index, row in self.season_summary.iterrows()
+        ]
+
+        # Convertir objetos NumPy a tipos Python estándar para el resumen por equipo
+        team_records = [
+            (index, 
+             float(row['PTS']), 
+             float(row['WL']),
+             float(row['OFFENSIVE_EFFICIENCY']), 
+             float(row['DEFENSIVE_RATING']))
+            for index, row in self.team_summary.iterrows()
+        ]
+
+        return [
+            TableLoad(
+                'nba_playoffs_detailed',
+                self.TABLE_DDL['nba_playoffs_detailed'],
+                ['season_year', 'team_id', 'team_name', 'game_date', 'matchup',
+                 'matchup_team_id', 'opponent_team_id', 'is_home', 'wl',
+                 'pts', 'fg3m', 'ast', 'offensive_efficiency', 'defensive_rating',
+                 'plus_minus_per_min', 'ast_to_ratio'],
+                detailed_records,
+                indexes=self.DETAILED_INDEXES
+            ),
+            TableLoad(
+                'nba_playoffs_season_summary',
+                self.TABLE_DDL['nba_playoffs_season_summary'],
+                ['season_year', 'avg_pts', 'avg_fg3m', 'avg_ast',
+                 'avg_off_efficiency', 'avg_def_rating'],
+                season_records
+            ),
+            TableLoad(
+                'nba_playoffs_team_summary',
+                self.TABLE_DDL['nba_playoffs_team_summary'],
+                ['team_name', 'avg_pts', 'win_rate',
+                 'avg_off_efficiency', 'avg_def_rating'],
+                team_records
+            )
+        ]
+
+    def _compute_load_run_id(self):
+        """Identificador estable de la carga: mismo archivo y mismo código, mismo run_id"""
+        digest = hashlib.sha256()
+        with open(self.input_file, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        digest.update(Path(__file__).read_bytes())
+        return digest.hexdigest()[:32]
+
+    def _use_sqlite(self):
+        return self.target == 'sqlite' or (self.target == 'auto' and not (self.conn and self.engine))
+
+    def load_sqlite(self):
+        """Carga las tablas en el destino embebido SQLite"""
+        sink = None
+        try:
+            self.logger.info(f"Iniciando carga de datos a SQLite ({self.sqlite_path})")
+            sink = SQLiteSink(self.sqlite_path, logger=self.logger)
+            sink.load(self._build_table_loads())
+            self.logger.info("Datos cargados correctamente a SQLite")
+            return True
+        except Exception as e:
+            self.logger.error(f"Error en la carga de datos a SQLite: {str(e)}")
+            self.last_error = e
+            return False
+        finally:
+            if sink:
+                sink.close()
+
     def load(self):
         
+        if self._use_sqlite():
+            if self.target == 'auto':
+                self.logger.info("No hay conexión a PostgreSQL. Usando el destino local SQLite.")
+            return self.load_sqlite()
+
         try:
             self.logger.info("Iniciando carga de datos a PostgreSQL")
 
-            # Verificar si tenemos conexión a la base de datos
-            if not self.conn or not self.engine:
-                self.logger.warning("No hay conexión a la base de datos. Saltando paso de carga.")
-                self.logger.info("Los datos transformados se han guardado en archivos CSV para uso offline.")
-                return False
-
-            self._create_tables()
-
-            # Preparar datos detallados
-            detailed_data = self.transformed_data[[
-                'SEASON_YEAR', 'TEAM_ID', 'TEAM_NAME', 'GAME_DATE', 'MATCHUP', 'WL',
-                'PTS', 'FG3M', 'AST', 'OFFENSIVE_EFFICIENCY', 'DEFENSIVE_RATING',
-                'PLUS_MINUS_PER_MIN', 'AST_TO_RATIO'
-            ]].copy()
-
-            # Convertir a lista de tuplas para psycopg2 - Convertir tipos NumPy a Python
-            detailed_records = [tuple(x.item() if hasattr(x, 'item') else x for x in row) 
-                           for row in detailed_data.values]
-
-            with self.conn.cursor() as cur:
-                # Insertar datos detallados usando execute_values
-                execute_values(
-                    cur,
-                    """
-                    INSERT INTO nba_playoffs_detailed 
-                    (season_year, team_id, team_name, game_date, matchup, wl, 
-                     pts, fg3m, ast, offensive_efficiency, defensive_rating,
-                     plus_minus_per_min, ast_to_ratio)
-                    VALUES %s
-                    """,
-                    detailed_records,
-                    page_size=100
-                )
-
-                # Convertir objetos NumPy a tipos Python estándar para el resumen por temporada
-                season_records = [
-                    (index, 
-                     float(row['PTS']), 
-                     float(row['FG3M']), 
-                     float(row['AST']),
-                     float(row['OFFENSIVE_EFFICIENCY']), 
-                     float(row['DEFENSIVE_RATING']))
-                    for index, row in self.season_summary.iterrows()
-                ]
-
-                # Insertar resumen por temporada
-                execute_values(
-                    cur,
-                    """
-                    INSERT INTO nba_playoffs_season_summary 
-                    (season_year, avg_pts, avg_fg3m, avg_ast, 
-                     avg_off_efficiency, avg_def_rating)
-                    VALUES %s
-                    """,
-                    season_records,
-                    page_size=100
-                )
-
-                # Convertir objetos NumPy a tipos Python estándar para el resumen por equipo
-                team_records = [
-                    (index, 
-                     float(row['PTS']), 
-                     float(row['WL']),
-                     float(row['OFFENSIVE_EFFICIENCY']), 
-                     float(row['DEFENSIVE_RATING']))
-                    for index, row in self.team_summary.iterrows()
-                ]
-
-                # Insertar resumen por equipo
-                execute_values(
-                    cur,
-                    """
-                    INSERT INTO nba_playoffs_team_summary 
-                    (team_name, avg_pts, win_rate, 
-                     avg_off_efficiency, avg_def_rating)
-                    VALUES %s
-                    """,
-                    team_records,
-                    page_size=100
-                )
-
-                self.conn.commit()
+            # El run_id permite reanudar la carga desde el último lote confirmado
+            if self.load_run_id is None:
+                self.load_run_id = self._compute_load_run_id()
+
+            # Cada tabla se carga en su propia conexión y se publican juntas al final
+            loader = ParallelTableLoader(self.db_config, logger=self.logger)
+            loader.load(self._build_table_loads(), run_id=self.load_run_id)
 
             self.logger.info("Datos cargados correctamente a PostgreSQL")
             return True
 
         except Exception as e:
             self.logger.error(f"Error en la carga de datos: {str(e)}")
-            if self.conn:
-                self.conn.rollback()
+            self.last_error = e
             return False
         finally:
             if self.conn:
                 self.conn.close()
                 self.logger.info("Conexión a base de datos cerrada")
 
+    def _pipeline_work_id(self):
+        """Identifica el trabajo para agrupar ejecuciones idénticas concurrentes"""
+        try:
+            return f"etl:{self.target}:{self._compute_load_run_id()}"
+        except (OSError, TypeError):
+            return None
+
     def run_pipeline(self):
+        # Una sola ejecución a la vez sobre las tablas y archivos compartidos
+        return self.coordinator.run(PIPELINE_LOCK, self._run_pipeline, work_id=self._pipeline_work_id())
+
+    @staticmethod
+    def cache_fingerprint(cache, input_file, target):
+        """Huella de la transformación y carga para la caché de sesión (None si no aplica)"""
+        if not cache.enabled or not input_file or not Path(input_file).exists():
+            return None
+        return cache.fingerprint(input_file, extra=f"etl:{target}")
+
+    def _run_pipeline(self):
    
         self.logger.info("Iniciando pipeline ETL")
 
+        # Misma fuente y mismo código ya procesados en esta sesión: reutilizar el resultado
+        cache = RunCache(logger=self.logger)
+        fingerprint = self.cache_fingerprint(cache, self.input_file, self.target)
+        if fingerprint and cache.lookup(self.CACHE_STAGE, fingerprint):
+            cache.announce_hit(self.CACHE_STAGE)
+            return True
+
+        emit_progress('etl', 0, 3, 'Leyendo datos de entrada')
         if not self.extract():
             self.logger.error("Extracción fallida. Deteniendo pipeline.")
             return False
 
+        emit_progress('etl', 1, 3, 'Transformando datos')
         if not self.transform():
             self.logger.error("Transformación fallida. Deteniendo pipeline.")
             return False
 
-        if not self.load():
+        emit_progress('etl', 2, 3, 'Cargando tablas')
+        loaded = self.load()
+        emit_progress('etl', 3, 3, 'Carga finalizada')
+        if not loaded:
             self.logger.warning("Carga a base de datos fallida. Los datos están disponibles en archivos CSV.")
             # No consideramos esto un error crítico si tenemos los datos en CSV
             
@@ -430,6 +524,11 @@ class NBAPlayoffsETL:
             if self.raw_data is not None:
                 f.write(f"Filas procesadas: {len(self.raw_data)}\n")
 
+        # Solo una carga completa puede reutilizarse en etapas posteriores
+        if fingerprint and loaded:
+            cache.record(self.CACHE_STAGE, fingerprint, outputs=self.output_files,
+                         input_file=str(self.input_file))
+
         self.logger.info("Pipeline ETL completado correctamente")
         return True
 
@@ -445,6 +544,12 @@ def main():
     parser.add_argument('--db', type=str, default='nba_playoffs', help='Nombre de base de datos')
     parser.add_argument('--user', type=str, default='postgres', help='Usuario de base de datos')
     parser.add_argument('--password', type=str, default='123', help='Contraseña de base de datos')
+    parser.add_argument('--target', type=str, default='auto', choices=['auto', 'postgresql', 'sqlite'],
+                        help='Destino de carga (auto: SQLite si PostgreSQL no está disponible)')
+    parser.add_argument('--sqlite-path', type=str, default=DEFAULT_SQLITE_PATH, help='Archivo SQLite local')
+    parser.add_argument('--compression', type=str, choices=['none', 'gzip', 'zstd'],
+                        help='Compresión de los CSV generados (predeterminado: NBA_ETL_COMPRESSION o none)')
+    parser.add_argument('--compression-level', type=int, help='Nivel de compresión')
     
     args = parser.parse_args()
     
@@ -458,7 +563,9 @@ def main():
     }
 
     # Iniciar ETL
-    etl = NBAPlayoffsETL(input_file=args.input, db_config=db_config)
+    etl = NBAPlayoffsETL(input_file=args.input, db_config=db_config,
+                         target=args.target, sqlite_path=args.sqlite_path,
+                         compression=args.compression, compression_level=args.compression_level)
     success = etl.run_pipeline()
 
     if success:
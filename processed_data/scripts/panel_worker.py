@@ -0,0 +1,379 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Proceso de trabajo persistente para el panel de control: módulos precargados y conexión reutilizable
+"""
+import argparse
+import io
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from run_coordinator import RunCoordinator, PIPELINE_LOCK
+from db_status import DatabaseStatusService, PIPELINE_TABLES
+import log_tail
+import logging_setup
+from games_index import CachedGamesIndex, DISPLAY_COLUMNS
+
+try:
+    import psycopg2
+    from psycopg2 import pool
+except ImportError:
+    psycopg2 = None
+
+
+# Módulos que se importan al arrancar para que cada acción no pague su carga
+PRELOAD_MODULES = ['pandas', 'numpy', 'sqlalchemy', 'psycopg2', 'requests',
+                   'nba_etl', 'simplified_transformer', 'test_extraction', 'automaticetl']
+
+
+class _OutputStream(io.TextIOBase):
+    """Sustituye a stdout/stderr: cada línea escrita se envía como mensaje de la petición en curso"""
+
+    def __init__(self, worker, stream):
+        self.worker = worker
+        self.stream = stream
+        self.local = threading.local()
+
+    @property
+    def encoding(self):
+        return 'utf-8'
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', '') + text
+        *lines, self.local.buffer = buffer.split('\n')
+        for line in lines:
+            self.worker.emit_output(line, self.stream)
+        return len(text)
+
+    def flush(self):
+        pending = getattr(self.local, 'buffer', '')
+        if pending:
+            self.local.buffer = ''
+            self.worker.emit_output(pending, self.stream)
+
+
+class PanelWorker:
+    """Atiende peticiones JSON por stdin y responde por stdout, una por línea.
+
+    Petición:  {"id": 1, "cmd": "run_script", "args": {...}}
+    Respuesta: {"id": 1, "type": "output", "line": "..."} mientras se ejecuta
+               {"id": 1, "type": "result", "ok": true, "result": {...}} al terminar
+
+    Cada petición se atiende en un hilo del pool, de modo que una consulta
+    rápida no espera a un script en curso. Solo se admite un script a la vez.
+    """
+
+    def __init__(self, db_config, max_workers=4):
+        self.db_config = db_config
+        self.channel = sys.__stdout__
+        self.send_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='panel-worker')
+        self.context = threading.local()
+        self.script_lock = threading.Lock()
+        self.script_request = None
+        self.pool = None
+        # Sesión propia (solo lectura, autocommit) para el estado de la BD, fuera del pool de escritura
+        self.status_lock = threading.Lock()
+        self.status_conn = None
+        self.preloaded = []
+        # Peticiones de larga duración (seguimiento de logs) que se pueden cancelar
+        self.cancel_events = {}
+        # Estado de la BD con estimaciones del catálogo y caché corta para el sondeo del panel
+        self.status_service = DatabaseStatusService(self._status_session, self._release_status_session, ttl=5.0)
+        # Índice de partidos en memoria; se reconstruye cuando el ETL reescribe los datos
+        self.games_index = CachedGamesIndex()
+
+    # Canal de comunicación
+
+    def send(self, message):
+        data = json.dumps(message, ensure_ascii=False, default=str)
+        with self.send_lock:
+            self.channel.write(data + '\n')
+            self.channel.flush()
+
+    def emit_output(self, line, stream='stdout'):
+        # Los hilos creados por un script no tienen contexto: su salida es del script
+        request_id = getattr(self.context, 'request_id', None) or self.script_request
+        self.send({'id': request_id, 'type': 'output', 'stream': stream, 'line': line})
+
+    # Arranque
+
+    def preload(self):
+        for name in PRELOAD_MODULES:
+            try:
+                __import__(name)
+                self.preloaded.append(name)
+            except Exception as e:
+                print(f"No se pudo precargar {name}: {str(e)}", file=sys.stderr)
+
+    def _get_pool(self):
+        """Pool de conexiones; se reintenta en cada uso si PostgreSQL no estaba disponible"""
+        if self.pool is None:
+            if psycopg2 is None:
+                raise RuntimeError("psycopg2 no está instalado")
+            self.pool = pool.ThreadedConnectionPool(
+                1, 4,
+                dbname=self.db_config['database'],
+                user=self.db_config['user'],
+                password=self.db_config['password'],
+                host=self.db_config['host'],
+                port=self.db_config['port'],
+                connect_timeout=5
+            )
+        return self.pool
+
+    def _connection(self):
+        conn = self._get_pool().getconn()
+        if conn.closed:
+            self.pool.putconn(conn, close=True)
+            conn = self.pool.getconn()
+        return conn
+
+    def _release(self, conn, broken=False):
+        if self.pool:
+            self.pool.putconn(conn, close=broken)
+
+    def _status_session(self):
+        with self.status_lock:
+            if self.status_conn is None or self.status_conn.closed:
+                if psycopg2 is None:
+                    raise RuntimeError("psycopg2 no está instalado")
+                self.status_conn = DatabaseStatusService.open_session(self.db_config)
+            return self.status_conn
+
+    def _release_status_session(self, conn, broken=False):
+        # La sesión se reutiliza entre consultas; solo se cierra si la conexión se perdió
+        if broken:
+            with self.status_lock:
+                conn.close()
+                if self.status_conn is conn:
+                    self.status_conn = None
+
+    # Comandos
+
+    def cmd_ping(self, args):
+        return {'pid': os.getpid(), 'preloaded': self.preloaded,
+                'database': self.pool is not None, 'script_running': self.script_request is not None}
+
+    def cmd_check_database(self, args):
+        """Estado de las tablas: estimaciones por defecto, conteo exacto y muestra a petición"""
+        return self.status_service.status(
+            exact=args.get('exact', False),
+            sample_rows=args.get('sample_rows', 0),
+            refresh=args.get('refresh', False)
+        )
+
+    def cmd_clear_database(self, args):
+        """Vacía las tablas del pipeline sin coincidir con una ejecución en curso"""
+        def truncate():
+            conn = self._connection()
+            broken = False
+            try:
+                with conn.cursor() as cursor:
+                    for table in PIPELINE_TABLES:
+                        print(f"Truncando tabla {table}...")
+                        cursor.execute(f"TRUNCATE TABLE {table} RESTART IDENTITY CASCADE;")
+                conn.commit()
+                self.status_service.invalidate()
+                return {'tables': PIPELINE_TABLES}
+            except psycopg2.OperationalError:
+                broken = True
+                raise
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self._release(conn, broken)
+
+        coordinator = RunCoordinator(self.db_config)
+        return coordinator.run(PIPELINE_LOCK, truncate)
+
+    def cmd_run_script(self, args):
+        """Ejecuta un script del pipeline como __main__ dentro del proceso"""
+        if not self.script_lock.acquire(blocking=False):
+            raise RuntimeError("Ya hay un script en ejecución en el worker")
+
+        path = args['path']
+        previous_argv = sys.argv
+        previous_env = {key: os.environ.get(key) for key in args.get('env', {})}
+        self.script_request = self.context.request_id
+        started = time.perf_counter()
+        try:
+            os.environ.update(args.get('env', {}))
+            sys.argv = [path, *args.get('argv', [])]
+            # Cada script instala su propio logging (y su run_id) al arrancar
+            logging_setup.shutdown_logging()
+
+            try:
+                runpy.run_path(path, run_name='__main__')
+                return_code = 0
+            except SystemExit as e:
+                if e.code is None or isinstance(e.code, int):
+                    return_code = e.code or 0
+                else:
+                    print(e.code)
+                    return_code = 1
+            except Exception:
+                traceback.print_exc()
+                return_code = 1
+            return {'return_code': return_code, 'duration': round(time.perf_counter() - started, 2)}
+        finally:
+            # Vaciar la cola de logging antes de responder
+            logging_setup.shutdown_logging()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            sys.argv = previous_argv
+            for key, value in previous_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+            self.script_request = None
+            self.script_lock.release()
+            # El script pudo cargar o vaciar tablas
+            self.status_service.invalidate()
+
+    def cmd_tail_logs(self, args):
+        """Últimas líneas del log más reciente o vista combinada de todos los logs"""
+        log_dir = args.get('log_dir', 'logs')
+        lines = args.get('lines', 20)
+        if args.get('combined'):
+            paths = log_tail.latest_per_source(log_dir)
+            return {'files': [path.name for path in paths], 'lines': log_tail.combined_tail(paths, lines)}
+
+        files = log_tail.log_files(log_dir)
+        if not files:
+            return {'files': [], 'lines': []}
+        last_lines = log_tail.tail(files[0], lines)
+        return {'files': [files[0].name], 'lines': [log_tail.format_line(line) for line in last_lines]}
+
+    def cmd_follow_logs(self, args):
+        """Envía las líneas nuevas de los logs como salida hasta recibir 'cancel'"""
+        log_dir = args.get('log_dir', 'logs')
+        combined = args.get('combined', False)
+        if combined:
+            paths_fn = lambda: log_tail.latest_per_source(log_dir)
+        else:
+            paths_fn = lambda: log_tail.log_files(log_dir)[:1]
+
+        stop_event = threading.Event()
+        request_id = self.context.request_id
+        self.cancel_events[request_id] = stop_event
+        followed = 0
+        try:
+            for path, line in log_tail.follow(log_dir, paths_fn, stop_event):
+                followed += 1
+                line = log_tail.format_line(line)
+                self.emit_output(f"[{log_tail.source_name(path)}] {line}" if combined else line)
+        finally:
+            self.cancel_events.pop(request_id, None)
+        return {'lines': followed}
+
+    def cmd_query_games(self, args):
+        """Partidos o resumen por equipo desde el índice en memoria (equipo, temporada, fechas)"""
+        index = self.games_index.get()
+        query = [args.get(key) or None for key in ('team', 'season', 'start', 'end')]
+        if args.get('summary'):
+            rows = index.team_summary(*query)
+        else:
+            rows = index.games(*query, columns=[column for column in DISPLAY_COLUMNS if column in index.df.columns])
+        limit = args.get('limit', 50)
+        return {
+            'source': index.source,
+            'total': len(rows),
+            'columns': list(rows.columns),
+            'rows': rows.head(limit).astype(str).values.tolist()
+        }
+
+    def cmd_cancel(self, args):
+        """Detiene una petición de seguimiento en curso"""
+        stop_event = self.cancel_events.get(args.get('target'))
+        if stop_event:
+            stop_event.set()
+        return {'cancelled': stop_event is not None}
+
+    # Bucle principal
+
+    def handle(self, request):
+        request_id = request.get('id')
+        self.context.request_id = request_id
+        try:
+            handler = getattr(self, f"cmd_{request.get('cmd')}", None)
+            if handler is None:
+                raise ValueError(f"Comando desconocido: {request.get('cmd')}")
+            result = handler(request.get('args', {}))
+            self.send({'id': request_id, 'type': 'result', 'ok': True, 'result': result})
+        except Exception as e:
+            self.send({'id': request_id, 'type': 'result', 'ok': False,
+                       'error': f"{type(e).__name__}: {str(e).strip()}"})
+        finally:
+            self.context.request_id = None
+
+    def serve(self):
+        # El builtin exit() de los scripts cierra sys.stdin: las peticiones se leen
+        # del descriptor original y los scripts ven una entrada vacía
+        requests = sys.stdin
+        sys.stdin = io.StringIO()
+        sys.stdout = _OutputStream(self, 'stdout')
+        sys.stderr = _OutputStream(self, 'stderr')
+
+        self.preload()
+        try:
+            self._get_pool()
+        except Exception as e:
+            print(f"Sin conexión a PostgreSQL al arrancar: {str(e).strip()}", file=sys.stderr)
+        self.send({'type': 'ready', 'pid': os.getpid(), 'preloaded': self.preloaded})
+
+        for line in requests:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                self.send({'type': 'error', 'error': f"Petición inválida: {line.strip()}"})
+                continue
+            if request.get('cmd') == 'shutdown':
+                for stop_event in list(self.cancel_events.values()):
+                    stop_event.set()
+                self.send({'id': request.get('id'), 'type': 'result', 'ok': True, 'result': None})
+                break
+            self.executor.submit(self.handle, request)
+
+        self.executor.shutdown(wait=False)
+        if self.pool:
+            self.pool.closeall()
+        if self.status_conn:
+            self.status_conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Worker persistente del panel NBA Playoffs ETL')
+    parser.add_argument('--host', type=str, default='localhost', help='Host de PostgreSQL')
+    parser.add_argument('--port', type=str, default='5432', help='Puerto de PostgreSQL')
+    parser.add_argument('--db', type=str, default='nba_playoffs', help='Nombre de la base de datos')
+    parser.add_argument('--user', type=str, default='postgres', help='Usuario de PostgreSQL')
+    parser.add_argument('--password', type=str, default='123', help='Contraseña de PostgreSQL')
+    args = parser.parse_args()
+
+    worker = PanelWorker({
+        'host': args.host,
+        'port': args.port,
+        'database': args.db,
+        'user': args.user,
+        'password': args.password
+    })
+    worker.serve()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
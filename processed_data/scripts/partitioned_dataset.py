@@ -0,0 +1,237 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Conjunto de datos particionado por temporada (season=<temporada>/part-*.parquet) con reescritura incremental y lectura filtrada
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+from fs_utils import write_text_atomic
+
+
+MANIFEST_FILE = '_partitions.json'
+PARTITION_COLUMN = 'SEASON_YEAR'
+PARTITION_KEY = 'season'
+GROUP_COLUMN = 'TEAM_NAME'
+SORT_COLUMNS = ('TEAM_NAME', 'GAME_DATE')
+PARQUET_COMPRESSION = 'zstd'
+
+
+class PartitionedDataset:
+    """Salida procesada como conjunto Parquet con particiones estilo Hive por temporada.
+
+    Cada temporada vive en season=<valor>/part-<hash>.parquet, ordenada por
+    equipo y fecha, con un grupo de filas por equipo. _partitions.json guarda
+    la huella del contenido de cada partición: al volver a escribir solo se
+    regeneran las temporadas que cambiaron. La lectura abre únicamente las
+    particiones pedidas y, dentro de ellas, los grupos de filas cuyas
+    estadísticas (mínimo/máximo) pueden contener los equipos buscados.
+    """
+
+    def __init__(self, root, partition_column=PARTITION_COLUMN, key=PARTITION_KEY,
+                 group_column=GROUP_COLUMN, logger=None):
+        if not PARQUET_AVAILABLE:
+            raise RuntimeError("pyarrow no está instalado: el conjunto particionado no está disponible")
+        self.root = Path(root)
+        self.manifest_path = self.root / MANIFEST_FILE
+        self.partition_column = partition_column
+        self.key = key
+        self.group_column = group_column
+        self.logger = logger or logging.getLogger(__name__)
+
+    # Manifiesto
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {'partition_column': self.partition_column, 'partitions': {}}
+
+    def partitions(self):
+        """Particiones registradas: {valor: {path, sha256, rows, row_groups}}"""
+        return self.load_manifest()['partitions']
+
+    def _partition_dir(self, value):
+        return self.root / f"{self.key}={value}"
+
+    # Escritura
+
+    def _sorted(self, group):
+        columns = [column for column in SORT_COLUMNS if column in group.columns]
+        return group.sort_values(columns, kind='stable').reset_index(drop=True) if columns else group.reset_index(drop=True)
+
+    @staticmethod
+    def _fingerprint(group):
+        digest = hashlib.sha256()
+        digest.update('\x1f'.join(f"{column}:{dtype}" for column, dtype in group.dtypes.items()).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(group, index=False).to_numpy().tobytes())
+        return digest.hexdigest()
+
+    def _write_partition(self, group, schema, path):
+        tmp = path.with_name(f".{path.name}.tmp")
+        row_groups = 0
+        with pq.ParquetWriter(tmp, schema, compression=PARQUET_COMPRESSION) as writer:
+            # Un grupo de filas por equipo: sus estadísticas permiten saltar los demás al leer
+            if self.group_column in group.columns:
+                chunks = (rows for _, rows in group.groupby(self.group_column, sort=True))
+            else:
+                chunks = [group]
+            for rows in chunks:
+                writer.write_table(pa.Table.from_pandas(rows, schema=schema, preserve_index=False))
+                row_groups += 1
+        os.replace(tmp, path)
+        return row_groups
+
+    def write(self, df):
+        """Escribe df particionado; devuelve las temporadas escritas, sin cambios y eliminadas"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        manifest = self.load_manifest()
+        previous = manifest['partitions']
+        # Mismo esquema en todas las particiones, aunque una temporada tenga una columna vacía
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+
+        partitions, written, unchanged = {}, [], []
+        for value, group in df.groupby(self.partition_column, sort=True):
+            value = str(value)
+            group = self._sorted(group)
+            fingerprint = self._fingerprint(group)
+            entry = previous.get(value)
+            if entry and entry['sha256'] == fingerprint and (self.root / entry['path']).exists():
+                partitions[value] = entry
+                unchanged.append(value)
+                continue
+
+            partition_dir = self._partition_dir(value)
+            partition_dir.mkdir(parents=True, exist_ok=True)
+            path = partition_dir / f"part-{fingerprint[:16]}.parquet"
+            row_groups = self._write_partition(group, schema, path)
+            partitions[value] = {
+                'path': path.relative_to(self.root).as_posix(),
+                'sha256': fingerprint,
+                'rows': len(group),
+                'row_groups': row_groups
+            }
+            written.append(value)
+
+        removed = sorted(set(previous) - set(partitions))
+        manifest = {
+            'partition_column': self.partition_column,
+            'updated_at': datetime.now().isoformat(),
+            'partitions': partitions
+        }
+        # El manifiesto se cambia antes de borrar nada: un lector nunca apunta a un archivo ausente
+        write_text_atomic(self.manifest_path, json.dumps(manifest, indent=2, ensure_ascii=False))
+        self._remove_stale(partitions, removed)
+
+        self.logger.info(f"Conjunto particionado {self.root}: {len(written)} temporadas reescritas, "
+                         f"{len(unchanged)} sin cambios, {len(removed)} eliminadas")
+        return {'written': written, 'unchanged': unchanged, 'removed': removed}
+
+    def _remove_stale(self, partitions, removed):
+        current = {self.root / entry['path'] for entry in partitions.values()}
+        for partition_dir in self.root.glob(f"{self.key}=*"):
+            for path in partition_dir.glob('part-*.parquet'):
+                if path not in current:
+                    path.unlink()
+            if partition_dir.name.split('=', 1)[1] in removed and not any(partition_dir.iterdir()):
+                partition_dir.rmdir()
+
+    # Lectura
+
+    def _row_groups(self, parquet_file, values):
+        """Grupos de filas cuyo rango de group_column puede contener alguno de values"""
+        metadata = parquet_file.metadata
+        if values is None or self.group_column not in parquet_file.schema_arrow.names:
+            return list(range(metadata.num_row_groups))
+        index = parquet_file.schema_arrow.get_field_index(self.group_column)
+        selected = []
+        for row_group in range(metadata.num_row_groups):
+            stats = metadata.row_group(row_group).column(index).statistics
+            if stats is None or not stats.has_min_max or any(stats.min <= value <= stats.max for value in values):
+                selected.append(row_group)
+        return selected
+
+    def plan(self, seasons=None, teams=None):
+        """Archivos y grupos de filas que leería read(): [(ruta, [grupos], total de grupos)]"""
+        seasons = {str(season) for season in seasons} if seasons else None
+        teams = sorted(teams) if teams else None
+        plan = []
+        for value, entry in sorted(self.partitions().items()):
+            if seasons is not None and value not in seasons:
+                continue
+            path = self.root / entry['path']
+            parquet_file = pq.ParquetFile(path)
+            plan.append((path, self._row_groups(parquet_file, teams), parquet_file.metadata.num_row_groups))
+        return plan
+
+    def read(self, seasons=None, teams=None, columns=None):
+        """DataFrame con las temporadas y equipos pedidos (None: todos)"""
+        read_columns = list(columns) if columns else None
+        if read_columns and teams and self.group_column not in read_columns:
+            read_columns.append(self.group_column)
+
+        tables = []
+        for path, row_groups, _ in self.plan(seasons, teams):
+            if row_groups:
+                tables.append(pq.ParquetFile(path).read_row_groups(row_groups, columns=read_columns))
+        if not tables:
+            return pd.DataFrame(columns=columns or [])
+
+        df = pa.concat_tables(tables).to_pandas()
+        if teams:
+            # Un grupo de filas puede abarcar un rango de equipos: filtro final exacto
+            df = df[df[self.group_column].isin(teams)].reset_index(drop=True)
+        if columns:
+            df = df[list(columns)]
+        return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lectura filtrada del conjunto particionado por temporada')
+    parser.add_argument('root', type=str, help='Directorio del conjunto (p. ej. processed_data/playoffs_advanced_dataset)')
+    parser.add_argument('--season', type=str, nargs='+', help='Temporadas a leer (p. ej. 2023-24)')
+    parser.add_argument('--team', type=str, nargs='+', help='Equipos a leer (TEAM_NAME)')
+    parser.add_argument('--columns', type=str, nargs='+', help='Columnas a leer')
+    args = parser.parse_args()
+
+    if not PARQUET_AVAILABLE:
+        print("pyarrow no está instalado.")
+        return 1
+    dataset = PartitionedDataset(args.root)
+    if not dataset.partitions():
+        print(f"No hay particiones registradas en {args.root}")
+        return 1
+
+    plan = dataset.plan(args.season, args.team)
+    started = time.perf_counter()
+    df = dataset.read(args.season, args.team, args.columns)
+    elapsed = time.perf_counter() - started
+
+    total_partitions = len(dataset.partitions())
+    groups_read = sum(len(row_groups) for _, row_groups, _ in plan)
+    groups_total = sum(total for _, _, total in plan)
+    print(f"Particiones leídas: {len(plan)} de {total_partitions}; grupos de filas: {groups_read} de {groups_total}")
+    print(f"{len(df)} filas en {elapsed * 1000:.1f} ms")
+    print(df.head(20).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
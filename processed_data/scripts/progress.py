@@ -0,0 +1,25 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Eventos de progreso estructurados para el panel de control
+"""
+import json
+import os
+import sys
+
+
+# El panel fija esta variable; en ejecuciones por consola no se emite nada
+PROGRESS_ENV = 'NBA_ETL_PROGRESS'
+PROGRESS_MARKER = '@@PROGRESS'
+
+
+def progress_enabled():
+    return os.environ.get(PROGRESS_ENV) == '1'
+
+
+def emit_progress(stage, current, total, message=''):
+    """Publica en stdout una línea '@@PROGRESS {json}' con el avance de la etapa"""
+    if not progress_enabled():
+        return
+    event = {'stage': stage, 'current': current, 'total': total, 'message': message}
+    print(f"{PROGRESS_MARKER} {json.dumps(event, ensure_ascii=False)}", file=sys.stdout, flush=True)
@@ -0,0 +1,125 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Caché de etapas por sesión: evita repetir trabajo ya hecho con la misma fuente y el mismo código
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+
+# Variable de entorno con la sesión; el panel la fija en cada proceso completo
+SESSION_ENV = 'NBA_ETL_SESSION'
+DEFAULT_CACHE_DIR = 'logs/run_cache'
+# Línea que el panel reconoce para mostrar la etapa como "omitida (caché)"
+CACHED_MARKER = '@@CACHED'
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+_code_version = None
+_file_hashes = {}
+
+
+def code_version():
+    """Huella del código del pipeline: cualquier cambio en los scripts invalida la caché"""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        for script in sorted(SCRIPTS_DIR.glob('*.py')):
+            digest.update(script.name.encode())
+            digest.update(script.read_bytes())
+        _code_version = digest.hexdigest()[:16]
+    return _code_version
+
+
+def file_hash(path):
+    """SHA-256 del contenido, memorizado por ruta, tamaño y fecha de modificación"""
+    path = Path(path)
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_hashes:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        _file_hashes[key] = digest.hexdigest()
+    return _file_hashes[key]
+
+
+class RunCache:
+    """Registro de las etapas completadas en una sesión.
+
+    Cada entrada guarda la huella de la etapa (hash de la fuente, versión del
+    código y parámetros) y sus archivos de salida. Una etapa posterior de la
+    misma sesión con la misma huella reutiliza la entrada en lugar de repetir
+    el trabajo, siempre que las salidas sigan existiendo. Sin sesión la caché
+    está desactivada y todas las etapas se ejecutan.
+    """
+
+    def __init__(self, session_id=None, cache_dir=DEFAULT_CACHE_DIR, logger=None):
+        self.session_id = session_id or os.environ.get(SESSION_ENV)
+        self.cache_dir = Path(cache_dir)
+        self.logger = logger or logging.getLogger(__name__)
+
+    @property
+    def enabled(self):
+        return bool(self.session_id)
+
+    @property
+    def session_file(self):
+        return self.cache_dir / f"{self.session_id}.json"
+
+    def fingerprint(self, *sources, extra=''):
+        """Huella de una etapa: contenido de las fuentes, versión del código y parámetros"""
+        digest = hashlib.sha256(code_version().encode())
+        for source in sources:
+            digest.update(file_hash(source).encode())
+        digest.update(extra.encode())
+        return digest.hexdigest()[:32]
+
+    def _read(self):
+        try:
+            return json.loads(self.session_file.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def lookup(self, stage, fingerprint=None):
+        """Entrada de la etapa si coincide la huella y sus salidas siguen existiendo"""
+        if not self.enabled:
+            return None
+        entry = self._read().get(stage)
+        if not entry:
+            return None
+        if fingerprint is not None and entry.get('fingerprint') != fingerprint:
+            return None
+        if not all(Path(output).exists() for output in entry.get('outputs', [])):
+            return None
+        return entry
+
+    def record(self, stage, fingerprint, outputs=(), **info):
+        """Registra una etapa completada en la sesión"""
+        if not self.enabled:
+            return
+        entries = self._read()
+        entries[stage] = {
+            'fingerprint': fingerprint,
+            'outputs': [str(output) for output in outputs],
+            'finished': datetime.now().isoformat(),
+            **info
+        }
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.session_file.with_suffix('.tmp')
+            tmp_file.write_text(json.dumps(entries, indent=2))
+            os.replace(tmp_file, self.session_file)
+        except OSError as e:
+            self.logger.warning(f"No se pudo registrar la etapa '{stage}' en la caché: {str(e)}")
+
+    def announce_hit(self, stage):
+        """Informa al panel de que la etapa se ha omitido por estar en caché"""
+        self.logger.info(f"Etapa '{stage}' omitida: resultado en caché de la sesión {self.session_id}")
+        print(f"{CACHED_MARKER} {stage}", file=sys.stdout, flush=True)
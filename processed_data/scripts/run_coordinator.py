@@ -0,0 +1,278 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Coordinación de ejecuciones: bloqueo entre procesos y agrupación de trabajo idéntico
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: bloqueo de archivo con msvcrt
+    fcntl = None
+    import msvcrt
+
+
+DEFAULT_LOCK_DIR = 'logs/locks'
+# Bloqueo común: todos los pipelines escriben en las mismas tablas y en data/processed_data
+PIPELINE_LOCK = 'nba_pipeline'
+
+# Estado compartido por todos los coordinadores del proceso
+_registry_lock = threading.Lock()
+_key_locks = {}
+_holders = {}
+_inflight = {}
+
+
+def _key_lock(key):
+    with _registry_lock:
+        return _key_locks.setdefault(key, threading.RLock())
+
+
+def advisory_key(key):
+    """Clave entera de 64 bits para pg_advisory_lock a partir del nombre"""
+    digest = hashlib.sha256(key.encode()).digest()
+    return int.from_bytes(digest[:8], 'big', signed=True)
+
+
+class FileLock:
+    """Bloqueo exclusivo sobre un archivo (flock en POSIX, msvcrt en Windows)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.handle = None
+
+    def acquire(self, blocking=True):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.handle = open(self.path, 'a+')
+        try:
+            if fcntl:
+                flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                fcntl.flock(self.handle.fileno(), flags)
+            else:
+                self.handle.seek(0)
+                mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+                while True:
+                    try:
+                        msvcrt.locking(self.handle.fileno(), mode, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK solo reintenta 10 segundos
+                        if not blocking:
+                            raise
+            return True
+        except OSError:
+            self.handle.close()
+            self.handle = None
+            return False
+
+    def release(self):
+        if self.handle is None:
+            return
+        if fcntl:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+        else:
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+        self.handle.close()
+        self.handle = None
+
+
+class PostgresAdvisoryLock:
+    """Bloqueo de sesión pg_advisory_lock sobre una conexión dedicada"""
+
+    def __init__(self, db_config, key):
+        self.db_config = db_config
+        self.key = advisory_key(key)
+        self.conn = None
+
+    def connect(self):
+        if self.conn is None:
+            self.conn = psycopg2.connect(
+                dbname=self.db_config['database'],
+                user=self.db_config['user'],
+                password=self.db_config['password'],
+                host=self.db_config['host'],
+                port=self.db_config['port'],
+                connect_timeout=5
+            )
+            self.conn.autocommit = True
+
+    def acquire(self, blocking=True):
+        self.connect()
+        with self.conn.cursor() as cursor:
+            if blocking:
+                cursor.execute("SELECT pg_advisory_lock(%s)", (self.key,))
+                return True
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (self.key,))
+            return cursor.fetchone()[0]
+
+    def release(self):
+        if self.conn is None:
+            return
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (self.key,))
+        finally:
+            # Cerrar la sesión libera igualmente cualquier bloqueo pendiente
+            self.conn.close()
+            self.conn = None
+
+
+class RunCoordinator:
+    """Serializa las ejecuciones que comparten tablas y archivos de salida.
+
+    El bloqueo de archivo en logs/locks protege siempre los archivos locales;
+    con conexión a PostgreSQL se toma además un advisory lock para excluir
+    ejecuciones de otras máquinas sobre la misma base de datos.
+
+    Las peticiones con el mismo work_id se agrupan: dentro del proceso esperan
+    al Future de la ejecución en curso; entre procesos, quien esperaba el
+    bloqueo reutiliza el resultado correcto que la otra ejecución dejó en
+    logs/locks/<clave>.result.json. El bloqueo es reentrante en el mismo hilo.
+    """
+
+    def __init__(self, db_config=None, lock_dir=DEFAULT_LOCK_DIR, use_database=True, logger=None):
+        self.db_config = db_config
+        self.lock_dir = Path(lock_dir)
+        self.use_database = use_database and db_config is not None and psycopg2 is not None
+        self.logger = logger or logging.getLogger(__name__)
+
+    def _result_file(self, key):
+        return self.lock_dir / f"{key}.result.json"
+
+    def run(self, key, func, work_id=None):
+        """Ejecuta func con el bloqueo 'key' y devuelve su resultado"""
+        me = threading.get_ident()
+        local_lock = _key_lock(key)
+
+        # Reentrada: el hilo ya tiene el bloqueo (p. ej. automatización -> pipeline)
+        with _registry_lock:
+            holder = _holders.get(key)
+            if holder and holder[0] == me:
+                _holders[key] = (me, holder[1] + 1)
+                reentrant = True
+            else:
+                reentrant = False
+        if reentrant:
+            try:
+                return func()
+            finally:
+                with _registry_lock:
+                    _holders[key] = (me, _holders[key][1] - 1)
+
+        # Trabajo idéntico en curso dentro del proceso: esperar su resultado
+        if work_id is not None:
+            with _registry_lock:
+                inflight = _inflight.get((key, work_id))
+                if inflight is None:
+                    future = Future()
+                    _inflight[(key, work_id)] = future
+            if inflight is not None:
+                self.logger.info(f"Ejecución idéntica en curso para '{key}'. Esperando su resultado.")
+                return inflight.result()
+        else:
+            future = None
+
+        try:
+            result = self._run_locked(key, func, work_id, local_lock, me)
+        except BaseException as e:
+            if future:
+                future.set_exception(e)
+            raise
+        finally:
+            if future:
+                with _registry_lock:
+                    _inflight.pop((key, work_id), None)
+
+        if future:
+            future.set_result(result)
+        return result
+
+    def _run_locked(self, key, func, work_id, local_lock, me):
+        waiting_since = time.time()
+        local_lock.acquire()
+        locks = []
+        try:
+            contended = False
+            for lock in self._external_locks(key):
+                locks.append(lock)
+                if not lock.acquire(blocking=False):
+                    contended = True
+                    self.logger.info(f"Otra ejecución de '{key}' está en curso. Esperando a que termine...")
+                    lock.acquire()
+
+            # Entre procesos: la ejecución que nos bloqueaba pudo hacer el mismo trabajo
+            if contended and work_id is not None:
+                previous = self._read_result(key)
+                if (previous and previous.get('work_id') == work_id and previous.get('success')
+                        and previous.get('finished_at', 0) >= waiting_since):
+                    self.logger.info(f"Reutilizando el resultado de la ejecución concurrente de '{key}' "
+                                     f"(pid {previous.get('pid')})")
+                    return previous.get('result')
+
+            with _registry_lock:
+                _holders[key] = (me, 1)
+            try:
+                result = func()
+            finally:
+                with _registry_lock:
+                    _holders.pop(key, None)
+
+            if work_id is not None:
+                self._write_result(key, work_id, result)
+            return result
+        finally:
+            for lock in reversed(locks):
+                try:
+                    lock.release()
+                except Exception as e:
+                    self.logger.warning(f"No se pudo liberar el bloqueo de '{key}': {str(e)}")
+            local_lock.release()
+
+    def _external_locks(self, key):
+        locks = [FileLock(self.lock_dir / f"{key}.lock")]
+        if self.use_database:
+            lock = PostgresAdvisoryLock(self.db_config, key)
+            try:
+                lock.connect()
+                locks.append(lock)
+            except Exception as e:
+                self.logger.info(f"Sin bloqueo de PostgreSQL para '{key}' (modo sin conexión): {str(e)}")
+        return locks
+
+    def _read_result(self, key):
+        try:
+            return json.loads(self._result_file(key).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_result(self, key, work_id, result):
+        payload = {
+            'work_id': work_id,
+            'success': bool(result),
+            'result': result if isinstance(result, (bool, int, float, str, type(None))) else bool(result),
+            'finished_at': time.time(),
+            'finished': datetime.now().isoformat(),
+            'pid': os.getpid()
+        }
+        path = self._result_file(key)
+        tmp_path = path.with_suffix('.tmp')
+        try:
+            tmp_path.write_text(json.dumps(payload, indent=2))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning(f"No se pudo registrar el resultado de '{key}': {str(e)}")
@@ -0,0 +1,229 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Planificador por eventos: duerme hasta la próxima ejecución en lugar de sondear
+"""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+class CronExpression:
+    """Expresión cron de 5 campos: minuto hora día mes día_semana.
+
+    Admite '*', listas (1,15), rangos (1-5), pasos (*/10, 0-30/5), los alias
+    @hourly, @daily, @weekly, @monthly y el formato corto 'HH:MM' (diario).
+    """
+
+    FIELDS = [('minute', 0, 59), ('hour', 0, 23), ('day', 1, 31), ('month', 1, 12), ('weekday', 0, 7)]
+    ALIASES = {
+        '@hourly': '0 * * * *',
+        '@daily': '0 0 * * *',
+        '@weekly': '0 0 * * 0',
+        '@monthly': '0 0 1 * *'
+    }
+
+    def __init__(self, expression):
+        self.expression = expression.strip()
+        expression = self.ALIASES.get(self.expression, self.expression)
+
+        # Formato heredado de schedule_time: 'HH:MM'
+        if ':' in expression and ' ' not in expression:
+            hour, minute = expression.split(':')
+            expression = f"{int(minute)} {int(hour)} * * *"
+
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Expresión cron inválida: '{self.expression}'")
+
+        self.values = {}
+        for (name, low, high), part in zip(self.FIELDS, parts):
+            self.values[name] = self._parse_field(part, low, high, name)
+
+        # Semántica cron: si se restringen día del mes y día de la semana basta con uno
+        self.day_restricted = parts[2] != '*'
+        self.weekday_restricted = parts[4] != '*'
+
+    def _parse_field(self, part, low, high, name):
+        values = set()
+        for item in part.split(','):
+            step = 1
+            if '/' in item:
+                item, step = item.split('/')
+                step = int(step)
+            if item == '*':
+                start, end = low, high
+            elif '-' in item:
+                start, end = (int(v) for v in item.split('-'))
+            else:
+                start = end = int(item)
+                if step != 1:
+                    end = high
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"Valor fuera de rango en el campo {name}: '{part}'")
+            values.update(range(start, end + 1, step))
+        # 7 también representa el domingo
+        if name == 'weekday' and 7 in values:
+            values.discard(7)
+            values.add(0)
+        return values
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.values['day']
+        # datetime.weekday(): lunes=0; cron: domingo=0
+        weekday_ok = (moment.weekday() + 1) % 7 in self.values['weekday']
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment):
+        """Primera fecha estrictamente posterior a 'moment' que cumple la expresión"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+
+        while candidate <= limit:
+            if candidate.month not in self.values['month']:
+                year = candidate.year + (candidate.month == 12)
+                month = candidate.month % 12 + 1
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if candidate.hour not in self.values['hour']:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+                continue
+            if candidate.minute not in self.values['minute']:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+
+        raise ValueError(f"La expresión '{self.expression}' no tiene próximas ejecuciones")
+
+
+class ScheduledJob:
+    """Trabajo programado con su estado de ejecución"""
+
+    def __init__(self, name, cron, func):
+        self.name = name
+        self.cron = cron
+        self.func = func
+        self.next_run = cron.next_after(datetime.now())
+        self.last_run = None
+        self.last_duration = None
+        self.last_status = None
+        self.running = False
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'schedule': self.cron.expression,
+            'next_run': self.next_run.isoformat() if self.next_run else None,
+            'last_run': self.last_run.isoformat() if self.last_run else None,
+            'last_duration': self.last_duration,
+            'last_status': self.last_status,
+            'running': self.running
+        }
+
+
+class EventScheduler:
+    """Ejecuta trabajos cron en un pool de hilos.
+
+    El hilo principal calcula la próxima ejecución y espera exactamente hasta
+    ese momento; añadir trabajos o detener el planificador lo despierta.
+    Un trabajo que sigue en curso no se vuelve a lanzar (se omite ese turno).
+    """
+
+    # Espera máxima para absorber cambios de hora del sistema
+    MAX_SLEEP = 3600
+
+    def __init__(self, max_workers=4, status_file=None, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='etl-job')
+        self.status_file = Path(status_file) if status_file else None
+        self.jobs = {}
+        self._condition = threading.Condition()
+        self._stopped = False
+
+    def add_job(self, name, schedule, func):
+        """Programa 'func' según una expresión cron o una hora 'HH:MM'"""
+        job = ScheduledJob(name, CronExpression(schedule), func)
+        with self._condition:
+            self.jobs[name] = job
+            self._condition.notify()
+        self.logger.info(f"Trabajo '{name}' programado ({schedule}). Próxima ejecución: {job.next_run}")
+        return job
+
+    def run_now(self, name):
+        """Lanza un trabajo inmediatamente sin alterar su programación"""
+        with self._condition:
+            self._dispatch(self.jobs[name])
+
+    def status(self):
+        """Estado de los trabajos: próxima ejecución, última duración y resultado"""
+        with self._condition:
+            return [job.to_dict() for job in self.jobs.values()]
+
+    def stop(self, wait=True):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self.executor.shutdown(wait=wait)
+
+    def run_forever(self):
+        """Bucle principal: duerme hasta el próximo trabajo pendiente"""
+        with self._condition:
+            while not self._stopped:
+                now = datetime.now()
+                for job in self.jobs.values():
+                    if job.next_run <= now:
+                        self._dispatch(job)
+                        job.next_run = job.cron.next_after(now)
+
+                timeout = self._seconds_until_next()
+                self._condition.wait(timeout)
+
+    def _seconds_until_next(self):
+        if not self.jobs:
+            return None
+        next_run = min(job.next_run for job in self.jobs.values())
+        remaining = (next_run - datetime.now()).total_seconds()
+        return min(max(0.0, remaining), self.MAX_SLEEP)
+
+    def _dispatch(self, job):
+        if job.running:
+            self.logger.warning(f"Trabajo '{job.name}' todavía en ejecución. Se omite este turno.")
+            return
+        job.running = True
+        job.last_run = datetime.now()
+        self.executor.submit(self._run_job, job)
+
+    def _run_job(self, job):
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            self.logger.info(f"Ejecutando trabajo '{job.name}'")
+            result = job.func()
+            status = 'success' if result is not False else 'failed'
+        except Exception as e:
+            self.logger.error(f"Error en el trabajo '{job.name}': {str(e)}")
+        finally:
+            with self._condition:
+                job.running = False
+                job.last_duration = round(time.perf_counter() - started, 2)
+                job.last_status = status
+                self._write_status()
+            self.logger.info(f"Trabajo '{job.name}' finalizado ({status}) en {job.last_duration} s. "
+                             f"Próxima ejecución: {job.next_run}")
+
+    def _write_status(self):
+        if not self.status_file:
+            return
+        try:
+            self.status_file.write_text(json.dumps([job.to_dict() for job in self.jobs.values()], indent=2))
+        except OSError as e:
+            self.logger.warning(f"No se pudo escribir el estado del planificador: {str(e)}")
@@ -6,8 +6,8 @@ Modificado para solucionar problema con creación de tablas
 import pandas as pd
 import numpy as np
 from datetime import datetime
-import logging
 import traceback
+import hashlib
 from pathlib import Path
 import sys
 import os
@@ -18,33 +18,92 @@ import argparse
 try:
     import psycopg2
     from sqlalchemy import create_engine
-    from psycopg2.extras import execute_values
     DATABASE_AVAILABLE = True
 except ImportError:
     DATABASE_AVAILABLE = False
     print("Aviso: psycopg2 o sqlalchemy no están instalados. La carga en PostgreSQL no estará disponible.")
 
+from table_loader import ParallelTableLoader, TableLoad
+from local_sink import SQLiteSink, DEFAULT_SQLITE_PATH
+from run_coordinator import RunCoordinator, PIPELINE_LOCK
+from run_cache import RunCache
+from progress import emit_progress
+from logging_setup import setup_logging
+from staging_catalog import StagingCatalog
+from fs_utils import link_or_copy
+from compressed_io import Compression, find_csv, is_csv, read_csv, write_csv
+from partitioned_dataset import PartitionedDataset, PARQUET_AVAILABLE
+from bitmap_index import BitmapIndex
+from matchup import add_matchup_columns
+
 class NBAPlayoffsAdvancedTransformer:
     """Transformador simplificado para datos de playoffs NBA con soporte PostgreSQL"""
-    
-    def __init__(self, input_file=None, output_dir='processed_data', db_config=None):
-        # Configurar logging primero
-        log_dir = Path('logs')
-        log_dir.mkdir(exist_ok=True)
-        
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(f'logs/advanced_transform_{datetime.now().strftime("%Y%m%d")}.log'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
+
+    # Definición de tablas; {table} permite crear la tabla sombra de cada carga
+    TABLE_DDL = {
+        'nba_playoffs_advanced': """
+            CREATE TABLE {table} (
+                id SERIAL PRIMARY KEY,
+                season_year VARCHAR(10),
+                team_id INTEGER,
+                team_name VARCHAR(100),
+                game_date DATE,
+                matchup VARCHAR(50),
+                matchup_team_id INTEGER,
+                opponent_team_id INTEGER,
+                is_home SMALLINT,
+                wl CHAR(1),
+                pts INTEGER,
+                ast INTEGER,
+                fg3m INTEGER,
+                offensive_efficiency FLOAT,
+                defensive_rating FLOAT,
+                ast_to_ratio FLOAT,
+                playoff_efficiency FLOAT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """,
+        'nba_playoffs_team_summary': """
+            CREATE TABLE {table} (
+                team_name VARCHAR(100) PRIMARY KEY,
+                pts FLOAT,
+                win_rate FLOAT,
+                ast FLOAT,
+                offensive_efficiency FLOAT,
+                defensive_rating FLOAT,
+                playoff_efficiency FLOAT, 
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """,
+        'nba_playoffs_season_summary': """
+            CREATE TABLE {table} (
+                season_year VARCHAR(10) PRIMARY KEY,
+                avg_pts FLOAT,
+                avg_fg3m FLOAT,
+                avg_ast FLOAT,
+                avg_off_efficiency FLOAT,
+                avg_def_rating FLOAT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """
+    }
+
+    # Índices secundarios de la tabla avanzada
+    ADVANCED_INDEXES = [('season_year',), ('team_name', 'game_date')]
+
+    # Nombre de la etapa en la caché de sesión (run_cache)
+    CACHE_STAGE = 'advanced'
+
+    def __init__(self, input_file=None, output_dir='processed_data', db_config=None,
+                 target='auto', sqlite_path=DEFAULT_SQLITE_PATH, compression=None, compression_level=None):
+        # Configurar logging primero (cola asíncrona, logs/advanced_transform_<fecha>.log)
+        self.logger = setup_logging('advanced', 'advanced_transform')
         
         # Configuración básica
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True, parents=True)
+        # Formato de los CSV generados (NBA_ETL_COMPRESSION si no se indica)
+        self.compression = Compression(compression, compression_level)
         
         # Configuración de base de datos
         self.db_config = db_config or {
@@ -55,12 +114,20 @@ class NBAPlayoffsAdvancedTransformer:
             'password': '123'
         }
         
+        # Destino de carga: 'postgresql', 'sqlite' o 'auto' (SQLite si no hay conexión)
+        self.target = target
+        self.sqlite_path = sqlite_path
+        self.use_database = db_config is not None
+        self.coordinator = RunCoordinator(self.db_config, use_database=self.use_database and target != 'sqlite',
+                                          logger=self.logger)
+
         # Inicializar conexiones a None
         self.engine = None
         self.conn = None
+        self.output_files = []
         
         # Crear conexión a la base de datos si está disponible
-        if DATABASE_AVAILABLE and db_config is not None:
+        if DATABASE_AVAILABLE and db_config is not None and target != 'sqlite':
             self._create_db_connection()
         
         # Cargar datos
@@ -69,7 +136,8 @@ class NBAPlayoffsAdvancedTransformer:
                 input_file = self._find_input_file()
             
             self.logger.info(f"Cargando datos desde {input_file}")
-            self.data = pd.read_csv(input_file)
+            self.input_file = input_file
+            self.data = read_csv(input_file)
             self.logger.info(f"Datos cargados: {len(self.data)} registros, {len(self.data.columns)} columnas")
         except Exception as e:
             self.logger.error(f"Error al cargar datos: {str(e)}")
@@ -135,51 +203,8 @@ class NBAPlayoffsAdvancedTransformer:
                     print(f"Creando tablas faltantes: {missing_tables}")
 
                     # Crear tablas faltantes
-                    if 'nba_playoffs_advanced' in missing_tables:
-                        cur.execute("""
-                        CREATE TABLE nba_playoffs_advanced (
-                            id SERIAL PRIMARY KEY,
-                            season_year VARCHAR(10),
-                            team_id INTEGER,
-                            team_name VARCHAR(100),
-                            game_date DATE,
-                            matchup VARCHAR(50),
-                            wl CHAR(1),
-                            pts INTEGER,
-                            ast INTEGER,
-                            fg3m INTEGER,
-                            offensive_efficiency FLOAT,
-                            defensive_rating FLOAT,
-                            ast_to_ratio FLOAT,
-                            playoff_efficiency FLOAT,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                        );
-                        """)
-                    if 'nba_playoffs_team_summary' in missing_tables:
-                        cur.execute("""
-                        CREATE TABLE nba_playoffs_team_summary (
-                            team_name VARCHAR(100) PRIMARY KEY,
-                            pts FLOAT,
-                            win_rate FLOAT,
-                            ast FLOAT,
-                            offensive_efficiency FLOAT,
-                            defensive_rating FLOAT,
-                            playoff_efficiency FLOAT, 
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                        );
-                        """)
-                    if 'nba_playoffs_season_summary' in missing_tables:
-                        cur.execute("""
-                        CREATE TABLE nba_playoffs_season_summary (
-                            season_year VARCHAR(10) PRIMARY KEY,
-                            avg_pts FLOAT,
-                            avg_fg3m FLOAT,
-                            avg_ast FLOAT,
-                            avg_off_efficiency FLOAT,
-                            avg_def_rating FLOAT,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                        );
-                        """)
+                    for table in missing_tables:
+                        cur.execute(self.TABLE_DDL[table].format(table=table))
                     self.conn.commit()
                     self.logger.info("Tablas faltantes creadas correctamente")
                 
@@ -213,57 +238,10 @@ class NBAPlayoffsAdvancedTransformer:
                     return True
                 
             # Las tablas no existen, proceder a crearlas
-            tables = [
-            """
-            DROP TABLE IF EXISTS nba_playoffs_advanced;
-            CREATE TABLE nba_playoffs_advanced (
-                id SERIAL PRIMARY KEY,
-                season_year VARCHAR(10),
-                team_id INTEGER,
-                team_name VARCHAR(100),
-                game_date DATE,
-                matchup VARCHAR(50),
-                wl CHAR(1),
-                pts INTEGER,
-                ast INTEGER,
-                fg3m INTEGER,
-                offensive_efficiency FLOAT,
-                defensive_rating FLOAT,
-                ast_to_ratio FLOAT,
-                playoff_efficiency FLOAT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            """,
-            """
-            DROP TABLE IF EXISTS nba_playoffs_team_summary;
-            CREATE TABLE nba_playoffs_team_summary (
-                team_name VARCHAR(100) PRIMARY KEY,
-                pts FLOAT,
-                win_rate FLOAT,
-                ast FLOAT,
-                offensive_efficiency FLOAT,
-                defensive_rating FLOAT,
-                playoff_efficiency FLOAT, 
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            """,
-            """
-            DROP TABLE IF EXISTS nba_playoffs_season_summary;
-            CREATE TABLE nba_playoffs_season_summary (
-                season_year VARCHAR(10) PRIMARY KEY,
-                avg_pts FLOAT,
-                avg_fg3m FLOAT,
-                avg_ast FLOAT,
-                avg_off_efficiency FLOAT,
-                avg_def_rating FLOAT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            """
-            ]
-
             with self.conn.cursor() as cur:
-                for table_sql in tables:
-                    cur.execute(table_sql)
+                for table, ddl in self.TABLE_DDL.items():
+                    cur.execute(f"DROP TABLE IF EXISTS {table};")
+                    cur.execute(ddl.format(table=table))
                 self.conn.commit()
 
             self.logger.info("Tablas creadas correctamente")
@@ -285,20 +263,23 @@ class NBAPlayoffsAdvancedTransformer:
             Path('processed_data') / 'playoffs_detailed.csv'
         ]
 
-    # Buscar en el directorio de staging también
-        staging_dir = Path('staging')
-        if staging_dir.exists():
+        # Buscar en el directorio de staging también (extracción actual del catálogo)
+        staging_dir = Path('data/staging')
+        latest_file = StagingCatalog(staging_dir).latest_file('play_off')
+        if latest_file:
+            possible_files.append(latest_file)
+        elif staging_dir.exists():
             extract_dirs = [d for d in staging_dir.glob('extract_*') if d.is_dir()]
             if extract_dirs:
                 latest_dir = max(extract_dirs, key=lambda d: d.name)
-                for file in latest_dir.glob('*.csv'):
-                    if 'play_off' in file.name.lower():
+                for file in latest_dir.iterdir():
+                    if is_csv(file) and 'play_off' in file.name.lower():
                         possible_files.append(file)
 
-        # Verificar cada archivo posible
+        # Verificar cada archivo posible (también su versión comprimida)
         for file_path in possible_files:
-            path = Path(file_path)
-            if path.exists():
+            path = find_csv(file_path)
+            if path:
                 self.logger.info(f"Archivo encontrado: {path}")
                 return str(path)
             
@@ -307,7 +288,7 @@ class NBAPlayoffsAdvancedTransformer:
         self.logger.warning("No se encontraron archivos en las ubicaciones estándar. Buscando en todo el directorio...")
         
         # Buscar recursivamente en todos los directorios
-        csv_files = list(Path('.').glob('**/*.csv'))
+        csv_files = [f for f in Path('.').glob('**/*.csv*') if is_csv(f)]
         if csv_files:
             for file in csv_files:
                 if 'play_off' in file.name.lower():
@@ -332,6 +313,12 @@ class NBAPlayoffsAdvancedTransformer:
         except Exception as e:
             self.logger.warning(f"Error al convertir fechas: {str(e)}")
         
+        # Equipo, rival y local/visitante codificados desde MATCHUP (un análisis por valor distinto)
+        try:
+            df = add_matchup_columns(df, self.logger)
+        except Exception as e:
+            self.logger.warning(f"Error al analizar MATCHUP: {str(e)}")
+        
         # Manejar valores nulos
         numeric_columns = df.select_dtypes(include=[np.number]).columns
         for col in numeric_columns:
@@ -377,6 +364,13 @@ class NBAPlayoffsAdvancedTransformer:
             self.logger.error(f"Error al calcular métricas avanzadas: {str(e)}")
             self.logger.error(traceback.format_exc())
         
+        # Mapas de bits de WL, temporada, equipo y local/visitante (mismo orden de filas que la salida)
+        try:
+            self.bitmap_index = BitmapIndex.build(df)
+        except Exception as e:
+            self.bitmap_index = None
+            self.logger.warning(f"No se pudieron construir los índices de mapa de bits: {str(e)}")
+        
         self.advanced_metrics = df
         return df
 
@@ -444,26 +438,36 @@ class NBAPlayoffsAdvancedTransformer:
         self.logger.info("Guardando resultados en archivos CSV")
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.output_files = []
         
         try:
             # Guardar datos con métricas avanzadas
             if hasattr(self, 'advanced_metrics'):
-                advanced_file = self.output_dir / f'playoffs_advanced_{timestamp}.csv'
-                self.advanced_metrics.to_csv(advanced_file, index=False)
-                self.logger.info(f"Guardado: {advanced_file}")
+                advanced_file = write_csv(self.advanced_metrics, self.output_dir / f'playoffs_advanced_{timestamp}.csv',
+                                          self.compression, index=False)
+                self.logger.info(f"Guardado: {advanced_file} ({self.compression})")
+                
+                # Alias con nombre estándar (enlace, sin volver a serializar)
+                advanced_alias = self.compression.path(self.output_dir / 'playoffs_advanced.csv')
+                link_or_copy(advanced_file, advanced_alias)
+                self.output_files += [advanced_file, advanced_alias]
+                self._save_partitioned()
                 
-                # Copia con nombre estándar
-                self.advanced_metrics.to_csv(self.output_dir / 'playoffs_advanced.csv', index=False)
+                # Índices de mapa de bits alineados con playoffs_advanced.csv
+                if getattr(self, 'bitmap_index', None) is not None:
+                    bitmap_file = self.bitmap_index.save(self.output_dir / 'playoffs_advanced_bitmaps.npz')
+                    self.output_files.append(bitmap_file)
+                    self.logger.info(f"Guardado: {bitmap_file}")
             
             # Guardar resúmenes
             if hasattr(self, 'team_summary'):
-                team_file = self.output_dir / 'team_summary.csv'
-                self.team_summary.to_csv(team_file)
+                team_file = write_csv(self.team_summary, self.output_dir / 'team_summary.csv', self.compression)
+                self.output_files.append(team_file)
                 self.logger.info(f"Guardado: {team_file}")
             
             if hasattr(self, 'season_summary'):
-                season_file = self.output_dir / 'season_summary.csv'
-                self.season_summary.to_csv(season_file)
+                season_file = write_csv(self.season_summary, self.output_dir / 'season_summary.csv', self.compression)
+                self.output_files.append(season_file)
                 self.logger.info(f"Guardado: {season_file}")
 
             # Crear archivo de control
@@ -481,6 +485,114 @@ class NBAPlayoffsAdvancedTransformer:
             self.logger.error(traceback.format_exc())
             return False
         
+    def _save_partitioned(self):
+        """Conjunto Parquet por temporada: solo se reescriben las temporadas que cambiaron"""
+        if not PARQUET_AVAILABLE:
+            self.logger.warning("pyarrow no está instalado: se omite el conjunto particionado por temporada")
+            return
+        try:
+            dataset = PartitionedDataset(self.output_dir / 'playoffs_advanced_dataset', logger=self.logger)
+            dataset.write(self.advanced_metrics)
+            self.output_files.append(dataset.manifest_path)
+        except Exception as e:
+            self.logger.warning(f"No se pudo escribir el conjunto particionado: {str(e)}")
+
+    # Mapeo de nombres de columnas de los resúmenes a la BD
+    TEAM_SUMMARY_MAPPING = {
+        'TEAM_NAME': 'team_name',
+        'AVG_PTS': 'avg_pts',
+        'WIN_RATE': 'win_rate',
+        'OFFENSIVE_EFFICIENCY': 'avg_off_efficiency',
+        'DEFENSIVE_RATING': 'avg_def_rating'
+    }
+    SEASON_SUMMARY_MAPPING = {
+        'SEASON_YEAR': 'season_year',
+        'PTS': 'avg_pts',
+        'FG3M': 'avg_fg3m',
+        'AST': 'avg_ast',
+        'OFFENSIVE_EFFICIENCY': 'avg_off_efficiency',
+        'DEFENSIVE_RATING': 'avg_def_rating'
+    }
+
+    def _advanced_table_load(self):
+        """Prepara la carga de la tabla de métricas avanzadas"""
+        # Columnas a guardar del DataFrame de métricas avanzadas
+        advanced_columns = ['SEASON_YEAR', 'TEAM_ID', 'TEAM_NAME', 'GAME_DATE', 'MATCHUP',
+                'MATCHUP_TEAM_ID', 'OPPONENT_TEAM_ID', 'IS_HOME', 'WL', 
+                'PTS', 'AST', 'FG3M', 'OFFENSIVE_EFFICIENCY', 'DEFENSIVE_RATING', 
+                'AST_TO_RATIO', 'PLAYOFF_EFFICIENCY']
+        
+        # Verificar qué columnas existen realmente en el DataFrame
+        available_advanced_columns = [col for col in advanced_columns if col in self.advanced_metrics.columns]
+
+        #Seleccionar las columnas disponibles
+        df_to_save = self.advanced_metrics[available_advanced_columns].copy()
+    
+        # Convertir fecha a formato adecuado para PostgreSQL
+        if 'GAME_DATE' in df_to_save.columns and hasattr(df_to_save['GAME_DATE'], 'dt'):
+            df_to_save['GAME_DATE'] = df_to_save['GAME_DATE'].dt.strftime('%Y-%m-%d')
+
+        return TableLoad(
+            'nba_playoffs_advanced',
+            self.TABLE_DDL['nba_playoffs_advanced'],
+            [col.lower() for col in available_advanced_columns],
+            [tuple(x) for x in df_to_save.values],
+            indexes=self.ADVANCED_INDEXES
+        )
+
+    def _summary_table_loads(self, table_columns, table_ddl):
+        """Prepara las cargas de los resúmenes según las columnas reales de cada tabla"""
+        summaries = []
+        if hasattr(self, 'team_summary'):
+            team_summary = self.team_summary
+            if 'PTS' in team_summary.columns:
+                team_summary = team_summary.rename(columns={'PTS': 'AVG_PTS'})
+            summaries.append(('nba_playoffs_team_summary', team_summary, self.TEAM_SUMMARY_MAPPING))
+
+        # Resumen por temporada - Aplicamos el mismo enfoque adaptativo
+        if hasattr(self, 'season_summary'):
+            summaries.append(('nba_playoffs_season_summary', self.season_summary, self.SEASON_SUMMARY_MAPPING))
+
+        table_loads = []
+        for table, summary, column_mapping in summaries:
+            data = summary.reset_index().copy()
+            columns = table_columns(table)
+            self.logger.debug(f"Columnas en la tabla {table}: {columns}")
+
+            # Seleccionar solo las columnas que existen en el DataFrame y pueden mapearse a la tabla
+            valid_df_columns = []
+            valid_db_columns = []
+            for df_col, db_col in column_mapping.items():
+                if df_col in data.columns and db_col in columns:
+                    valid_df_columns.append(df_col)
+                    valid_db_columns.append(db_col)
+
+            if not valid_df_columns:
+                self.logger.warning(f"No se encontraron columnas válidas para insertar en {table}")
+                continue
+
+            records = [tuple(x) for x in data[valid_df_columns].values]
+            # La tabla nueva replica la estructura actual de la tabla publicada
+            table_loads.append(TableLoad(table, table_ddl(table), valid_db_columns, records))
+
+        return table_loads
+
+    def _table_columns(self, table):
+        """Devuelve las columnas existentes de una tabla en PostgreSQL"""
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                SELECT column_name 
+                FROM information_schema.columns 
+                WHERE table_name = %s
+            """, (table,))
+            return [row[0] for row in cur.fetchall()]
+
+    def _load_run_id(self):
+        """Identificador estable de la carga a partir de los datos y del código"""
+        digest = hashlib.sha256(pd.util.hash_pandas_object(self.data, index=False).values.tobytes())
+        digest.update(Path(__file__).read_bytes())
+        return digest.hexdigest()[:32]
+
     def save_to_postgresql(self):
         """Guarda los resultados en PostgreSQL"""
         if not DATABASE_AVAILABLE or not self.conn:
@@ -496,180 +608,23 @@ class NBAPlayoffsAdvancedTransformer:
         self.logger.info("Guardando resultados en PostgreSQL")
 
         try:
-            # Limpiar tablas antes de insertar nuevos datos
-            with self.conn.cursor() as cur:
-                cur.execute("TRUNCATE TABLE nba_playoffs_advanced RESTART IDENTITY CASCADE;")
-                cur.execute("TRUNCATE TABLE nba_playoffs_team_summary RESTART IDENTITY CASCADE;")
-                cur.execute("TRUNCATE TABLE nba_playoffs_season_summary RESTART IDENTITY CASCADE;")
-                self.conn.commit()
-
-            # Insertar datos avanzados
+            table_loads = []
             if hasattr(self, 'advanced_metrics'):
-                # Columnas a guardar del DataFrame de métricas avanzadas
-                advanced_columns = ['SEASON_YEAR', 'TEAM_ID', 'TEAM_NAME', 'GAME_DATE', 'MATCHUP', 'WL', 
-                        'PTS', 'AST', 'FG3M', 'OFFENSIVE_EFFICIENCY', 'DEFENSIVE_RATING', 
-                        'AST_TO_RATIO', 'PLAYOFF_EFFICIENCY']
-                
-                # Verificar qué columnas existen realmente en el DataFrame
-                available_advanced_columns = [col for col in advanced_columns if col in self.advanced_metrics.columns]
-
-                #Seleccionar las columnas disponibles
-                df_to_save = self.advanced_metrics[available_advanced_columns].copy()
-            
-                # Convertir fecha a formato adecuado para PostgreSQL
-                if 'GAME_DATE' in df_to_save.columns and hasattr(df_to_save['GAME_DATE'], 'dt'):
-                    df_to_save['GAME_DATE'] = df_to_save['GAME_DATE'].dt.strftime('%Y-%m-%d')
+                table_loads.append(self._advanced_table_load())
+            table_loads.extend(self._summary_table_loads(
+                self._table_columns,
+                lambda table: f"CREATE TABLE {{table}} (LIKE {table} INCLUDING ALL);"
+            ))
 
-                # Convertir a lista de tuplas
-                advanced_records = [tuple(x) for x in df_to_save.values]
-                
-                # Insertar datos avanzados
-                with self.conn.cursor() as cur:
-                    # Preparar formato SQL según columnas disponibles 
-                    advanced_columns_sql = ', '.join([col.lower() for col in available_advanced_columns])
-                    
-                    execute_values(
-                        cur,
-                        f"""
-                        INSERT INTO nba_playoffs_advanced 
-                        ({advanced_columns_sql})
-                        VALUES %s
-                        """,
-                        advanced_records,
-                        page_size=100
-                    )
-                
-                    self.logger.info(f"Insertados {len(advanced_records)} registros en nba_playoffs_advanced")
-
-            # Guardar resumen por equipo
-            if hasattr(self, 'team_summary'):
-                # Preparar datos
-                team_data = self.team_summary.reset_index().copy()
-                
-                # MODIFICADO: Renombrar columnas para coincidir con la estructura de la tabla
-                if 'PTS' in team_data.columns:
-                    team_data.rename(columns={'PTS': 'AVG_PTS'}, inplace=True)
-            
-                # Verificamos las columnas que realmente existen en la tabla
-                with self.conn.cursor() as cur:
-                    cur.execute("""
-                        SELECT column_name 
-                        FROM information_schema.columns 
-                        WHERE table_name = 'nba_playoffs_team_summary'
-                    """)
-                    table_columns = [row[0] for row in cur.fetchall()]
-                
-                self.logger.info(f"Columnas en la tabla nba_playoffs_team_summary: {table_columns}")
-            
-                # Mapeo de nombres de columnas de DataFrame a BD
-                team_column_mapping = {
-                    'TEAM_NAME': 'team_name',
-                    'AVG_PTS': 'avg_pts',
-                    'WIN_RATE': 'win_rate',
-                    'OFFENSIVE_EFFICIENCY': 'avg_off_efficiency',
-                    'DEFENSIVE_RATING': 'avg_def_rating'
-                }
-            
-                # Seleccionar solo las columnas que existen en el DataFrame y pueden mapearse a la tabla
-                valid_df_columns = []
-                valid_db_columns = []
-            
-                for df_col, db_col in team_column_mapping.items():
-                    if df_col in team_data.columns and db_col in table_columns:
-                        valid_df_columns.append(df_col)
-                        valid_db_columns.append(db_col)
-            
-                # Seleccionar solo las columnas válidas
-                if valid_df_columns:
-                    team_data_filtered = team_data[valid_df_columns].copy()
-                    
-                    # Convertir a lista de tuplas
-                    team_records = [tuple(x) for x in team_data_filtered.values]
-                    
-                    # Columnas para SQL
-                    team_columns_sql = ', '.join(valid_db_columns)
-                    
-                    # Insertar datos
-                    with self.conn.cursor() as cur:
-                        execute_values(
-                            cur,
-                            f"""
-                            INSERT INTO nba_playoffs_team_summary 
-                            ({team_columns_sql})
-                            VALUES %s
-                            """,
-                            team_records,
-                            page_size=100
-                        )
-                        
-                        self.logger.info(f"Insertados {len(team_records)} registros en nba_playoffs_team_summary")
-                else:
-                    self.logger.warning("No se encontraron columnas válidas para insertar en nba_playoffs_team_summary")
+            # Cerrar la transacción de lectura antes de que el cargador reemplace las tablas
+            self.conn.commit()
 
-            # Guardar resumen por temporada - Aplicamos el mismo enfoque adaptativo
-            if hasattr(self, 'season_summary'):
-                # Preparar datos
-                season_data = self.season_summary.reset_index().copy()
-                
-                # Verificamos las columnas que realmente existen en la tabla
-                with self.conn.cursor() as cur:
-                    cur.execute("""
-                        SELECT column_name 
-                        FROM information_schema.columns 
-                        WHERE table_name = 'nba_playoffs_season_summary'
-                    """)
-                    table_columns = [row[0] for row in cur.fetchall()]
-                
-                self.logger.info(f"Columnas en la tabla nba_playoffs_season_summary: {table_columns}")
-            
-            # Mapeo de nombres de columnas de DataFrame a BD
-            season_column_mapping = {
-                'SEASON_YEAR': 'season_year',
-                'PTS': 'avg_pts',
-                'FG3M': 'avg_fg3m',
-                'AST': 'avg_ast',
-                'OFFENSIVE_EFFICIENCY': 'avg_off_efficiency',
-                'DEFENSIVE_RATING': 'avg_def_rating'
-            }
-            
-            # Seleccionar solo las columnas que existen en el DataFrame y pueden mapearse a la tabla
-            valid_df_columns = []
-            valid_db_columns = []
-            
-            for df_col, db_col in season_column_mapping.items():
-                if df_col in season_data.columns and db_col in table_columns:
-                    valid_df_columns.append(df_col)
-                    valid_db_columns.append(db_col)
-            
-            # Seleccionar solo las columnas válidas
-            if valid_df_columns:
-                season_data_filtered = season_data[valid_df_columns].copy()
-                
-                # Convertir a lista de tuplas
-                season_records = [tuple(x) for x in season_data_filtered.values]
-                
-                # Columnas para SQL
-                season_columns_sql = ', '.join(valid_db_columns)
-                
-                # Insertar datos
-                with self.conn.cursor() as cur:
-                    execute_values(
-                        cur,
-                        f"""
-                        INSERT INTO nba_playoffs_season_summary 
-                        ({season_columns_sql})
-                        VALUES %s
-                        """,
-                        season_records,
-                        page_size=100
-                    )
-                    
-                    self.logger.info(f"Insertados {len(season_records)} registros en nba_playoffs_season_summary")
-            else:
-                    self.logger.warning("No se encontraron columnas válidas para insertar en nba_playoffs_season_summary")
+            # Carga concurrente en tablas sombra y publicación atómica, reanudable por lotes
+            loader = ParallelTableLoader(self.db_config, logger=self.logger)
+            loader.load(table_loads, run_id=self._load_run_id())
 
-            # Commit de todas las transacciones
-            self.conn.commit()
+            for table_load in table_loads:
+                self.logger.info(f"Insertados {len(table_load.records)} registros en {table_load.name}")
             self.logger.info("Datos guardados correctamente en PostgreSQL")
 
             return True
@@ -683,24 +638,71 @@ class NBAPlayoffsAdvancedTransformer:
                 except:
                     pass
             return False
+
+    def save_to_sqlite(self):
+        """Guarda los resultados en el destino embebido SQLite"""
+        self.logger.info(f"Guardando resultados en SQLite ({self.sqlite_path})")
+
+        sink = None
+        try:
+            sink = SQLiteSink(self.sqlite_path, logger=self.logger)
+            sink.ensure_tables(self.TABLE_DDL)
+
+            table_loads = []
+            if hasattr(self, 'advanced_metrics'):
+                table_loads.append(self._advanced_table_load())
+            table_loads.extend(self._summary_table_loads(sink.table_columns, sink.table_ddl))
+
+            sink.load(table_loads)
+            self.logger.info("Datos guardados correctamente en SQLite")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Error al guardar en SQLite: {str(e)}")
+            self.logger.error(traceback.format_exc())
+            return False
+        finally:
+            if sink:
+                sink.close()
         
     def run_pipeline(self):
         """Ejecuta el pipeline completo de transformación"""
+        # Una sola ejecución a la vez; las peticiones idénticas esperan el resultado en curso
+        work_id = f"advanced:{self.target}:{self.output_dir.resolve()}:{self._load_run_id()}"
+        return self.coordinator.run(PIPELINE_LOCK, self._run_pipeline, work_id=work_id)
+
+    def _run_pipeline(self):
         self.logger.info("Iniciando pipeline de transformación")
+
+        # Misma fuente y mismo código ya procesados en esta sesión: reutilizar el resultado
+        cache = RunCache(logger=self.logger)
+        fingerprint = None
+        if cache.enabled:
+            fingerprint = cache.fingerprint(self.input_file, extra=f"{self.CACHE_STAGE}:{self.target}:"
+                                            f"{self.use_database}:{self.output_dir.resolve()}")
+            if cache.lookup(self.CACHE_STAGE, fingerprint):
+                cache.announce_hit(self.CACHE_STAGE)
+                print("\nTransformación omitida: resultado en caché\n")
+                return True
         
         try:
 
             # Ejecutar todas las etapas
+            emit_progress('advanced', 0, 5, 'Preprocesando datos')
             self.preprocess_data()
+            emit_progress('advanced', 1, 5, 'Calculando métricas avanzadas')
             self.calculate_advanced_metrics()
+            emit_progress('advanced', 2, 5, 'Creando resúmenes')
             self.create_summaries()
                 
             # Guardar en archivos
+            emit_progress('advanced', 3, 5, 'Guardando archivos')
             file_success = self.save_to_files()
+            emit_progress('advanced', 4, 5, 'Guardando en base de datos')
             
             # Guardar en PostgreSQL si es posible
             db_success = False
-            if DATABASE_AVAILABLE and self.db_config is not None:
+            if DATABASE_AVAILABLE and self.use_database and self.target != 'sqlite':
                 # Recrear la conexión si fue cerrada
                 if not self.conn or (hasattr(self.conn, 'closed') and self.conn.closed):
                     self._create_db_connection()
@@ -716,8 +718,21 @@ class NBAPlayoffsAdvancedTransformer:
                     print("Datos guardados exitosamente en PostgreSQL")
                 else:
                     print("Advertencia: No se pudieron guardar los datos en PostgreSQL")
+
+            # Destino local: seleccionado explícitamente o como respaldo sin conexión
+            if self.target == 'sqlite' or (self.target == 'auto' and self.use_database and not self.conn):
+                db_success = self.save_to_sqlite()
+                if db_success:
+                    print(f"Datos guardados en el destino local SQLite: {self.sqlite_path}")
             
+            emit_progress('advanced', 5, 5, 'Transformación finalizada')
             if file_success:
+                # Si se esperaba una carga en base de datos, solo se reutiliza si se completó
+                expects_db = self.use_database or self.target == 'sqlite'
+                if fingerprint and (db_success or not expects_db):
+                    cache.record(self.CACHE_STAGE, fingerprint, outputs=self.output_files,
+                                 input_file=str(self.input_file))
+
                 self.logger.info("Pipeline completado exitosamente")
                 print("\nTransformación completada exitosamente\n")
                 return True
@@ -744,6 +759,12 @@ def main():
     parser.add_argument('--user', type=str, default='postgres', help='Usuario de PostgreSQL')
     parser.add_argument('--password', type=str, default='123', help='Contraseña de PostgreSQL')
     parser.add_argument('--no-db', action='store_true', help='No guardar en base de datos')
+    parser.add_argument('--target', type=str, default='auto', choices=['auto', 'postgresql', 'sqlite'],
+                        help='Destino de carga (auto: SQLite si PostgreSQL no está disponible)')
+    parser.add_argument('--sqlite-path', type=str, default=DEFAULT_SQLITE_PATH, help='Archivo SQLite local')
+    parser.add_argument('--compression', type=str, choices=['none', 'gzip', 'zstd'],
+                        help='Compresión de los CSV generados (predeterminado: NBA_ETL_COMPRESSION o none)')
+    parser.add_argument('--compression-level', type=int, help='Nivel de compresión')
     
     args = parser.parse_args()
     
@@ -773,7 +794,11 @@ def main():
         transformer = NBAPlayoffsAdvancedTransformer(
             input_file=args.input,
             output_dir=args.output,
-            db_config=db_config
+            db_config=db_config,
+            target=args.target,
+            sqlite_path=args.sqlite_path,
+            compression=args.compression,
+            compression_level=args.compression_level
         )
         
         print("Ejecutando pipeline de transformación...")
@@ -785,7 +810,7 @@ def main():
             print(f"Archivos generados en {output_dir}:")
             
             # Mostrar los archivos generados
-            files = list(output_dir.glob('*.csv'))
+            files = [f for f in output_dir.iterdir() if is_csv(f)]
             for file in files:
                 file_size = file.stat().st_size // 1024  # Tamaño en KB
                 print(f"  - {file.name} ({file_size} KB)")
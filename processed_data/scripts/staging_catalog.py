@@ -0,0 +1,164 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Catálogo de extracciones del staging con publicación atómica y puntero LATEST
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from run_coordinator import FileLock
+from fs_utils import write_text_atomic
+
+
+CATALOG_FILE = '_catalog.json'
+LATEST_FILE = 'LATEST'
+LOCK_FILE = '_catalog.lock'
+
+
+class StagingCatalog:
+    """Registro de las extracciones publicadas en data/staging.
+
+    Una extracción se prepara en un directorio oculto (.extract_<fecha>.tmp),
+    se renombra a extract_<fecha> cuando está completa, se registra en
+    _catalog.json (archivos, hashes, filas y estado) y por último se apunta
+    LATEST a ella. Quien lee LATEST nunca ve una extracción a medio escribir.
+    """
+
+    def __init__(self, staging_dir='data/staging'):
+        self.staging_dir = Path(staging_dir)
+        self.catalog_path = self.staging_dir / CATALOG_FILE
+        self.latest_path = self.staging_dir / LATEST_FILE
+        self.lock = FileLock(self.staging_dir / LOCK_FILE)
+
+    # Lectura
+
+    def load(self):
+        try:
+            with open(self.catalog_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {'extracts': {}}
+
+    def latest_id(self):
+        try:
+            return self.latest_path.read_text(encoding='utf-8').strip() or None
+        except FileNotFoundError:
+            return None
+
+    def latest(self):
+        """Entrada del catálogo de la extracción actual (None si no hay ninguna publicada)"""
+        extract_id = self.latest_id()
+        if not extract_id:
+            return None
+        entry = self.load()['extracts'].get(extract_id)
+        if not entry or not (self.staging_dir / extract_id).is_dir():
+            return None
+        return entry
+
+    def latest_file(self, keyword='play_off', suffix=('.csv', '.csv.gz', '.csv.zst')):
+        """Ruta del archivo de la extracción actual cuyo nombre contiene keyword (CSV plano o comprimido)"""
+        entry = self.latest()
+        if not entry:
+            return None
+        names = [item['name'] for item in entry['files'] if item['name'].lower().endswith(suffix)]
+        preferred = [name for name in names if keyword in name.lower()] or names
+        return self.staging_dir / entry['id'] / preferred[0] if preferred else None
+
+    def profile_for(self, path):
+        """Perfil guardado de un archivo de la extracción actual (o de un enlace a él)"""
+        entry = self.latest()
+        if not entry:
+            return None
+        for item in entry['files']:
+            staged = self.staging_dir / entry['id'] / item['name']
+            try:
+                if item.get('profile') and os.path.samefile(staged, path):
+                    return item['profile']
+            except OSError:
+                continue
+        return None
+
+    # Publicación
+
+    def temp_dir(self, extract_id):
+        """Directorio oculto donde se prepara una extracción antes de publicarla"""
+        return self.staging_dir / f".{extract_id}.tmp"
+
+    def publish(self, extract_id, files, source=None):
+        """Publica la extracción preparada en temp_dir(extract_id).
+
+        files: lista de dicts con name, sha256, size, rows y profile (file_profiler).
+        Devuelve la ruta final.
+        """
+        temp_dir = self.temp_dir(extract_id)
+        final_dir = self.staging_dir / extract_id
+        os.rename(temp_dir, final_dir)
+
+        entry = {
+            'id': extract_id,
+            'created_at': datetime.now().isoformat(),
+            'status': 'published',
+            'source': source,
+            'files': files
+        }
+        self.lock.acquire()
+        try:
+            catalog = self.load()
+            catalog['extracts'][extract_id] = entry
+            write_text_atomic(self.catalog_path, json.dumps(catalog, indent=2, ensure_ascii=False))
+            # El cambio de puntero es lo último: hasta aquí los consumidores ven la extracción anterior
+            write_text_atomic(self.latest_path, extract_id + '\n')
+        finally:
+            self.lock.release()
+        return final_dir
+
+    def sync(self):
+        """Actualiza el estado de cada entrada tras la retención (archivada o eliminada)"""
+        self.lock.acquire()
+        try:
+            catalog = self.load()
+            changed = False
+            for extract_id, entry in list(catalog['extracts'].items()):
+                if (self.staging_dir / extract_id).is_dir():
+                    status = 'published'
+                elif (self.staging_dir / f"{extract_id}.tar.gz").exists():
+                    status = 'archived'
+                else:
+                    del catalog['extracts'][extract_id]
+                    changed = True
+                    continue
+                if entry.get('status') != status:
+                    entry['status'] = status
+                    changed = True
+            if changed:
+                write_text_atomic(self.catalog_path, json.dumps(catalog, indent=2, ensure_ascii=False))
+        finally:
+            self.lock.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Catálogo de extracciones del staging')
+    parser.add_argument('--staging', type=str, default='data/staging', help='Directorio de staging')
+    parser.add_argument('--all', action='store_true', help='Listar todas las extracciones registradas')
+    args = parser.parse_args()
+
+    catalog = StagingCatalog(args.staging)
+    if args.all:
+        extracts = sorted(catalog.load()['extracts'].values(), key=lambda entry: entry['id'])
+    else:
+        latest = catalog.latest()
+        extracts = [latest] if latest else []
+
+    if not extracts:
+        print("No hay extracciones publicadas en el catálogo.")
+        return 1
+    print(json.dumps(extracts, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Almacén de staging direccionado por contenido con retención y compactación de extracciones
+"""
+import argparse
+import hashlib
+import logging
+import os
+import shutil
+import sys
+import tarfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fs_utils import link_or_copy
+
+
+BLOB_DIR = '_blobs'
+EXTRACT_PREFIX = 'extract_'
+TIMESTAMP_FORMAT = '%Y%m%d_%H%M%S'
+
+# Política de retención por defecto
+KEEP_LAST = 5
+KEEP_DAYS = 14
+KEEP_WEEKLY = 8
+COMPRESS_AFTER_DAYS = 7
+
+# Alias de archivos de staging fuera del almacén: un hardlink compartiría el
+# inodo del blob y una escritura sobre el alias lo modificaría
+STAGED_ALIAS_METHODS = ('reflink', 'symlink', 'copy')
+BLOB_MODE = 0o444
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 del contenido leyendo por bloques"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StagingStore:
+    """Guarda cada archivo de staging una sola vez en data/staging/_blobs/<ab>/<sha256>.
+
+    Los directorios extract_<fecha> contienen hardlinks a los blobs, de modo
+    que dos extracciones idénticas ocupan lo mismo que una. La retención
+    conserva las últimas keep_last extracciones, las de los últimos keep_days
+    días y una por semana durante keep_weekly semanas; las conservadas con más
+    de compress_after_days días se archivan en extract_<fecha>.tar.gz y el resto
+    se elimina. Un blob sin más enlaces que el propio se borra.
+    """
+
+    def __init__(self, staging_dir='data/staging', keep_last=KEEP_LAST, keep_days=KEEP_DAYS,
+                 keep_weekly=KEEP_WEEKLY, compress_after_days=COMPRESS_AFTER_DAYS, logger=None):
+        self.staging_dir = Path(staging_dir)
+        self.blob_dir = self.staging_dir / BLOB_DIR
+        # La extracción más reciente nunca se elimina ni se comprime
+        self.keep_last = max(1, keep_last)
+        self.keep_days = keep_days
+        self.keep_weekly = keep_weekly
+        self.compress_after_days = compress_after_days
+        self.logger = logger or logging.getLogger(__name__)
+
+    def _blob_path(self, digest):
+        return self.blob_dir / digest[:2] / digest
+
+    def store(self, src, dest, digest=None):
+        """Coloca src en dest enlazándolo al blob de su contenido; devuelve (digest, reutilizado)"""
+        src, dest = Path(src), Path(dest)
+        digest = digest or file_digest(src)
+        blob = self._blob_path(digest)
+        reused = blob.exists()
+        if not reused:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp = blob.with_name(f".{digest}.tmp")
+            shutil.copy2(src, tmp)
+            # Solo lectura: el contenido debe seguir coincidiendo con su sha256
+            os.chmod(tmp, BLOB_MODE)
+            os.replace(tmp, blob)
+        # Solo hardlinks: la recolección de blobs se basa en el número de enlaces
+        link_or_copy(blob, dest, methods=('hardlink', 'copy'))
+        return digest, reused
+
+    def deduplicate(self, directory):
+        """Sustituye los archivos de una extracción existente por enlaces a sus blobs"""
+        saved = 0
+        for path in Path(directory).iterdir():
+            if not path.is_file() or path.name.startswith('_'):
+                continue
+            digest = file_digest(path)
+            blob = self._blob_path(digest)
+            if blob.exists() and os.path.samefile(blob, path):
+                continue
+            size = path.stat().st_size
+            _, reused = self.store(path, path, digest)
+            if reused:
+                saved += size
+        return saved
+
+    # Retención
+
+    def extracts(self):
+        """(fecha, ruta) de cada extracción, en directorio o archivada, de la más reciente a la más antigua"""
+        found = []
+        for path in self.staging_dir.glob(f'{EXTRACT_PREFIX}*'):
+            stamp = path.name[len(EXTRACT_PREFIX):].split('.')[0]
+            try:
+                moment = datetime.strptime(stamp, TIMESTAMP_FORMAT)
+            except ValueError:
+                continue
+            if path.is_dir() or path.name.endswith('.tar.gz'):
+                found.append((moment, path))
+        return sorted(found, key=lambda item: item[0], reverse=True)
+
+    def _retained(self, extracts, now):
+        keep = set()
+        keep.update(path for _, path in extracts[:self.keep_last])
+        keep.update(path for moment, path in extracts if now - moment <= timedelta(days=self.keep_days))
+
+        # Una por semana: la más reciente de cada semana ISO
+        weeks = set()
+        oldest_week = now - timedelta(weeks=self.keep_weekly)
+        for moment, path in extracts:
+            week = moment.isocalendar()[:2]
+            if moment >= oldest_week and week not in weeks:
+                weeks.add(week)
+                keep.add(path)
+        return keep
+
+    def apply_retention(self, now=None):
+        """Aplica la política de retención; devuelve un resumen de lo eliminado y comprimido"""
+        now = now or datetime.now()
+        extracts = self.extracts()
+        keep = self._retained(extracts, now)
+        newest = {path for _, path in extracts[:self.keep_last]}
+        summary = {'removed': [], 'compressed': [], 'blobs_removed': 0}
+
+        for moment, path in extracts:
+            if path not in keep:
+                if path.is_dir():
+                    shutil.rmtree(path)
+                else:
+                    path.unlink()
+                summary['removed'].append(path.name)
+            elif (path.is_dir() and path not in newest
+                  and now - moment > timedelta(days=self.compress_after_days)):
+                self._compress(path)
+                summary['compressed'].append(path.name)
+
+        summary['blobs_removed'] = self.collect_garbage()
+        if summary['removed'] or summary['compressed']:
+            self.logger.info(f"Retención de staging: {len(summary['removed'])} extracciones eliminadas, "
+                             f"{len(summary['compressed'])} comprimidas, "
+                             f"{summary['blobs_removed']} blobs liberados")
+        return summary
+
+    def _compress(self, directory):
+        archive = directory.with_name(directory.name + '.tar.gz')
+        tmp = archive.with_name(archive.name + '.tmp')
+        with tarfile.open(tmp, 'w:gz') as tar:
+            tar.add(directory, arcname=directory.name)
+        os.replace(tmp, archive)
+        shutil.rmtree(directory)
+
+    def collect_garbage(self):
+        """Elimina los blobs que ya no enlaza ninguna extracción"""
+        removed = 0
+        if not self.blob_dir.exists():
+            return removed
+        for blob in self.blob_dir.glob('*/*'):
+            if blob.is_file() and blob.stat().st_nlink <= 1:
+                blob.unlink()
+                removed += 1
+        return removed
+
+    def compact(self, now=None):
+        """Deduplica las extracciones en directorio y aplica la retención"""
+        saved = 0
+        for _, path in self.extracts():
+            if path.is_dir():
+                saved += self.deduplicate(path)
+        summary = self.apply_retention(now)
+        summary['bytes_deduplicated'] = saved
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compactación y retención del área de staging')
+    parser.add_argument('--staging', type=str, default='data/staging', help='Directorio de staging')
+    parser.add_argument('--keep-last', type=int, default=KEEP_LAST, help='Extracciones recientes a conservar')
+    parser.add_argument('--keep-days', type=int, default=KEEP_DAYS, help='Días completos a conservar')
+    parser.add_argument('--keep-weekly', type=int, default=KEEP_WEEKLY, help='Semanas con una extracción conservada')
+    parser.add_argument('--compress-after', type=int, default=COMPRESS_AFTER_DAYS,
+                        help='Días tras los que se comprime una extracción conservada')
+    args = parser.parse_args()
+
+    store = StagingStore(args.staging, keep_last=args.keep_last, keep_days=args.keep_days,
+                         keep_weekly=args.keep_weekly, compress_after_days=args.compress_after)
+    summary = store.compact()
+    print(f"Bytes deduplicados: {summary['bytes_deduplicated']}")
+    print(f"Extracciones eliminadas: {', '.join(summary['removed']) or 'ninguna'}")
+    print(f"Extracciones comprimidas: {', '.join(summary['compressed']) or 'ninguna'}")
+    print(f"Blobs liberados: {summary['blobs_removed']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Vigilancia del área de staging: dispara el ETL cuando aparece una extracción nueva
+"""
+import logging
+import os
+import time
+from pathlib import Path
+
+from fs_events import (Inotify, inotify_available, IN_CLOSE_WRITE, IN_CREATE,
+                       IN_ISDIR, IN_MOVED_TO)
+
+
+CONTROL_FILE = '_CONTROL.txt'
+
+
+class StagingWatcher:
+    """Detecta directorios extract_* cuyo _CONTROL.txt acaba de escribirse.
+
+    Usa inotify cuando está disponible y, si no, sondea el directorio cada
+    poll_interval segundos. Los eventos de un mismo directorio se agrupan:
+    el callback se invoca una sola vez, 'debounce' segundos después del
+    último evento.
+    """
+
+    def __init__(self, staging_dir, callback, debounce=2.0, poll_interval=5.0,
+                 use_inotify=True, logger=None):
+        self.staging_dir = Path(staging_dir)
+        self.callback = callback
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify and inotify_available()
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._pending = {}
+        self._stopped = False
+        # Tubería para despertar la espera de inotify al detener el vigilante
+        self._wake_read, self._wake_write = os.pipe()
+        # Las extracciones existentes al arrancar no disparan ejecuciones
+        self._seen = {d.name for d in self._extract_dirs()}
+
+    def _extract_dirs(self):
+        if not self.staging_dir.exists():
+            return []
+        return [d for d in self.staging_dir.glob('extract_*') if d.is_dir()]
+
+    def stop(self):
+        self._stopped = True
+        os.write(self._wake_write, b'\0')
+
+    def run(self):
+        """Bucle bloqueante de vigilancia"""
+        self.staging_dir.mkdir(exist_ok=True, parents=True)
+        mode = 'inotify' if self.use_inotify else f'sondeo cada {self.poll_interval} s'
+        self.logger.info(f"Vigilando {self.staging_dir} ({mode})")
+
+        try:
+            if self.use_inotify:
+                self._run_inotify()
+            else:
+                self._run_polling()
+        finally:
+            os.close(self._wake_read)
+            os.close(self._wake_write)
+
+    def _mark_pending(self, directory):
+        if directory.name in self._seen or directory.name.startswith('.'):
+            return
+        # Cada evento nuevo reinicia la espera del directorio
+        self._pending[directory.name] = time.monotonic() + self.debounce
+
+    def _fire_due(self):
+        now = time.monotonic()
+        for name, deadline in sorted(self._pending.items(), key=lambda item: item[1]):
+            if deadline > now:
+                continue
+            del self._pending[name]
+            directory = self.staging_dir / name
+            if not (directory / CONTROL_FILE).exists():
+                continue
+            self._seen.add(name)
+            self.logger.info(f"Nueva extracción detectada: {directory}")
+            try:
+                self.callback(directory)
+            except Exception as e:
+                self.logger.error(f"Error al procesar {directory}: {str(e)}")
+
+    def _next_timeout(self, default):
+        if not self._pending:
+            return default
+        return max(0.0, min(self._pending.values()) - time.monotonic())
+
+    def _run_inotify(self):
+        inotify = Inotify()
+        dir_mask = IN_CREATE | IN_MOVED_TO
+        file_mask = IN_CLOSE_WRITE | IN_MOVED_TO
+        try:
+            inotify.add_watch(self.staging_dir, dir_mask)
+            while not self._stopped:
+                # Sin trabajos pendientes se bloquea hasta el siguiente evento
+                events = inotify.read_events(self._next_timeout(None), wake_fds=(self._wake_read,))
+                for path, mask, name in events:
+                    if path == str(self.staging_dir):
+                        if mask & IN_ISDIR and name.startswith('extract_'):
+                            directory = self.staging_dir / name
+                            try:
+                                inotify.add_watch(directory, file_mask)
+                            except OSError:
+                                continue
+                            # Publicación atómica: el directorio llega ya completo
+                            if (directory / CONTROL_FILE).exists():
+                                self._mark_pending(directory)
+                    elif name == CONTROL_FILE and path:
+                        self._mark_pending(Path(path))
+                self._fire_due()
+        finally:
+            inotify.close()
+
+    def _run_polling(self):
+        while not self._stopped:
+            for directory in self._extract_dirs():
+                if directory.name in self._pending or directory.name in self._seen:
+                    continue
+                if (directory / CONTROL_FILE).exists():
+                    self._mark_pending(directory)
+            self._fire_due()
+            time.sleep(self._next_timeout(self.poll_interval) if self._pending else self.poll_interval)
@@ -0,0 +1,249 @@
+"""
+Autor: Juan Diego Díaz Guzmán
+Fecha: 13-03-2025
+Carga paralela de tablas independientes con publicación "todo o nada"
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import psycopg2
+    from psycopg2 import pool, sql
+    from psycopg2.extras import execute_values
+except ImportError:
+    # Sin psycopg2 solo está disponible el destino local (local_sink)
+    psycopg2 = None
+
+
+SHADOW_SUFFIX = '__shadow'
+JOURNAL_TABLE = 'etl_load_journal'
+
+
+class TableLoad:
+    """Describe la carga de una tabla: DDL, columnas, registros e índices"""
+
+    def __init__(self, name, ddl, columns, records, indexes=None, page_size=1000, batch_size=5000):
+        # El DDL es una plantilla con {table} para poder crear la tabla sombra
+        self.name = name
+        self.ddl = ddl
+        self.columns = list(columns)
+        self.records = records
+        # Lista de tuplas de columnas; los índices se crean después de insertar
+        self.indexes = [tuple(index) for index in (indexes or [])]
+        self.page_size = page_size
+        # Unidad de checkpoint: cada lote se confirma junto con su entrada en el journal
+        self.batch_size = batch_size
+
+    def batches(self):
+        for batch_no, start in enumerate(range(0, len(self.records), self.batch_size)):
+            yield batch_no, self.records[start:start + self.batch_size]
+
+    def index_name(self, table, columns):
+        return f"{table}_{'_'.join(columns)}_idx"
+
+    @property
+    def shadow_name(self):
+        return f"{self.name}{SHADOW_SUFFIX}"
+
+
+class ParallelTableLoader:
+    """Carga varias tablas en paralelo sobre conexiones independientes.
+
+    Fase 1: cada tabla se carga en su tabla sombra en su propia conexión.
+    Fase 2: una única transacción corta sustituye las tablas publicadas.
+
+    Con un run_id la carga es reanudable: cada lote confirmado queda
+    registrado en etl_load_journal y un reintento con el mismo run_id
+    continúa desde el primer lote pendiente.
+    """
+
+    def __init__(self, db_config, max_workers=4, logger=None):
+        self.db_config = db_config
+        self.max_workers = max_workers
+        self.logger = logger or logging.getLogger(__name__)
+        self.pool = None
+
+    def _open_pool(self, size):
+        self.pool = pool.ThreadedConnectionPool(
+            1, size,
+            dbname=self.db_config['database'],
+            user=self.db_config['user'],
+            password=self.db_config['password'],
+            host=self.db_config['host'],
+            port=self.db_config['port']
+        )
+
+    def close(self):
+        if self.pool:
+            self.pool.closeall()
+            self.pool = None
+
+    def load(self, table_loads, run_id=None):
+        """Carga todas las tablas y las publica de forma atómica"""
+        if not table_loads:
+            return True
+
+        workers = max(1, min(self.max_workers, len(table_loads)))
+        self._open_pool(workers + 1)
+
+        try:
+            if run_id:
+                self._ensure_journal()
+
+            # Fase 1: carga concurrente en tablas sombra
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(self._load_shadow, table_load, run_id): table_load
+                           for table_load in table_loads}
+                errors = []
+                for future in as_completed(futures):
+                    table_load = futures[future]
+                    try:
+                        rows = future.result()
+                        self.logger.info(f"Tabla sombra {table_load.shadow_name} cargada: {rows} registros")
+                    except Exception as e:
+                        self.logger.error(f"Error al cargar {table_load.shadow_name}: {str(e)}")
+                        errors.append(e)
+
+            if errors:
+                # En modo reanudable las sombras y el journal se conservan para el reintento
+                if not run_id:
+                    self._drop_shadows(table_loads)
+                raise errors[0]
+
+            # Fase 2: publicación en una sola transacción
+            self._publish(table_loads, run_id)
+            self.logger.info(f"Publicadas {len(table_loads)} tablas de forma atómica")
+            return True
+
+        finally:
+            self.close()
+
+    def _ensure_journal(self):
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("""
+                    CREATE TABLE IF NOT EXISTS {} (
+                        run_id VARCHAR(64),
+                        table_name VARCHAR(100),
+                        batch_no INTEGER,
+                        rows INTEGER,
+                        committed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (run_id, table_name, batch_no)
+                    )
+                """).format(sql.Identifier(JOURNAL_TABLE)))
+            conn.commit()
+        finally:
+            self.pool.putconn(conn)
+
+    def _committed_batches(self, cur, table_load, run_id):
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table_load.shadow_name,))
+        if not cur.fetchone()[0]:
+            return set()
+        cur.execute(sql.SQL("SELECT batch_no FROM {} WHERE run_id = %s AND table_name = %s").format(
+            sql.Identifier(JOURNAL_TABLE)), (run_id, table_load.name))
+        return {row[0] for row in cur.fetchall()}
+
+    def _load_shadow(self, table_load, run_id=None):
+        conn = self.pool.getconn()
+        try:
+            shadow = sql.Identifier(table_load.shadow_name)
+            with conn.cursor() as cur:
+                committed = self._committed_batches(cur, table_load, run_id) if run_id else set()
+
+                if committed:
+                    self.logger.info(f"Reanudando {table_load.shadow_name}: "
+                                     f"{len(committed)} lotes ya confirmados")
+                else:
+                    cur.execute(sql.SQL("DROP TABLE IF EXISTS {} CASCADE").format(shadow))
+                    cur.execute(table_load.ddl.format(table=table_load.shadow_name))
+                    if run_id:
+                        # Las entradas de ejecuciones anteriores ya no corresponden a esta sombra
+                        cur.execute(sql.SQL("DELETE FROM {} WHERE table_name = %s").format(
+                            sql.Identifier(JOURNAL_TABLE)), (table_load.name,))
+                conn.commit()
+
+                insert_sql = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+                    shadow,
+                    sql.SQL(', ').join(sql.Identifier(col) for col in table_load.columns)
+                ).as_string(conn)
+
+                loaded = 0
+                for batch_no, batch in table_load.batches():
+                    if batch_no in committed:
+                        continue
+                    execute_values(cur, insert_sql, batch, page_size=table_load.page_size)
+                    if run_id:
+                        cur.execute(sql.SQL(
+                            "INSERT INTO {} (run_id, table_name, batch_no, rows) VALUES (%s, %s, %s, %s)"
+                        ).format(sql.Identifier(JOURNAL_TABLE)),
+                            (run_id, table_load.name, batch_no, len(batch)))
+                        # El lote y su entrada en el journal se confirman juntos
+                        conn.commit()
+                    loaded += len(batch)
+
+                for columns in table_load.indexes:
+                    cur.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} ({})").format(
+                        sql.Identifier(table_load.index_name(table_load.shadow_name, columns)),
+                        shadow,
+                        sql.SQL(', ').join(sql.Identifier(col) for col in columns)
+                    ))
+            conn.commit()
+            return loaded
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    def _publish(self, table_loads, run_id=None):
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                for table_load in table_loads:
+                    cur.execute(sql.SQL("DROP TABLE IF EXISTS {} CASCADE").format(
+                        sql.Identifier(table_load.name)))
+                    cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+                        sql.Identifier(table_load.shadow_name), sql.Identifier(table_load.name)))
+                    self._rename_dependents(cur, table_load)
+                if run_id:
+                    # La ejecución queda publicada: su journal ya no es necesario
+                    cur.execute(sql.SQL("DELETE FROM {} WHERE run_id = %s").format(
+                        sql.Identifier(JOURNAL_TABLE)), (run_id,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    def _rename_dependents(self, cur, table_load):
+        # Los índices y secuencias conservan el nombre de la tabla sombra tras el RENAME;
+        # se renombran para que la siguiente carga pueda volver a crear la sombra
+        cur.execute("""
+            SELECT c.relname, c.relkind
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = current_schema()
+              AND c.relkind IN ('i', 'S')
+              AND c.relname LIKE %s
+        """, (table_load.shadow_name.replace('_', r'\_') + '%',))
+
+        for relname, relkind in cur.fetchall():
+            new_name = table_load.name + relname[len(table_load.shadow_name):]
+            statement = "ALTER INDEX {} RENAME TO {}" if relkind == 'i' else "ALTER SEQUENCE {} RENAME TO {}"
+            cur.execute(sql.SQL(statement).format(sql.Identifier(relname), sql.Identifier(new_name)))
+
+    def _drop_shadows(self, table_loads):
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                for table_load in table_loads:
+                    cur.execute(sql.SQL("DROP TABLE IF EXISTS {} CASCADE").format(
+                        sql.Identifier(table_load.shadow_name)))
+            conn.commit()
+        except psycopg2.Error as e:
+            conn.rollback()
+            self.logger.warning(f"No se pudieron eliminar las tablas sombra: {str(e)}")
+        finally:
+            self.pool.putconn(conn)
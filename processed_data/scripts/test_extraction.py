@@ -4,16 +4,26 @@ Fecha: 13-03-2025
 """
 import os
 import shutil
-import logging
 import argparse
 import subprocess
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
+from run_cache import RunCache
+from progress import emit_progress
+from logging_setup import setup_logging
+from staging_store import StagingStore, KEEP_LAST, KEEP_DAYS, KEEP_WEEKLY, STAGED_ALIAS_METHODS
+from staging_catalog import StagingCatalog
+from fs_utils import link_or_copy
+from file_profiler import profile_csv
+from compressed_io import Compression, SUFFIXES, compress_file, detect_compression, is_csv
+
 class RepositoryToStaging:
 
-    def __init__(self, source_repo_url, staging_dir='data/staging', log_dir='logs'):
+    def __init__(self, source_repo_url, staging_dir='data/staging', log_dir='logs',
+                 keep_last=KEEP_LAST, keep_days=KEEP_DAYS, keep_weekly=KEEP_WEEKLY,
+                 compression=None, compression_level=None):
       #Inicialización del repositorio
         
         self.source_repo_url = source_repo_url
@@ -26,6 +36,7 @@ class RepositoryToStaging:
         self.staging_dir = Path(staging_dir)
         self.log_dir = Path(log_dir)
         self.temp_dir = Path('temp_repo')
+        self.current_staging = None
         
         # Crear directorios necesarios
         self.staging_dir.mkdir(exist_ok=True, parents=True)
@@ -37,21 +48,23 @@ class RepositoryToStaging:
         
         # Configuración de logging
         self.setup_logging()
+        
+        # Archivos de staging deduplicados por contenido y política de retención
+        self.store = StagingStore(self.staging_dir, keep_last=keep_last, keep_days=keep_days,
+                                  keep_weekly=keep_weekly, logger=self.logger)
+        # Publicación atómica de cada extracción y puntero a la actual
+        self.catalog = StagingCatalog(self.staging_dir)
+        self.current_extract_id = None
+        self.staged_digests = {}
+        self.file_profiles = {}
+        # Formato de los CSV en staging (sin compresión salvo que se pida o NBA_ETL_COMPRESSION)
+        self.compression = Compression(compression, compression_level)
     
     def setup_logging(self):
         
-        log_file = self.log_dir / f'repo_extraction_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'
-        
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file),
-                logging.StreamHandler()
-            ]
-        )
-        
-        self.logger = logging.getLogger(__name__)
+        # Un archivo por extracción: logs/repo_extraction_<fecha>_<hora>.log
+        self.logger = setup_logging('extract', 'repo_extraction', log_dir=self.log_dir,
+                                    date_format='%Y%m%d_%H%M%S')
         self.logger.info("Proceso de extracción iniciado")
     
     def clone_repository(self):
@@ -93,7 +106,7 @@ class RepositoryToStaging:
             
             self.logger.info(f"Se encontraron {len(found_files)} archivos de datos")
             for file in found_files:
-                self.logger.info(f"  - {file}")
+                self.logger.debug(f"  - {file}")
                 
             return found_files
             
@@ -104,18 +117,38 @@ class RepositoryToStaging:
     def copy_to_staging(self, file_paths):
 
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            staging_subdir = self.staging_dir / f'extract_{timestamp}'
-            staging_subdir.mkdir(exist_ok=True)
+            # Identificador único aunque dos extracciones caigan en el mismo segundo
+            moment = datetime.now()
+            extract_id = f'extract_{moment.strftime("%Y%m%d_%H%M%S")}'
+            while (self.staging_dir / extract_id).exists() or self.catalog.temp_dir(extract_id).exists():
+                moment += timedelta(seconds=1)
+                extract_id = f'extract_{moment.strftime("%Y%m%d_%H%M%S")}'
             
-            self.logger.info(f"Copiando archivos al directorio de staging: {staging_subdir}")
+            # La extracción se prepara en un directorio oculto y se publica al terminar
+            staging_subdir = self.catalog.temp_dir(extract_id)
+            staging_subdir.mkdir(parents=True)
+            self.current_extract_id = extract_id
+            self.current_staging = staging_subdir
+            
+            self.logger.info(f"Copiando archivos al directorio de staging: {self.staging_dir / extract_id}")
             
             copied_files = []
+            reused = 0
+            self.staged_digests = {}
             for src_path in file_paths:
                 dest_path = staging_subdir / src_path.name
-                shutil.copy2(src_path, dest_path)
+                if self.compression.enabled and is_csv(src_path) and detect_compression(src_path) == 'none':
+                    # Se comprime una sola vez al entrar; las etapas siguientes leen el archivo comprimido
+                    dest_path = self.compression.path(dest_path)
+                    src_path = compress_file(src_path, self.temp_dir / dest_path.name, self.compression)
+                # Un contenido ya presente en staging se enlaza en lugar de copiarse
+                digest, was_stored = self.store.store(src_path, dest_path)
+                reused += was_stored
+                self.staged_digests[dest_path.name] = digest
                 copied_files.append(dest_path)
-                self.logger.info(f"Copiado: {src_path} -> {dest_path}")
+                self.logger.debug(f"Copiado: {src_path} -> {dest_path} ({digest[:12]})")
+            if reused:
+                self.logger.info(f"{reused} de {len(copied_files)} archivos sin cambios: enlazados a su copia existente")
             
             # Crear archivo de control
             control_file = staging_subdir / '_CONTROL.txt'
@@ -134,9 +167,36 @@ class RepositoryToStaging:
             self.logger.error(f"Error al copiar archivos al staging: {str(e)}")
             return False
     
+    def publish_staging(self, validation_results):
+        """Publica la extracción preparada, la registra en el catálogo y aplica la retención"""
+        files = []
+        for path in sorted(self.current_staging.iterdir()):
+            if not path.is_file() or path.name.startswith('_'):
+                continue
+            stats = validation_results.get(path.name, {})
+            files.append({
+                'name': path.name,
+                'sha256': self.staged_digests.get(path.name),
+                'size': path.stat().st_size,
+                'rows': stats.get('rows') if isinstance(stats, dict) else None,
+                'profile': self.file_profiles.get(path.name)
+            })
+        
+        self.current_staging = self.catalog.publish(self.current_extract_id, files, source=self.source_repo_url)
+        self.logger.info(f"Extracción publicada: {self.current_staging}")
+        
+        # Retención: eliminar o comprimir extracciones antiguas
+        try:
+            self.store.apply_retention()
+            self.catalog.sync()
+        except OSError as e:
+            self.logger.warning(f"No se pudo aplicar la retención del staging: {str(e)}")
+        return self.current_staging
+    
     def validate_data_files(self, file_paths):
 
         validation_stats = {}
+        self.file_profiles = {}
         
         try:
             self.logger.info("Validando archivos de datos...")
@@ -146,21 +206,21 @@ class RepositoryToStaging:
                     self.logger.warning(f"El archivo {file_path} no existe")
                     continue
                     
-                if file_path.suffix.lower() == '.csv':
+                if is_csv(file_path):
                     try:
-                        # Leer solo las primeras filas para verificar estructura
-                        df_sample = pd.read_csv(file_path, nrows=5)
-                        row_count = len(pd.read_csv(file_path))
+                        # Una sola lectura por bloques: estructura, filas y perfil para el catálogo
+                        profile = profile_csv(file_path)
+                        self.file_profiles[file_path.name] = profile
                         
                         # Guardar estadísticas
                         validation_stats[file_path.name] = {
-                            'rows': row_count,
-                            'columns': len(df_sample.columns),
-                            'column_names': list(df_sample.columns),
+                            'rows': profile['rows'],
+                            'columns': len(profile['columns']),
+                            'column_names': profile['columns'],
                             'valid': True
                         }
                         
-                        self.logger.info(f"Archivo {file_path.name} validado: {row_count} filas, {len(df_sample.columns)} columnas")
+                        self.logger.info(f"Archivo {file_path.name} validado: {profile['rows']} filas, {len(profile['columns'])} columnas")
                     except Exception as e:
                         validation_stats[file_path.name] = {
                             'valid': False,
@@ -182,8 +242,8 @@ class RepositoryToStaging:
             
             # Buscar el archivo principal de playoffs
             playoff_file = None
-            for file_path in staging_dir.glob('*.csv'):
-                if 'play_off' in file_path.name.lower():
+            for file_path in staging_dir.iterdir():
+                if is_csv(file_path) and 'play_off' in file_path.name.lower():
                     playoff_file = file_path
                     break
             
@@ -191,18 +251,19 @@ class RepositoryToStaging:
                 self.logger.warning("No se encontró el archivo de playoffs en el staging")
                 return False
             
-            # Copiar a la ubicación esperada por el ETL
-            # Cambiar para guardar dentro de data
-            target_path = Path('data/play_off_totals_2010_2024.csv')
-            shutil.copy2(playoff_file, target_path)
-            self.logger.info(f"Archivo preparado para ETL: {playoff_file} -> {target_path}")
+            # Enlazar en la ubicación esperada por el ETL (sin copiar si el sistema lo permite)
+            # Cambiar para guardar dentro de data (con la extensión del archivo si está comprimido)
+            suffix = SUFFIXES[detect_compression(playoff_file)]
+            target_path = Path('data/play_off_totals_2010_2024.csv' + suffix)
+            # Sin hardlink: el alias no debe compartir inodo con el blob de staging
+            method = link_or_copy(playoff_file, target_path, methods=STAGED_ALIAS_METHODS)
+            self.logger.info(f"Archivo preparado para ETL: {playoff_file} -> {target_path} ({method})")
             
-            # Crear un archivo detallado procesado para la aplicación Flask
+            # Archivo detallado para la aplicación Flask: mismo contenido, sin releer ni reescribir el CSV
             try:
-                df = pd.read_csv(target_path)
-                processed_file = processed_dir / 'playoffs_detailed_processed.csv'
-                df.to_csv(processed_file, index=False)
-                self.logger.info(f"Archivo procesado creado: {processed_file}")
+                processed_file = processed_dir / ('playoffs_detailed_processed.csv' + suffix)
+                method = link_or_copy(target_path, processed_file, methods=STAGED_ALIAS_METHODS)
+                self.logger.info(f"Archivo procesado creado: {processed_file} ({method})")
             except Exception as e:
                 self.logger.error(f"Error al crear archivo procesado: {str(e)}")
             
@@ -244,11 +305,11 @@ class RepositoryToStaging:
             self.logger.error(f"Error al descargar archivo: {str(e)}")
             return False
 
-    def run(self):
-  
+    def extract_to_staging(self):
+        """Extrae los datos al staging y devuelve el directorio, los archivos y la validación"""
+        self.logger.info("Iniciando proceso de extracción de repositorio a staging")
+
         try:
-            self.logger.info("Iniciando proceso de extracción de repositorio a staging")
-            
             # Crear directorio temporal si no existe
             if not self.temp_dir.exists():
                 self.temp_dir.mkdir(exist_ok=True)
@@ -258,27 +319,26 @@ class RepositoryToStaging:
             nba_file_path = self.temp_dir / "play_off_totals_2010_2024.csv"
             
             # Descargar archivo específico (alternativa a clonar todo el repositorio)
+            emit_progress('extract', 0, 4, 'Descargando datos')
             if not self.download_specific_file(nba_file_url, nba_file_path):
                 self.logger.error("Fallo al descargar archivo específico. Intentando clonar repositorio completo.")
                 
               #Clonar repositorio completo
                 if not self.clone_repository():
-                    self.logger.error("Fallo al clonar repositorio. Abortando proceso.")
-                    return False
+                    raise ConnectionError("No se pudo descargar el archivo ni clonar el repositorio")
             
             # Establecer archivos de datos
             data_files = [nba_file_path] if nba_file_path.exists() else self.find_data_files(data_patterns=['*.csv'])
             
             # Copiar al staging
+            emit_progress('extract', 1, 4, 'Copiando al staging')
             if not self.copy_to_staging(data_files):
-                self.logger.error("Fallo al copiar archivos al staging. Abortando proceso.")
-                self.cleanup()
-                return False
+                raise RuntimeError("Fallo al copiar archivos al staging")
         
-            # Validar archivos
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            current_staging = self.staging_dir / f'extract_{timestamp}'
-            copied_files = list(current_staging.glob('*.*'))
+            # Validar archivos del directorio creado en esta extracción
+            emit_progress('extract', 2, 4, 'Validando archivos')
+            current_staging = self.current_staging
+            copied_files = [f for f in current_staging.glob('*.*') if not f.name.startswith('_')]
             validation_results = self.validate_data_files(copied_files)
             
             # Guardar resultados de validación
@@ -286,19 +346,43 @@ class RepositoryToStaging:
             pd.Series(validation_results).to_json(validation_file)
             self.logger.info(f"Resultados de validación guardados en {validation_file}")
             
+            # Publicar: renombrar el directorio completo y apuntar LATEST a él
+            current_staging = self.publish_staging(validation_results)
+            copied_files = [current_staging / f.name for f in copied_files]
+            
             # Preparar para ETL
+            emit_progress('extract', 3, 4, 'Preparando datos para el ETL')
             if not self.prepare_for_etl(current_staging):
                 self.logger.warning("Advertencia: Posibles problemas al preparar datos para ETL")
             
-            # Limpieza
-            self.cleanup()
-            
+            # Registrar la extracción para que las etapas siguientes de la sesión la reutilicen
+            cache = RunCache(logger=self.logger)
+            if cache.enabled:
+                cache.record('extract', cache.fingerprint(*copied_files), outputs=copied_files,
+                             staging_dir=str(current_staging))
+
+            emit_progress('extract', 4, 4, 'Extracción finalizada')
             self.logger.info("Proceso de extracción de repositorio a staging completado con éxito")
+            return {
+                'staging_dir': current_staging,
+                'files': copied_files,
+                'validation': validation_results
+            }
+
+        finally:
+            # Limpieza (incluida una extracción que no llegó a publicarse)
+            if self.current_staging and self.current_staging.name.startswith('.') and self.current_staging.exists():
+                shutil.rmtree(self.current_staging, ignore_errors=True)
+            self.cleanup()
+
+    def run(self):
+  
+        try:
+            self.extract_to_staging()
             return True
             
         except Exception as e:
             self.logger.error(f"Error en el proceso de extracción: {str(e)}")
-            self.cleanup()
             return False
 
 
@@ -308,13 +392,24 @@ def main():
                         help='URL del repositorio fuente (predeterminado: NBA-Data-2010-2024)')
     parser.add_argument('--staging', type=str, default='data/staging', help='Directorio de staging')
     parser.add_argument('--log-dir', type=str, default='logs', help='Directorio de logs')
+    parser.add_argument('--keep-last', type=int, default=KEEP_LAST, help='Extracciones recientes a conservar')
+    parser.add_argument('--keep-days', type=int, default=KEEP_DAYS, help='Días completos de extracciones a conservar')
+    parser.add_argument('--keep-weekly', type=int, default=KEEP_WEEKLY, help='Semanas con una extracción conservada')
+    parser.add_argument('--compression', type=str, choices=['none', 'gzip', 'zstd'],
+                        help='Compresión de los CSV en staging (predeterminado: NBA_ETL_COMPRESSION o none)')
+    parser.add_argument('--compression-level', type=int, help='Nivel de compresión')
     
     args = parser.parse_args()
     
     extractor = RepositoryToStaging(
         source_repo_url=args.repo,
         staging_dir=args.staging,
-        log_dir=args.log_dir
+        log_dir=args.log_dir,
+        keep_last=args.keep_last,
+        keep_days=args.keep_days,
+        keep_weekly=args.keep_weekly,
+        compression=args.compression,
+        compression_level=args.compression_level
     )
     
     success = extractor.run()